@@ -1,25 +1,23 @@
 import os
 import pandas as pd
-from openpyxl import load_workbook
 from utils_progress import print_progress_bar  # type: ignore
-from config_loader import load_config  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 
-cfg = load_config()
-TARGET_DIR = cfg["TARGET_DIRECTORY"]
-SYMBOL = cfg["SYMBOL"]
 
-TEMP_FILE = os.path.join(TARGET_DIR, f"{SYMBOL}_TradeRecords_TMP.csv")
-OUTPUT_EXCEL = os.path.join(TARGET_DIR, f"{SYMBOL}_TradeList.xlsx")
+def generate_excel(symbol: str = None):
+    from openpyxl import load_workbook
 
+    sc = get_symbol_config(symbol)
+    temp_file = os.path.join(sc.target_directory, f"{sc.symbol}_TradeRecords_TMP.csv")
+    output_excel = os.path.join(sc.target_directory, f"{sc.symbol}_TradeList.xlsx")
 
-def generate_excel():
     print("\n--- Excel TradeList Generator ---\n")
 
-    if not os.path.exists(TEMP_FILE):
-        print("ERROR: Temp file not found:", TEMP_FILE)
+    if not os.path.exists(temp_file):
+        print("ERROR: Temp file not found:", temp_file)
         return
 
-    df = pd.read_csv(TEMP_FILE, parse_dates=["Entry_Date", "Exit_Date"])
+    df = pd.read_csv(temp_file, parse_dates=["Entry_Date", "Exit_Date"])
 
     if df.empty:
         print("No trades found. Excel not generated.")
@@ -51,16 +49,16 @@ def generate_excel():
 
     print("\nWriting Excel file...")
     print_progress_bar(0, 1, label="Writing Excel")
-    df.to_excel(OUTPUT_EXCEL, index=False)
+    df.to_excel(output_excel, index=False)
     print_progress_bar(1, 1, label="Writing Excel finished")
 
     # Freeze header
-    wb = load_workbook(OUTPUT_EXCEL)
+    wb = load_workbook(output_excel)
     ws = wb.active
     ws.freeze_panes = "A2"
-    wb.save(OUTPUT_EXCEL)
+    wb.save(output_excel)
 
-    print("\nExcel file created:", OUTPUT_EXCEL)
+    print("\nExcel file created:", output_excel)
 
 
 if __name__ == "__main__":
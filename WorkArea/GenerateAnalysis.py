@@ -8,31 +8,25 @@ import glob
 import warnings
 import numpy as np
 import pandas as pd
-import configparser
 
-from config_loader import load_config  # type: ignore
+import feature_store  # type: ignore
+import fo_analytics  # type: ignore
+import fo_contracts  # type: ignore
+import threshold_engine  # type: ignore
+import trading_calendar  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 
 # ======================================================================
-# CONFIG
+# CONFIG (resolved per call via get_symbol_config, nothing loaded at import)
 # ======================================================================
 
-cfg = load_config()
-
-TARGET_DIRECTORY = cfg.get("TARGET_DIRECTORY")
-SD_MULTIPLIER = float(cfg.get("SD_MULTIPLIER", 1.0))
-TRADING_QTY = cfg.get("TRADING_QTY", 0)
-SYMBOL = cfg.get("SYMBOL", "SYMBOL")
-CONFIG_PATH = cfg.get("CONFIG_PATH", None)
-
-if CONFIG_PATH is None:
-    CONFIG_PATH = os.path.join(os.getcwd(), "configProcess.ini")
-
-print("Using configuration (GenerateAnalysis.py):")
-print(" TARGET_DIRECTORY =", TARGET_DIRECTORY)
-print(" SD_MULTIPLIER   =", SD_MULTIPLIER)
-print(" TRADING_QTY     =", TRADING_QTY)
-print(" SYMBOL          =", SYMBOL)
-print(" CONFIG_PATH     =", CONFIG_PATH)
+def print_configuration(sc):
+    print("Using configuration (GenerateAnalysis.py):")
+    print(" TARGET_DIRECTORY =", sc.target_directory)
+    print(" SD_MULTIPLIER   =", sc.sd_multiplier)
+    print(" TRADING_QTY     =", sc.trading_qty)
+    print(" SYMBOL          =", sc.symbol)
+    print(" THRESHOLD_MODE  =", sc.threshold_mode)
 
 # ======================================================================
 # CONSTANTS
@@ -147,7 +141,7 @@ def get_directional_signal_with_sd(series, multiplier):
 # BUILD BASE DATAFRAME
 # ======================================================================
 
-def build_base_dataframe(target_directory, sd_multiplier):
+def build_base_dataframe(target_directory, sd_multiplier, symbol=None, contract_mode=None):
 
     # ------------------- EQUITY -------------------
     eq_files = glob.glob(os.path.join(target_directory, "Quote-Equity-*.csv"))
@@ -197,34 +191,38 @@ def build_base_dataframe(target_directory, sd_multiplier):
         for fn in fao_files:
             df = pd.read_csv(fn, encoding="utf-8-sig")
             df = _clean_dataframe(df, DATE_COL_CANDIDATES)
-            fao_list.append(df)
+            fao_list.append(df[[c for c in df.columns if c in fo_contracts.CONTRACT_COLS]])
         fao = pd.concat(fao_list, ignore_index=True)
 
         for c in ["Volume", "OPEN_INTEREST"]:
             if c in fao.columns:
                 fao[c] = clean_numeric(fao[c])
 
-        aggregated = (
-            fao.groupby("DATE")
-            .agg({"Volume": "sum", "OPEN_INTEREST": "sum"})
-            .reset_index()
-        )
-        aggregated.rename(columns={
-            "Volume": "Daily_F&O_Volume_Sum",
-            "OPEN_INTEREST": "Daily_Open_Interest_Sum"
-        }, inplace=True)
+        # Overlapping downloads repeat contract-days: keep one row per contract key
+        if contract_mode is None:
+            contract_mode = get_symbol_config(symbol).fo_contracts if symbol else "all"
+        contracts = fo_contracts.deduplicate_contracts(fo_contracts.normalize_contracts(fao))
+        aggregated = fo_contracts.daily_totals(fo_contracts.select_contracts(contracts, contract_mode))
+        # Expiry / contract-type split of all contracts (rollover, PCR, ...)
+        fo_daily = fo_analytics.daily_analytics(contracts)
     else:
         aggregated = pd.DataFrame(
             columns=["DATE", "Daily_F&O_Volume_Sum", "Daily_Open_Interest_Sum"]
         )
+        fo_daily = fo_analytics.daily_analytics(pd.DataFrame())
 
     # ------------------- MERGE -------------------
-    for df in [equity_df, delivery_df, aggregated]:
+    for df in [equity_df, delivery_df, aggregated, fo_daily]:
         if "DATE" in df.columns:
             df["DATE"] = pd.to_datetime(df["DATE"], errors="coerce")
 
-    df = equity_df.merge(aggregated, on="DATE", how="left")
-    df = df.merge(delivery_df, on="DATE", how="left")
+    # One calendar index per date; the joins are lookups on it
+    calendar = trading_calendar.TradingCalendar.from_dates(
+        equity_df["DATE"], aggregated["DATE"], delivery_df["DATE"]
+    )
+    df = trading_calendar.left_join(equity_df, aggregated, calendar=calendar)
+    df = trading_calendar.left_join(df, delivery_df, calendar=calendar)
+    df = trading_calendar.left_join(df, fo_daily, calendar=calendar)
 
     df["Daily_Open_Interest_Sum"] = clean_numeric(df.get("Daily_Open_Interest_Sum", 0))
     df[DELIVERY_QTY_FINAL_COL] = df[DELIVERY_QTY_FINAL_COL].fillna(0)
@@ -243,11 +241,10 @@ def build_base_dataframe(target_directory, sd_multiplier):
     df[EQUITY_CLOSE_PRICE_COL] = clean_numeric(df[EQUITY_CLOSE_PRICE_COL])
 
     # ------------------- PRICE CHANGE -------------------
-    prev_close = df[EQUITY_CLOSE_PRICE_COL].shift(1)
-    df[PRICE_CHANGE_COL] = (
-        (df[EQUITY_CLOSE_PRICE_COL] - prev_close) /
-        prev_close.replace(0, np.nan) * 100
-    )
+    # Derived indicators come from the per-symbol feature store
+    store = (feature_store.open_store(target_directory, symbol, df) if symbol
+             else feature_store.FeatureStore(df))
+    df[PRICE_CHANGE_COL] = store.get("change_pct", col=EQUITY_CLOSE_PRICE_COL)
 
     # ------------------- DELIVERY VALUE -------------------
     del_qty = clean_numeric(df[DELIVERY_QTY_FINAL_COL])
@@ -256,23 +253,12 @@ def build_base_dataframe(target_directory, sd_multiplier):
     df[DELIVERY_VALUE_COL] = df["Del_Inter"] / 10000000
 
     # ------------------- OI CHANGE -------------------
-    prev_oi = df["Daily_Open_Interest_Sum"].shift(1)
-    df[OI_CHANGE_COL] = (
-        (df["Daily_Open_Interest_Sum"] - prev_oi) /
-        prev_oi.replace(0, 1e-6) * 100
-    )
-    df["Absolute_OI_Change"] = df["Daily_Open_Interest_Sum"] - prev_oi
+    df[OI_CHANGE_COL] = store.get("change_pct", col="Daily_Open_Interest_Sum", zero_as=1e-6)
+    df["Absolute_OI_Change"] = store.get("diff", col="Daily_Open_Interest_Sum")
 
     # ------------------- 5D AVERAGE DELIVERY -------------------
-    df[NEW_5DAD_COL] = (
-        df[DELIVERY_VALUE_COL].shift(1).rolling(window=5, min_periods=5).mean()
-    )
-
-    df[REL_DELIVERY_COL] = np.where(
-        df[NEW_5DAD_COL] != 0,
-        (df[DELIVERY_VALUE_COL] / df[NEW_5DAD_COL]) * 100,
-        np.nan,
-    )
+    df[NEW_5DAD_COL] = store.get("lagged_mean", col=DELIVERY_VALUE_COL, window=5)
+    df[REL_DELIVERY_COL] = store.get("rel_to_lagged_mean", col=DELIVERY_VALUE_COL, window=5)
 
     # ------------------- DIRECTIONAL SIGNALS -------------------
     df["Price_Dir"], _ = get_directional_signal_with_sd(df[PRICE_CHANGE_COL], sd_multiplier)
@@ -295,38 +281,37 @@ def build_base_dataframe(target_directory, sd_multiplier):
 # LOAD THRESHOLDS
 # ======================================================================
 
-def load_thresholds_from_config():
-    parser = configparser.ConfigParser()
-    if not os.path.exists(CONFIG_PATH):
-        return {}
-
-    parser.read(CONFIG_PATH)
-    section = f"THRESHOLDS_{SYMBOL}"
-
-    if not parser.has_section(section):
-        return {}
-
-    out = {}
-    for k, v in parser.items(section):
-        try:
-            out[k] = float(v)
-        except:
-            pass
-
-    return out
+def load_thresholds_from_config(symbol=None):
+    """
+    Thresholds for `symbol` (default [PATHS] symbol) from the per-symbol threshold
+    store (falls back to the legacy [THRESHOLDS_<SYMBOL>] section in
+    configProcess.ini).
+    """
+    return dict(get_symbol_config(symbol).thresholds)
 
 # ======================================================================
 # APPLY THRESHOLDS (with Correct Short Logic + Correct Date Ordering)
 # ======================================================================
 
-def apply_thresholds_and_generate_files(target_directory, sd_multiplier):
+def apply_thresholds_and_generate_files(target_directory, sd_multiplier, symbol=None):
 
-    df = build_base_dataframe(target_directory, sd_multiplier)
+    sc = get_symbol_config(symbol)
+
+    df = build_base_dataframe(target_directory, sd_multiplier, sc.symbol)
 
     # ------------------- IMPORTANT: SORT ASCENDING FOR CUMSUM -------------------
     df = df.sort_values("DATE").reset_index(drop=True)
 
-    thr = load_thresholds_from_config()
+    if sc.threshold_mode in ("rolling", "expanding"):
+        # Per-date thresholds from past days only (no look-ahead)
+        window = sc.threshold_window if sc.threshold_mode == "rolling" else None
+        thr_df = threshold_engine.rolling_thresholds(
+            df, window=window, min_periods=sc.threshold_min_periods
+        )
+        df = pd.concat([df, thr_df], axis=1)
+        thr = {c[len(threshold_engine.ROLLING_PREFIX):]: df[c] for c in thr_df.columns}
+    else:
+        thr = load_thresholds_from_config(sc.symbol)
 
     price_long  = thr.get("price_long")
     del_long    = thr.get("del_long")
@@ -393,12 +378,12 @@ def apply_thresholds_and_generate_files(target_directory, sd_multiplier):
     df = df.sort_values("DATE", ascending=True).reset_index(drop=True)
 
     # ------------------- SAVE CSV -------------------
-    csv_path = os.path.join(target_directory, f"{SYMBOL}_Analysis.csv")
+    csv_path = os.path.join(target_directory, f"{sc.symbol}_Analysis.csv")
     df.to_csv(csv_path, index=False)
     print("Saved CSV:", csv_path)
 
     # ------------------- SAVE EXCEL -------------------
-    xlsx_path = os.path.join(target_directory, f"{SYMBOL}_Analysis_Excel.xlsx")
+    xlsx_path = os.path.join(target_directory, f"{sc.symbol}_Analysis_Excel.xlsx")
     try:
         with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
             df.to_excel(writer, index=False, sheet_name="Analysis")
@@ -429,5 +414,8 @@ if __name__ == "__main__":
     pd.set_option("display.width", 1400)
     pd.set_option("display.float_format", "{:.2f}".format)
 
-    df = apply_thresholds_and_generate_files(TARGET_DIRECTORY, SD_MULTIPLIER)
+    sc = get_symbol_config()
+    print_configuration(sc)
+
+    df = apply_thresholds_and_generate_files(sc.target_directory, sc.sd_multiplier, sc.symbol)
     print("Rows:", len(df))
@@ -1,26 +1,18 @@
 # GenerateMLTrades.py
 import os
-import math
 from typing import List, Tuple
-import pickle
 
 import numpy as np
 import pandas as pd
 
-from config_loader import load_config  # type: ignore
+import cost_model  # type: ignore
+import execution_core  # type: ignore
+import feature_store  # type: ignore
+import model_registry  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 
 # ---------------- CONFIG / CONSTANTS ---------------- #
-
-cfg = load_config()
-
-TARGET_DIR = cfg["TARGET_DIRECTORY"]
-INVESTMENT_AMOUNT = cfg["INVESTMENT_AMOUNT"]
-SYMBOL = cfg["SYMBOL"]
-
-ANALYSIS_FILE_NAME = f"{SYMBOL}_Analysis.csv"
-INPUT_FILE = os.path.join(TARGET_DIR, ANALYSIS_FILE_NAME)
-OUTPUT_FILE = os.path.join(TARGET_DIR, f"{SYMBOL}_Trades_ML.csv")
-MODEL_FILE = os.path.join(TARGET_DIR, f"MODEL_{SYMBOL}.pkl")
+# Paths and INVESTMENT_AMOUNT are resolved per symbol at run time.
 
 DATE_COL = "DATE"
 OPEN_COL = "OPEN"          # from *_Analysis.csv
@@ -33,6 +25,7 @@ OI_SUM_COL = "Daily_Open_Interest_Sum"
 # Class mapping (must match TrainMLModel.py)
 CLASS_MAP = {-1: 0, 0: 1, 1: 2}
 INV_CLASS_MAP = {v: k for k, v in CLASS_MAP.items()}
+SIGNAL_NAMES = np.array(["SELL", "HOLD", "BUY"], dtype=object)  # index = signal code + 1
 
 
 # ------------------------------------------------------------------------------------
@@ -80,61 +73,14 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 # ------------------------------------------------------------------------------------
 # FEATURE ENGINEERING
 # ------------------------------------------------------------------------------------
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
+def add_features(df: pd.DataFrame, store=None) -> pd.DataFrame:
     """
     Build ML features from price, VWAP, OI, longs, shorts etc.
     All features are based on current and past data only (no lookahead).
+    Indicators come from the feature store (feature_store.add_ml_features);
+    pass a disk-backed store to reuse them across runs.
     """
-    # Returns
-    df["ret_1"] = df[CLOSE_COL].pct_change().fillna(0.0)
-    df["ret_3"] = df[CLOSE_COL].pct_change(3).fillna(0.0)
-    df["ret_5"] = df[CLOSE_COL].pct_change(5).fillna(0.0)
-
-    # Volatility (10-day rolling std of 1-day returns)
-    df["vol_10"] = df["ret_1"].rolling(10).std().fillna(0.0)
-
-    # EMAs
-    df["ema_10"] = df[CLOSE_COL].ewm(span=10, adjust=False).mean()
-    df["ema_20"] = df[CLOSE_COL].ewm(span=20, adjust=False).mean()
-    df["ema_50"] = df[CLOSE_COL].ewm(span=50, adjust=False).mean()
-
-    # Gaps vs EMA
-    df["gap_ema10"] = (df[CLOSE_COL] - df["ema_10"]) / df["ema_10"]
-    df["gap_ema20"] = (df[CLOSE_COL] - df["ema_20"]) / df["ema_20"]
-    df["gap_ema50"] = (df[CLOSE_COL] - df["ema_50"]) / df["ema_50"]
-
-    # VWAP gap (if available)
-    if VWAP_COL in df.columns:
-        df["gap_vwap"] = (df[CLOSE_COL] - df[VWAP_COL]) / df[VWAP_COL]
-    else:
-        df["gap_vwap"] = 0.0
-
-    # OI-based features
-    df["long_diff"] = df[LONG_TILL_NOW_COL].diff().fillna(0.0)
-    df["short_diff"] = df[SHORT_TILL_NOW_COL].diff().fillna(0.0)
-    df["oi_diff"] = df[OI_SUM_COL].diff().fillna(0.0)
-
-    total_ls = df[LONG_TILL_NOW_COL] + df[SHORT_TILL_NOW_COL] + 1e-6
-    df["long_ratio"] = df[LONG_TILL_NOW_COL] / total_ls
-    df["short_ratio"] = df[SHORT_TILL_NOW_COL] / total_ls
-
-    # Rolling OI trend (5-day change)
-    df["long_5ch"] = df[LONG_TILL_NOW_COL].pct_change(5).fillna(0.0)
-    df["short_5ch"] = df[SHORT_TILL_NOW_COL].pct_change(5).fillna(0.0)
-
-    # Replace inf / NaN in features
-    feature_cols = [
-        "ret_1", "ret_3", "ret_5",
-        "vol_10",
-        "gap_ema10", "gap_ema20", "gap_ema50", "gap_vwap",
-        "long_diff", "short_diff", "oi_diff",
-        "long_ratio", "short_ratio",
-        "long_5ch", "short_5ch"
-    ]
-    for col in feature_cols:
-        df[col] = df[col].replace([np.inf, -np.inf], 0.0).fillna(0.0)
-
-    return df
+    return feature_store.add_ml_features(df, store)
 
 
 def build_labels(df: pd.DataFrame,
@@ -161,7 +107,8 @@ def build_labels(df: pd.DataFrame,
     return df
 
 
-def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+def get_feature_matrix(df: pd.DataFrame, sc=None) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+    """The 15 base features, plus the F&O ones when sc.fo_features is on."""
     feature_cols = [
         "ret_1", "ret_3", "ret_5",
         "vol_10",
@@ -169,7 +116,7 @@ def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, List[
         "long_diff", "short_diff", "oi_diff",
         "long_ratio", "short_ratio",
         "long_5ch", "short_5ch"
-    ]
+    ] + feature_store.fo_feature_cols(df, sc)
     X = df[feature_cols].copy()
     y = df["Label"].copy()
     return X, y, feature_cols
@@ -178,63 +125,48 @@ def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, List[
 # ------------------------------------------------------------------------------------
 # LOAD TRAINED MODEL
 # ------------------------------------------------------------------------------------
-def load_trained_model():
-    if not os.path.exists(MODEL_FILE):
-        raise FileNotFoundError(f"Trained model file not found: {MODEL_FILE}")
-
-    with open(MODEL_FILE, "rb") as f:
-        bundle = pickle.load(f)
-
-    model = bundle.get("model")
-    feature_cols = bundle.get("feature_cols")
-
-    if model is None or feature_cols is None:
-        raise ValueError("Invalid model bundle: missing 'model' or 'feature_cols'.")
-
-    return model, feature_cols
+def load_trained_model(registry_dir: str, symbol: str, as_of=None):
+    """
+    Load only the booster of the registry version trained before `as_of`
+    (latest version when as_of is None). Returns (booster, feature_cols).
+    """
+    booster, meta = model_registry.load_model(registry_dir, symbol, as_of=as_of)
+    return booster, meta["feature_cols"]
 
 
 # ------------------------------------------------------------------------------------
 # TRADING STRATEGY BASED ON MODEL PREDICTIONS
 # ------------------------------------------------------------------------------------
 def simulate_trades_with_model(df: pd.DataFrame,
-                               model,
-                               X: pd.DataFrame,
+                               proba: np.ndarray,
                                prob_long: float = 0.55,
-                               prob_short: float = 0.55) -> pd.DataFrame:
+                               prob_short: float = 0.55,
+                               investment_amount: float = None,
+                               costs: cost_model.CostModel = None) -> pd.DataFrame:
     """
-    Use model predictions to generate trades.
+    Use model predictions (class probabilities per row, columns ordered as
+    CLASS_MAP values) to generate trades.
 
     Timeline:
       - On day t, model uses day-t data → produces ML_Signal[t].
       - That signal is executed at **OPEN of day t+1**.
       - Quantities are sized using **compounding capital on trade close only**:
             qty = floor(dynamic_capital / next_day_open)
-        where dynamic_capital starts at INVESTMENT_AMOUNT and is updated **only
+        where dynamic_capital starts at investment_amount (default: the
+        configured INVESTMENT_AMOUNT) and is updated **only
         when a trade is closed** (including reversals).
       - P&L is still computed close-to-close using the position effective for that day.
+      - costs (cost_model.CostModel) rounds quantities to lots and charges
+        every order (Trade_Cost and its components per row).
+    Execution runs in execution_core.run_backtest.
     """
 
     df = df.copy()
 
-    proba = model.predict_proba(X)
-    pred_class_mapped = np.argmax(proba, axis=1)
-    pred_conf = proba.max(axis=1)
-    pred_label = np.array([INV_CLASS_MAP[c] for c in pred_class_mapped])
-
-    df.loc[:, "ML_Label"] = pred_label
-    df.loc[:, "ML_Conf"] = pred_conf
-
-    # Convert label + confidence into trading signal
-    signals = []
-    for lbl, conf in zip(pred_label, pred_conf):
-        if lbl == 1 and conf >= prob_long:
-            signals.append("BUY")
-        elif lbl == -1 and conf >= prob_short:
-            signals.append("SELL")
-        else:
-            signals.append("HOLD")
-    df.loc[:, "ML_Signal"] = signals
+    strategy = execution_core.ProbaThreshold(proba, prob_long, prob_short)
+    df.loc[:, "ML_Label"] = np.array([INV_CLASS_MAP[c] for c in np.argmax(proba, axis=1)])
+    df.loc[:, "ML_Conf"] = proba.max(axis=1)
+    df.loc[:, "ML_Signal"] = SIGNAL_NAMES[strategy.signals() + 1]
 
     if OPEN_COL not in df.columns:
         raise KeyError(f"Required column '{OPEN_COL}' (open price) not found for trade execution.")
@@ -243,94 +175,22 @@ def simulate_trades_with_model(df: pd.DataFrame,
     df.loc[:, OPEN_COL] = pd.to_numeric(df[OPEN_COL], errors="coerce").ffill()
     df.loc[:, CLOSE_COL] = pd.to_numeric(df[CLOSE_COL], errors="coerce").ffill()
 
-    n = len(df)
-    quantity_traded = np.zeros(n, dtype=float)
-    position_arr = np.zeros(n, dtype=float)
-
-    # Dynamic compounding capital (updated only when trade closes)
-    dynamic_capital = float(INVESTMENT_AMOUNT)
-
-    # Track entry price & qty of current trade for realized PnL
-    entry_exec_price = None  # open price at entry
-    entry_qty = 0.0          # absolute quantity (positive)
-
-    position = 0.0
-
-    signals_arr = df["ML_Signal"].to_numpy()
-    opens = df[OPEN_COL].to_numpy()
-
-    # Day 0: no prior signal to trade on; remains flat
-    position_arr[0] = 0.0
-    quantity_traded[0] = 0.0
+    if investment_amount is None:
+        investment_amount = get_symbol_config().investment_amount
 
     # ---------------- TRADE EXECUTION WITH COMPOUNDING ---------------- #
-    for t in range(1, n):
-        signal_prev = signals_arr[t - 1]
-        exec_price = opens[t]
-        qty_trade = 0.0
-
-        # ----- 1) EXIT / FLATTEN at today's open based on yesterday's signal -----
-        if position > 0 and signal_prev in ["SELL", "HOLD"]:
-            # Closing LONG at exec_price
-            if entry_exec_price is not None and entry_qty > 0:
-                trade_pnl = (exec_price - entry_exec_price) * entry_qty
-                dynamic_capital += trade_pnl
-                if dynamic_capital < 0:
-                    dynamic_capital = 0.0
-
-            qty_trade += -position
-            position = 0.0
-            entry_exec_price = None
-            entry_qty = 0.0
-
-        elif position < 0 and signal_prev in ["BUY", "HOLD"]:
-            # Closing SHORT at exec_price
-            if entry_exec_price is not None and entry_qty > 0:
-                trade_pnl = (entry_exec_price - exec_price) * entry_qty
-                dynamic_capital += trade_pnl
-                if dynamic_capital < 0:
-                    dynamic_capital = 0.0
-
-            qty_trade += -position
-            position = 0.0
-            entry_exec_price = None
-            entry_qty = 0.0
-
-        # ----- 2) ENTRY at today's open (only if flat) -----
-        if position == 0.0 and exec_price > 0:
-            if signal_prev == "BUY":
-                qty = math.floor(dynamic_capital / exec_price)
-                if qty > 0:
-                    qty_trade += qty
-                    position = qty
-                    entry_exec_price = exec_price
-                    entry_qty = qty  # positive
-
-            elif signal_prev == "SELL":
-                qty = math.floor(dynamic_capital / exec_price)
-                if qty > 0:
-                    qty_trade += -qty
-                    position = -qty
-                    entry_exec_price = exec_price
-                    entry_qty = qty  # absolute qty
-
-        quantity_traded[t] = qty_trade
-        position_arr[t] = position
-
-    df.loc[:, "Quantity_Traded"] = quantity_traded
-    df.loc[:, "Position"] = position_arr
-
-    # ---------------- P&L CALCULATION ---------------- #
-    # Position is effective for the day; PnL is close-to-close using today's position
-    df.loc[:, "Prev_Close"] = df[CLOSE_COL].shift(1).ffill()
-    df.loc[:, "Daily_PnL"] = (df[CLOSE_COL] - df["Prev_Close"]) * df["Position"]
-
-    # First day has no PnL
-    if len(df) > 0:
-        first_idx = df.index[0]
-        df.loc[first_idx, "Daily_PnL"] = 0.0
+    result = execution_core.run_backtest(
+        df, strategy, execution_core.ExecutionSettings(investment_amount=float(investment_amount)),
+        costs=costs,
+    )
 
-    df.loc[:, "Cumulative_PnL"] = df["Daily_PnL"].cumsum()
+    df.loc[:, "Quantity_Traded"] = result["Quantity_Traded"]
+    df.loc[:, "Position"] = result["Position"]
+    df.loc[:, "Prev_Close"] = df[CLOSE_COL].shift(1).ffill()
+    cost_cols = [c for c in cost_model.COST_COLUMNS if c in result.columns]
+    df[cost_cols] = result[cost_cols]
+    df.loc[:, "Daily_PnL"] = result["Daily_PnL"]
+    df.loc[:, "Cumulative_PnL"] = result["Cumulative_PnL"]
 
     return df
 
@@ -338,21 +198,26 @@ def simulate_trades_with_model(df: pd.DataFrame,
 # ------------------------------------------------------------------------------------
 # MAIN PIPELINE
 # ------------------------------------------------------------------------------------
-def run_trading_pipeline():
+def run_trading_pipeline(symbol: str = None):
+    sc = get_symbol_config(symbol)
+    input_file = sc.analysis_file
+    output_file = os.path.join(sc.target_directory, f"{sc.symbol}_Trades_ML.csv")
+    registry_dir = model_registry.registry_directory(sc.target_directory)
+
     print(f"--- ML-based F&O Trade Generation (XGBoost) ---")
-    print(f"Input Data: {INPUT_FILE}")
-    print(f"Model File: {MODEL_FILE}")
+    print(f"Input Data: {input_file}")
+    print(f"Model Registry: {registry_dir}")
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERROR: Input file not found: {INPUT_FILE}")
+    if not os.path.exists(input_file):
+        print(f"ERROR: Input file not found: {input_file}")
         return
 
-    if not os.path.exists(MODEL_FILE):
-        print(f"ERROR: Trained model file not found: {MODEL_FILE}")
-        print("Run TrainMLModel.py first to train and save the model.")
+    if not model_registry.list_versions(registry_dir, sc.symbol):
+        print(f"ERROR: No trained model versions for {sc.symbol} in: {registry_dir}")
+        print("Run MLTrainer.py first to train and save the model.")
         return
 
-    df_raw = pd.read_csv(INPUT_FILE, thousands=",")
+    df_raw = pd.read_csv(input_file, thousands=",")
     df_clean = clean_data(df_raw.copy())
     if df_clean.empty:
         print("ERROR: Data empty after cleaning.")
@@ -360,19 +225,20 @@ def run_trading_pipeline():
 
     print(f"Rows after cleaning: {len(df_clean)}")
 
-    df_feat = add_features(df_clean.copy())
-    df_labeled = build_labels(df_feat.copy(), up_thresh=0.002, down_thresh=-0.002)
-
-    X, y, _ = get_feature_matrix(df_labeled)
-
-    model, feature_cols_model = load_trained_model()
+    df_feat = df_clean.copy()
+    df_feat = add_features(df_feat, feature_store.open_store(sc.target_directory, sc.symbol, df_feat))
+    df_labeled = build_labels(df_feat.copy(), up_thresh=sc.label_up_thresh, down_thresh=sc.label_down_thresh)
 
-    # Ensure we use the exact feature order used during training
-    X = df_labeled[feature_cols_model].copy()
+    # Each row is scored by the latest version trained before its date
+    # (exact training feature order comes from the version metadata)
+    proba, versions = model_registry.predict_proba_by_date(registry_dir, sc.symbol, df_labeled)
+    print(f"Model versions used: {', '.join(versions.unique())}")
 
     df_trades = simulate_trades_with_model(
-        df_labeled, model, X,
-        prob_long=0.55, prob_short=0.55
+        df_labeled, proba,
+        prob_long=0.55, prob_short=0.55,
+        investment_amount=sc.investment_amount,
+        costs=sc.cost_model,
     )
 
     # Build final output with familiar structure
@@ -390,10 +256,11 @@ def run_trading_pipeline():
     ]
     output_cols = [c for c in output_cols if c in df_trades.columns]
 
-    df_trades.to_csv(OUTPUT_FILE, index=False)
+    df_trades.to_csv(output_file, index=False)
 
-    print(f"\n✔ Saved ML trade file: {OUTPUT_FILE}")
+    print(f"\n✔ Saved ML trade file: {output_file}")
     print(f"Final PnL (ML strategy): {df_trades['Cumulative_PnL'].iloc[-1]:,.2f}")
+    print(cost_model.format_summary(df_trades))
 
 
 if __name__ == "__main__":
@@ -1,24 +1,15 @@
 # GenerateMLTrades_WF.py
 import os
-import math
+import sys
 import numpy as np
 import pandas as pd
 
-from config_loader import load_config  # type: ignore
+import cost_model  # type: ignore
+import execution_core  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 
 # ---------------- CONFIG / CONSTANTS ---------------- #
-
-cfg = load_config()
-
-TARGET_DIR = cfg["TARGET_DIRECTORY"]
-INVESTMENT_AMOUNT = cfg["INVESTMENT_AMOUNT"]
-SYMBOL = cfg["SYMBOL"]
-
-ANALYSIS_FILE_NAME = f"{SYMBOL}_Analysis.csv"
-INPUT_FILE = os.path.join(TARGET_DIR, ANALYSIS_FILE_NAME)
-
-WF_PRED_FILE = os.path.join(TARGET_DIR, f"{SYMBOL}_ML_WF_Predictions.csv")
-OUTPUT_FILE = os.path.join(TARGET_DIR, f"{SYMBOL}_Trades_ML_WF.csv")
+# Paths and INVESTMENT_AMOUNT are resolved per symbol at run time.
 
 DATE_COL = "DATE"
 OPEN_COL = "OPEN"          # from *_Analysis.csv
@@ -74,14 +65,20 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 # ------------------------------------------------------------------------------------
 # TRADE SIMULATION (FROM ML_Signal, NO MODEL HERE)
 # ------------------------------------------------------------------------------------
-def simulate_trades_from_signals(df: pd.DataFrame) -> pd.DataFrame:
+def simulate_trades_from_signals(df: pd.DataFrame,
+                                 investment_amount: float = None,
+                                 costs: cost_model.CostModel = None) -> pd.DataFrame:
     """
     Use precomputed ML_Signal (BUY/SELL/HOLD) to generate trades.
 
     Timeline:
       - On day t, ML_Signal[t] is based on a model trained only on data < t.
       - That signal is executed at **OPEN of day t+1**.
-      - Quantities are sized using **compounding capital on trade close only**.
+      - Quantities are sized using **compounding capital on trade close only**,
+        starting from investment_amount (default: the configured INVESTMENT_AMOUNT).
+      - costs (cost_model.CostModel) rounds quantities to lots and charges
+        every order (Trade_Cost and its components per row).
+    Execution runs in execution_core.run_backtest.
     """
     df = df.copy()
 
@@ -92,94 +89,23 @@ def simulate_trades_from_signals(df: pd.DataFrame) -> pd.DataFrame:
     df.loc[:, OPEN_COL] = pd.to_numeric(df[OPEN_COL], errors="coerce").ffill()
     df.loc[:, CLOSE_COL] = pd.to_numeric(df[CLOSE_COL], errors="coerce").ffill()
 
-    n = len(df)
-    quantity_traded = np.zeros(n, dtype=float)
-    position_arr = np.zeros(n, dtype=float)
-
-    # Dynamic compounding capital (updated only when trade closes)
-    dynamic_capital = float(INVESTMENT_AMOUNT)
-
-    # Track entry price & qty of current trade for realized PnL
-    entry_exec_price = None  # open price at entry
-    entry_qty = 0.0          # absolute quantity (positive)
-
-    position = 0.0
-
-    signals_arr = df["ML_Signal"].to_numpy()
-    opens = df[OPEN_COL].to_numpy()
-
-    # Day 0: no prior signal to trade on; remains flat
-    position_arr[0] = 0.0
-    quantity_traded[0] = 0.0
+    if investment_amount is None:
+        investment_amount = get_symbol_config().investment_amount
 
     # ---------------- TRADE EXECUTION WITH COMPOUNDING ---------------- #
-    for t in range(1, n):
-        signal_prev = signals_arr[t - 1]
-        exec_price = opens[t]
-        qty_trade = 0.0
-
-        # ----- 1) EXIT / FLATTEN at today's open based on yesterday's signal -----
-        if position > 0 and signal_prev in ["SELL", "HOLD"]:
-            # Closing LONG at exec_price
-            if entry_exec_price is not None and entry_qty > 0:
-                trade_pnl = (exec_price - entry_exec_price) * entry_qty
-                dynamic_capital += trade_pnl
-                if dynamic_capital < 0:
-                    dynamic_capital = 0.0
-
-            qty_trade += -position
-            position = 0.0
-            entry_exec_price = None
-            entry_qty = 0.0
-
-        elif position < 0 and signal_prev in ["BUY", "HOLD"]:
-            # Closing SHORT at exec_price
-            if entry_exec_price is not None and entry_qty > 0:
-                trade_pnl = (entry_exec_price - exec_price) * entry_qty
-                dynamic_capital += trade_pnl
-                if dynamic_capital < 0:
-                    dynamic_capital = 0.0
-
-            qty_trade += -position
-            position = 0.0
-            entry_exec_price = None
-            entry_qty = 0.0
-
-        # ----- 2) ENTRY at today's open (only if flat) -----
-        if position == 0.0 and exec_price > 0:
-            if signal_prev == "BUY":
-                qty = math.floor(dynamic_capital / exec_price)
-                if qty > 0:
-                    qty_trade += qty
-                    position = qty
-                    entry_exec_price = exec_price
-                    entry_qty = qty  # positive
-
-            elif signal_prev == "SELL":
-                qty = math.floor(dynamic_capital / exec_price)
-                if qty > 0:
-                    qty_trade += -qty
-                    position = -qty
-                    entry_exec_price = exec_price
-                    entry_qty = qty  # absolute qty
-
-        quantity_traded[t] = qty_trade
-        position_arr[t] = position
-
-    df.loc[:, "Quantity_Traded"] = quantity_traded
-    df.loc[:, "Position"] = position_arr
-
-    # ---------------- P&L CALCULATION ---------------- #
-    # Position is effective for the day; PnL is close-to-close using today's position
+    result = execution_core.run_backtest(
+        df, execution_core.SignalColumn("ML_Signal"),
+        execution_core.ExecutionSettings(investment_amount=float(investment_amount)),
+        costs=costs,
+    )
+
+    df.loc[:, "Quantity_Traded"] = result["Quantity_Traded"]
+    df.loc[:, "Position"] = result["Position"]
     df.loc[:, "Prev_Close"] = df[CLOSE_COL].shift(1).ffill()
-    df.loc[:, "Daily_PnL"] = (df[CLOSE_COL] - df["Prev_Close"]) * df["Position"]
-
-    # First day has no PnL
-    if len(df) > 0:
-        first_idx = df.index[0]
-        df.loc[first_idx, "Daily_PnL"] = 0.0
-
-    df.loc[:, "Cumulative_PnL"] = df["Daily_PnL"].cumsum()
+    cost_cols = [c for c in cost_model.COST_COLUMNS if c in result.columns]
+    df[cost_cols] = result[cost_cols]
+    df.loc[:, "Daily_PnL"] = result["Daily_PnL"]
+    df.loc[:, "Cumulative_PnL"] = result["Cumulative_PnL"]
 
     return df
 
@@ -187,27 +113,34 @@ def simulate_trades_from_signals(df: pd.DataFrame) -> pd.DataFrame:
 # ------------------------------------------------------------------------------------
 # MAIN PIPELINE
 # ------------------------------------------------------------------------------------
-def run_trading_pipeline():
+def run_trading_pipeline(symbol: str = None, pooled: bool = False):
+    """pooled=True trades the PooledTrainer.py --wf predictions instead."""
+    sc = get_symbol_config(symbol)
+    input_file = sc.analysis_file
+    suffix = "_Pooled" if pooled else ""
+    wf_pred_file = os.path.join(sc.target_directory, f"{sc.symbol}_ML_WF{suffix}_Predictions.csv")
+    output_file = os.path.join(sc.target_directory, f"{sc.symbol}_Trades_ML_WF{suffix}.csv")
+
     print(f"--- ML-based F&O Trade Generation (WALK-FORWARD) ---")
-    print(f"Input Analysis File: {INPUT_FILE}")
-    print(f"WF Predictions File: {WF_PRED_FILE}")
+    print(f"Input Analysis File: {input_file}")
+    print(f"WF Predictions File: {wf_pred_file}")
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERROR: Input file not found: {INPUT_FILE}")
+    if not os.path.exists(input_file):
+        print(f"ERROR: Input file not found: {input_file}")
         return
 
-    if not os.path.exists(WF_PRED_FILE):
-        print(f"ERROR: Walk-forward prediction file not found: {WF_PRED_FILE}")
-        print("Run WalkForwardTrainer.py first.")
+    if not os.path.exists(wf_pred_file):
+        print(f"ERROR: Walk-forward prediction file not found: {wf_pred_file}")
+        print("Run PooledTrainer.py --wf first." if pooled else "Run WalkForwardTrainer.py first.")
         return
 
-    df_raw = pd.read_csv(INPUT_FILE, thousands=",")
+    df_raw = pd.read_csv(input_file, thousands=",")
     df_clean = clean_data(df_raw.copy())
     if df_clean.empty:
         print("ERROR: Data empty after cleaning.")
         return
 
-    preds = pd.read_csv(WF_PRED_FILE, parse_dates=[DATE_COL])
+    preds = pd.read_csv(wf_pred_file, parse_dates=[DATE_COL])
 
     # Make sure DATE is datetime in both
     df_clean[DATE_COL] = pd.to_datetime(df_clean[DATE_COL])
@@ -222,7 +155,7 @@ def run_trading_pipeline():
         print("ERROR: No overlapping dates between analysis and predictions.")
         return
 
-    df_trades = simulate_trades_from_signals(df)
+    df_trades = simulate_trades_from_signals(df, sc.investment_amount, sc.cost_model)
 
     # Build final output with familiar structure
     output_cols = [
@@ -239,11 +172,14 @@ def run_trading_pipeline():
     ]
     output_cols = [c for c in output_cols if c in df_trades.columns]
 
-    df_trades.to_csv(OUTPUT_FILE, index=False)
+    df_trades.to_csv(output_file, index=False)
 
-    print(f"\n✔ Saved WALK-FORWARD ML trade file: {OUTPUT_FILE}")
+    print(f"\n✔ Saved WALK-FORWARD ML trade file: {output_file}")
     print(f"Final PnL (WF ML strategy): {df_trades['Cumulative_PnL'].iloc[-1]:,.2f}")
+    print(cost_model.format_summary(df_trades))
 
 
 if __name__ == "__main__":
-    run_trading_pipeline()
+    # python GenerateMLTrades_WF.py [SYMBOL] [--pooled]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    run_trading_pipeline(args[0] if args else None, pooled="--pooled" in sys.argv)
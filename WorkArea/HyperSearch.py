@@ -0,0 +1,295 @@
+# HyperSearch.py
+"""
+Hyperparameter search over walk-forward backtests.
+
+Candidate configs (XGBoost params + symmetric label threshold) are scored by
+the backtest of their walk-forward signals (GenerateMLTrades_WF simulator),
+not by classification accuracy:
+
+  - halving: successive halving over RUNG_STEPS. Every config gets a cheap
+    walk-forward that retrains only every 20 days; the best 1/ETA move on to
+    a 5-day retrain, and the survivors of that to the full daily walk-forward.
+  - random:  every config gets the coarse walk-forward, the best PROMOTE_TOP
+    go straight to the full daily walk-forward.
+
+Trials run in parallel processes. The walk-forward probabilities of every
+(config, retrain step) are cached on disk (<target_dir>/hypersearch/<SYMBOL>/),
+keyed by config and data hash, so reruns and promoted configs reuse them.
+
+Usage: python HyperSearch.py [SYMBOL] [--method random|halving] [--trials N]
+                             [--workers N] [--objective sharpe|pnl]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import feature_store  # type: ignore
+import label_engine  # type: ignore
+from config_loader import XGB_FIXED_PARAMS, get_symbol_config  # type: ignore
+
+# ---------------- SEARCH SETTINGS ---------------- #
+# list -> choice, ("uniform" | "log", low, high) -> continuous
+SEARCH_SPACE = {
+    "n_estimators": [100, 200, 300, 500],
+    "max_depth": [3, 4, 5, 6],
+    "learning_rate": ("log", 0.01, 0.2),
+    "subsample": ("uniform", 0.6, 1.0),
+    "colsample_bytree": ("uniform", 0.6, 1.0),
+    "min_child_weight": [1, 3, 5, 10],
+    "label_thresh": [0.001, 0.002, 0.003, 0.005],
+}
+
+RUNG_STEPS = (20, 5, 1)   # retrain every N days; the last rung is the full daily WF
+ETA = 3                   # halving keeps the best 1/ETA of each rung
+PROMOTE_TOP = 3           # random search: configs promoted to the full WF
+DEFAULT_TRIALS = 27
+TRADING_DAYS = 252
+
+_DATA: Optional[dict] = None   # per-process search data (see _init_worker)
+
+
+# ------------------------------------------------------------------------------------
+# CONFIGS
+# ------------------------------------------------------------------------------------
+def baseline_config(sc) -> Dict[str, float]:
+    """The currently configured [ML] settings as a search config."""
+    return {
+        "n_estimators": sc.n_estimators,
+        "max_depth": sc.max_depth,
+        "learning_rate": sc.learning_rate,
+        "subsample": sc.subsample,
+        "colsample_bytree": sc.colsample_bytree,
+        "min_child_weight": sc.min_child_weight,
+        "label_thresh": sc.label_up_thresh,
+    }
+
+
+def sample_configs(n: int, seed: int = 42, first: Dict[str, float] = None) -> List[Dict[str, float]]:
+    """n random configs from SEARCH_SPACE (optionally starting with `first`)."""
+    rng = random.Random(seed)
+    configs = [dict(first)] if first else []
+    while len(configs) < n:
+        cfg = {}
+        for name, space in SEARCH_SPACE.items():
+            if isinstance(space, list):
+                cfg[name] = rng.choice(space)
+            elif space[0] == "log":
+                cfg[name] = round(math.exp(rng.uniform(math.log(space[1]), math.log(space[2]))), 4)
+            else:
+                cfg[name] = round(rng.uniform(space[1], space[2]), 3)
+        if cfg not in configs:
+            configs.append(cfg)
+    return configs
+
+
+def config_params(cfg: Dict[str, float], nthread: int = 0) -> dict:
+    params = dict(
+        XGB_FIXED_PARAMS,
+        max_depth=int(cfg["max_depth"]),
+        learning_rate=cfg["learning_rate"],
+        subsample=cfg["subsample"],
+        colsample_bytree=cfg["colsample_bytree"],
+        min_child_weight=cfg["min_child_weight"],
+    )
+    if nthread:
+        params["nthread"] = nthread
+    return params
+
+
+# ------------------------------------------------------------------------------------
+# DATA / WORKERS
+# ------------------------------------------------------------------------------------
+def load_search_data(symbol: str = None) -> dict:
+    """Features, label prices and trade prices, built once per process."""
+    import WalkForwardTrainer as wf  # type: ignore
+
+    sc = get_symbol_config(symbol)
+    df = wf.clean_data(pd.read_csv(sc.analysis_file, thousands=","))
+    df = wf.add_features(df, feature_store.open_store(sc.target_directory, sc.symbol, df))
+    _, feature_cols = wf.get_feature_matrix(df, sc)
+
+    X = wf.feature_array(df, feature_cols)
+    close = df[wf.CLOSE_COL].to_numpy(dtype=float)
+    open_ = df[wf.OPEN_COL].to_numpy(dtype=float) if wf.OPEN_COL in df.columns else None
+
+    h = hashlib.sha1()
+    h.update(X.tobytes())
+    h.update(close.tobytes())
+
+    trade_cols = [c for c in (wf.DATE_COL, wf.OPEN_COL, wf.CLOSE_COL) if c in df.columns]
+    return {
+        "symbol": sc.symbol,
+        "investment_amount": sc.investment_amount,
+        "costs": sc.cost_model,
+        "X": X,
+        "close": close,
+        "open": open_,
+        "sc": sc,
+        # label_thresh is searched; the rest of the label definition comes from [ML]
+        "label_spec": f"{sc.label_mode}|{sc.tb_profit_take}|{sc.tb_stop_loss}|{sc.tb_max_days}|{sc.tb_entry}",
+        "purge": label_engine.label_horizon(sc) - 1,
+        "trades": df[trade_cols].copy(),
+        "data_hash": h.hexdigest()[:16],
+    }
+
+
+def _init_worker(symbol: str, cache_dir: str, nthread: int) -> None:
+    global _DATA
+    _DATA = load_search_data(symbol)
+    _DATA["cache_dir"] = cache_dir
+    _DATA["nthread"] = nthread
+
+
+def _labels(data: dict, thresh: float) -> np.ndarray:
+    """Mapped classes (0 / 1 / 2 for -1 / 0 / +1) of the configured label mode at +/-thresh."""
+    labels, _ = label_engine.compute_label(data["sc"], data["close"], data["open"], thresh, -thresh)
+    return (labels + 1).astype(np.float32)
+
+
+def _cache_key(cfg: dict, step: int, data: dict, min_train: int) -> str:
+    payload = json.dumps({"cfg": cfg, "step": step, "data": data["data_hash"], "label": data["label_spec"],
+                          "min_train": min_train}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:20]
+
+
+def evaluate_config(cfg: dict, step: int, objective: str = "sharpe") -> dict:
+    """Walk-forward (cached) + backtest of one config at one retrain step."""
+    import WalkForwardTrainer as wf  # type: ignore
+    from GenerateMLTrades_WF import simulate_trades_from_signals  # type: ignore
+
+    data = _DATA
+    t0 = time.perf_counter()
+    key = _cache_key(cfg, step, data, wf.MIN_TRAIN_SIZE)
+    cache_file = os.path.join(data["cache_dir"], f"{key}.npz")
+
+    cached = os.path.exists(cache_file)
+    if cached:
+        with np.load(cache_file) as z:
+            idx, proba = z["idx"], z["proba"]
+    else:
+        y = _labels(data, cfg["label_thresh"])
+        idx, proba = wf.walk_forward_proba(
+            data["X"], y, config_params(cfg, data["nthread"]), int(cfg["n_estimators"]),
+            step=step, progress=False, purge=data["purge"],
+        )
+        tmp = cache_file + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp, idx=idx, proba=proba)
+        os.replace(tmp, cache_file)
+
+    cls = proba.argmax(axis=1)
+    conf = proba.max(axis=1)
+    signal = np.where((cls == wf.CLASS_MAP[1]) & (conf >= wf.PROB_LONG), "BUY",
+                      np.where((cls == wf.CLASS_MAP[-1]) & (conf >= wf.PROB_SHORT), "SELL", "HOLD"))
+
+    df = data["trades"].iloc[idx].reset_index(drop=True)
+    df["ML_Signal"] = signal
+    trades = simulate_trades_from_signals(df, data["investment_amount"], data["costs"])
+
+    daily = trades["Daily_PnL"].to_numpy(dtype=float)
+    sd = daily.std(ddof=1)
+    sharpe = float(daily.mean() / sd * math.sqrt(TRADING_DAYS)) if sd > 0 else 0.0
+    pnl = float(trades["Cumulative_PnL"].iloc[-1])
+
+    true_cls = _labels(data, cfg["label_thresh"])[idx]
+    return {
+        **cfg,
+        "step": step,
+        "pnl": pnl,
+        "sharpe": sharpe,
+        "score": sharpe if objective == "sharpe" else pnl,
+        "accuracy": float((cls == true_cls).mean()),
+        "n_pred": int(len(idx)),
+        "seconds": time.perf_counter() - t0,
+        "cached": cached,
+    }
+
+
+# ------------------------------------------------------------------------------------
+# SEARCH
+# ------------------------------------------------------------------------------------
+def run_search(symbol: str = None,
+               method: str = "halving",
+               n_trials: int = DEFAULT_TRIALS,
+               workers: int = None,
+               objective: str = "sharpe",
+               seed: int = 42) -> Optional[dict]:
+    sc = get_symbol_config(symbol)
+    if not os.path.exists(sc.analysis_file):
+        print(f"ERROR: Input file not found: {sc.analysis_file}")
+        return None
+
+    cache_dir = os.path.join(sc.target_directory, "hypersearch", sc.symbol)
+    os.makedirs(cache_dir, exist_ok=True)
+    trials_file = os.path.join(sc.target_directory, f"{sc.symbol}_HyperSearch.csv")
+
+    workers = workers or max(1, min(n_trials, (os.cpu_count() or 2) // 2))
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    steps = RUNG_STEPS if method == "halving" else (RUNG_STEPS[0], RUNG_STEPS[-1])
+
+    configs = sample_configs(n_trials, seed, first=baseline_config(sc))
+
+    print(f"--- HYPERPARAMETER SEARCH ({method}, objective={objective}) ---")
+    print(f"Symbol: {sc.symbol} | trials: {len(configs)} | workers: {workers} | retrain steps: {steps}")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(sc.symbol, cache_dir, nthread)) as pool:
+        for rung, step in enumerate(steps):
+            t0 = time.perf_counter()
+            results = list(pool.map(evaluate_config, configs, [step] * len(configs),
+                                    [objective] * len(configs)))
+            for r in results:
+                r["rung"] = rung
+            rows.extend(results)
+
+            ranked = sorted(results, key=lambda r: r["score"], reverse=True)
+            print(f"Rung {rung} (retrain every {step}d): {len(configs)} configs in "
+                  f"{time.perf_counter() - t0:.1f}s, best {objective} = {ranked[0]['score']:.3f}")
+
+            if rung == len(steps) - 1:
+                break
+            keep = math.ceil(len(ranked) / ETA) if method == "halving" else PROMOTE_TOP
+            configs = [{k: r[k] for k in SEARCH_SPACE} for r in ranked[:max(1, keep)]]
+
+    pd.DataFrame(rows).to_csv(trials_file, index=False)
+
+    best = ranked[0]
+    with open(os.path.join(cache_dir, "best.json"), "w") as f:
+        json.dump(best, f, indent=2)
+
+    print(f"\n✔ Trials saved to: {trials_file}")
+    print(f"Best (full daily WF): PnL {best['pnl']:,.2f} | Sharpe {best['sharpe']:.2f} | "
+          f"accuracy {best['accuracy']:.3f}")
+    print(f"\nTo use it, add to configProcess.ini:\n[SYMBOL_{sc.symbol}]")
+    for k in SEARCH_SPACE:
+        if k == "label_thresh":
+            print(f"label_up_thresh = {best[k]}\nlabel_down_thresh = {-best[k]}")
+        else:
+            print(f"{k} = {best[k]}")
+    return best
+
+
+def _arg(flag: str, default=None):
+    return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+
+if __name__ == "__main__":
+    flag_values = {_arg(f) for f in ("--method", "--trials", "--workers", "--objective")}
+    positional = [a for a in sys.argv[1:] if not a.startswith("--") and a not in flag_values]
+    run_search(
+        positional[0] if positional else None,
+        method=_arg("--method", "halving"),
+        n_trials=int(_arg("--trials", DEFAULT_TRIALS)),
+        workers=int(_arg("--workers")) if _arg("--workers") else None,
+        objective=_arg("--objective", "sharpe"),
+    )
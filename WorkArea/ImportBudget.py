@@ -0,0 +1,103 @@
+# ImportBudget.py
+"""
+Measures `python -X importtime` for each pipeline entry point and compares
+the cumulative import time against a budget.
+
+    python ImportBudget.py          -> table + exit code 1 if over budget
+
+Heavy libraries (xgboost, sklearn, plotly, openpyxl) must not show up here:
+they are imported inside the functions that use them. pandas / numpy are the
+floor for the data scripts.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+# module -> budget in milliseconds (cumulative import time)
+IMPORT_BUDGET_MS = {
+    "config_loader": 60,
+    "pipeline_state": 80,
+    "TradeAndPlot": 100,
+    "RunBackTest": 100,
+    "TrainML": 100,
+    "GenerateAnalysis": 900,
+    "GenerateThresholds": 900,
+    "MLTrainer": 900,
+    "WalkForwardTrainer": 900,
+    "GenerateMLTrades": 900,
+    "GenerateMLTrades_WF": 900,
+    "PlotChart": 900,
+    "ExcelGenerator": 900,
+}
+
+# Full "check for new data and exit" path: interpreter start + config + mtimes
+NO_NEW_DATA_BUDGET_MS = 200
+
+HEAVY_MODULES = ("xgboost", "sklearn", "plotly", "openpyxl")
+
+
+def measure_import(module: str):
+    """Return (cumulative_ms, set of top-level packages imported)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative_us = None
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[-1].strip()
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(parts[1].strip())
+
+    return (cumulative_us or 0) / 1000.0, packages
+
+
+def measure_no_new_data_path():
+    """
+    Wall time of a fresh interpreter running the has_new_data() check of
+    every pipeline; returns (ms, error output or None when it succeeded).
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import pipeline_state\n"
+         "for p in pipeline_state.PIPELINE_OUTPUTS: pipeline_state.has_new_data(p)"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    ms = (time.perf_counter() - start) * 1000.0
+    return ms, (result.stderr[-2000:] if result.returncode != 0 else None)
+
+
+def main() -> int:
+    failures = 0
+    print(f"{'entry point':24s} {'import ms':>10s} {'budget':>8s}  heavy deps")
+    for module, budget in IMPORT_BUDGET_MS.items():
+        ms, packages = measure_import(module)
+        heavy = sorted(p for p in packages if p in HEAVY_MODULES)
+        over = ms > budget or bool(heavy)
+        failures += over
+        flag = "  <-- OVER" if over else ""
+        print(f"{module:24s} {ms:10.1f} {budget:8d}  {', '.join(heavy) or '-'}{flag}")
+
+    ms, error = measure_no_new_data_path()
+    over = ms > NO_NEW_DATA_BUDGET_MS or error is not None
+    failures += over
+    print(f"\n'no new data' check: {ms:.1f} ms (budget {NO_NEW_DATA_BUDGET_MS} ms)"
+          f"{'  <-- FAILED' if error else '  <-- OVER' if over else ''}")
+    if error:
+        print(error)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,23 @@
 # TrainMLModel.py
 import os
-from typing import List, Tuple
-import pickle
+import sys
+import time
+from typing import TYPE_CHECKING, List, Tuple
 
-import numpy as np
 import pandas as pd
 
-from config_loader import load_config  # type: ignore
-from xgboost import XGBClassifier
-from sklearn.metrics import classification_report, confusion_matrix
+import label_engine  # type: ignore
+import attribution_store  # type: ignore
+import feature_store  # type: ignore
+import model_registry  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 
-# ---------------- CONFIG / CONSTANTS ---------------- #
-
-cfg = load_config()
-
-TARGET_DIR = cfg["TARGET_DIRECTORY"]
-SYMBOL = cfg["SYMBOL"]
+if TYPE_CHECKING:
+    from xgboost import Booster
 
-ANALYSIS_FILE_NAME = f"{SYMBOL}_Analysis.csv"
-INPUT_FILE = os.path.join(TARGET_DIR, ANALYSIS_FILE_NAME)
-MODEL_FILE = os.path.join(TARGET_DIR, f"MODEL_{SYMBOL}.pkl")
+# ---------------- CONFIG / CONSTANTS ---------------- #
+# Paths are resolved per symbol at run time (see run_training_pipeline);
+# xgboost / sklearn are imported only when a model is actually trained.
 
 DATE_COL = "DATE"
 OPEN_COL = "OPEN"          # from *_Analysis.csv
@@ -79,88 +77,18 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 # ------------------------------------------------------------------------------------
 # FEATURE ENGINEERING
 # ------------------------------------------------------------------------------------
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
+def add_features(df: pd.DataFrame, store=None) -> pd.DataFrame:
     """
     Build ML features from price, VWAP, OI, longs, shorts etc.
     All features are based on current and past data only (no lookahead).
+    Indicators come from the feature store (feature_store.add_ml_features);
+    pass a disk-backed store to reuse them across runs.
     """
-    # Returns
-    df["ret_1"] = df[CLOSE_COL].pct_change().fillna(0.0)
-    df["ret_3"] = df[CLOSE_COL].pct_change(3).fillna(0.0)
-    df["ret_5"] = df[CLOSE_COL].pct_change(5).fillna(0.0)
-
-    # Volatility (10-day rolling std of 1-day returns)
-    df["vol_10"] = df["ret_1"].rolling(10).std().fillna(0.0)
-
-    # EMAs
-    df["ema_10"] = df[CLOSE_COL].ewm(span=10, adjust=False).mean()
-    df["ema_20"] = df[CLOSE_COL].ewm(span=20, adjust=False).mean()
-    df["ema_50"] = df[CLOSE_COL].ewm(span=50, adjust=False).mean()
-
-    # Gaps vs EMA
-    df["gap_ema10"] = (df[CLOSE_COL] - df["ema_10"]) / df["ema_10"]
-    df["gap_ema20"] = (df[CLOSE_COL] - df["ema_20"]) / df["ema_20"]
-    df["gap_ema50"] = (df[CLOSE_COL] - df["ema_50"]) / df["ema_50"]
-
-    # VWAP gap (if available)
-    if VWAP_COL in df.columns:
-        df["gap_vwap"] = (df[CLOSE_COL] - df[VWAP_COL]) / df[VWAP_COL]
-    else:
-        df["gap_vwap"] = 0.0
-
-    # OI-based features
-    df["long_diff"] = df[LONG_TILL_NOW_COL].diff().fillna(0.0)
-    df["short_diff"] = df[SHORT_TILL_NOW_COL].diff().fillna(0.0)
-    df["oi_diff"] = df[OI_SUM_COL].diff().fillna(0.0)
-
-    total_ls = df[LONG_TILL_NOW_COL] + df[SHORT_TILL_NOW_COL] + 1e-6
-    df["long_ratio"] = df[LONG_TILL_NOW_COL] / total_ls
-    df["short_ratio"] = df[SHORT_TILL_NOW_COL] / total_ls
-
-    # Rolling OI trend (5-day change)
-    df["long_5ch"] = df[LONG_TILL_NOW_COL].pct_change(5).fillna(0.0)
-    df["short_5ch"] = df[SHORT_TILL_NOW_COL].pct_change(5).fillna(0.0)
-
-    # Replace inf / NaN in features
-    feature_cols = [
-        "ret_1", "ret_3", "ret_5",
-        "vol_10",
-        "gap_ema10", "gap_ema20", "gap_ema50", "gap_vwap",
-        "long_diff", "short_diff", "oi_diff",
-        "long_ratio", "short_ratio",
-        "long_5ch", "short_5ch"
-    ]
-    for col in feature_cols:
-        df[col] = df[col].replace([np.inf, -np.inf], 0.0).fillna(0.0)
-
-    return df
-
-
-def build_labels(df: pd.DataFrame,
-                 up_thresh: float = 0.002,
-                 down_thresh: float = -0.002) -> pd.DataFrame:
-    """
-    Multi-class labels:
-      +1 -> next-day return > up_thresh
-       0 -> between down_thresh and up_thresh
-      -1 -> next-day return < down_thresh
-    """
-    future_ret = df[CLOSE_COL].shift(-1) / df[CLOSE_COL] - 1.0
-    df["future_ret"] = future_ret
-
-    labels = np.zeros(len(df), dtype=int)
-
-    labels[future_ret > up_thresh] = 1
-    labels[future_ret < down_thresh] = -1
+    return feature_store.add_ml_features(df, store)
 
-    df["Label"] = labels
 
-    # Drop last row (no future_ret)
-    df = df.iloc[:-1].copy()
-    return df
-
-
-def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+def get_feature_matrix(df: pd.DataFrame, sc=None) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+    """The 15 base features, plus the F&O ones when sc.fo_features is on."""
     feature_cols = [
         "ret_1", "ret_3", "ret_5",
         "vol_10",
@@ -168,7 +96,7 @@ def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, List[
         "long_diff", "short_diff", "oi_diff",
         "long_ratio", "short_ratio",
         "long_5ch", "short_5ch"
-    ]
+    ] + feature_store.fo_feature_cols(df, sc)
     X = df[feature_cols].copy()
     y = df["Label"].copy()
     return X, y, feature_cols
@@ -177,36 +105,71 @@ def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, List[
 # ------------------------------------------------------------------------------------
 # MODEL TRAINING
 # ------------------------------------------------------------------------------------
-def train_xgb_model(X: pd.DataFrame, y: pd.Series) -> XGBClassifier:
+def train_xgb_model(X: pd.DataFrame,
+                    y: pd.Series,
+                    params: dict = None,
+                    num_boost_round: int = None,
+                    early_stopping_rounds: int = None,
+                    valid_fraction: float = None,
+                    sc=None) -> Tuple["Booster", dict]:
     """
     Train XGBoost multi-class classifier on time series (simple split).
-    Uses first 70% as train, last 30% as validation for basic metrics.
+    The first 70% of the rows are the training split, the last 30% the test
+    period the evaluation metrics are reported on.
+
+    Validation is the tail of the training split: its last `valid_fraction`
+    (time-ordered, never shuffled) is held out for early stopping on
+    mlogloss and the model is fit on the rows before it; num_boost_round is
+    only the upper bound. The best iteration is returned in metrics so it can
+    be stored with the model version and reused by the walk-forward.
+
+    Trained with native xgb.train and num_class=3, so a label mode that
+    leaves one class out of the training window (e.g. triple_barrier on a
+    short history) still gives a 3-class model.
+
+    Settings default to the [ML] values of `sc` (default: the [PATHS] symbol).
+    Returns (booster trimmed to the best iteration, metrics); metrics are
+    stored with the model version.
     """
+    import xgboost as xgb
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    sc = sc or get_symbol_config()
+    params = sc.xgb_params if params is None else params
+    num_boost_round = sc.n_estimators if num_boost_round is None else num_boost_round
+    early_stopping_rounds = sc.early_stopping_rounds if early_stopping_rounds is None else early_stopping_rounds
+    valid_fraction = sc.valid_fraction if valid_fraction is None else valid_fraction
+
     n = len(X)
     split_idx = int(n * 0.7)  # 70% train, 30% test (time-based)
     X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
     y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
 
+    # Early-stopping tail: the most recent part of the training period
+    fit_idx = split_idx - max(20, int(split_idx * valid_fraction))
     y_train_mapped = y_train.map(CLASS_MAP)
-    y_test_mapped = y_test.map(CLASS_MAP)
-
-    model = XGBClassifier(
-        n_estimators=300,
-        max_depth=4,
-        learning_rate=0.05,
-        subsample=0.9,
-        colsample_bytree=0.9,
-        objective="multi:softprob",
-        num_class=3,
-        eval_metric="mlogloss",
-        tree_method="hist",
-        random_state=42,
+
+    dfit = xgb.QuantileDMatrix(X_train.iloc[:fit_idx], label=y_train_mapped.iloc[:fit_idx])
+    dvalid = xgb.QuantileDMatrix(X_train.iloc[fit_idx:], label=y_train_mapped.iloc[fit_idx:], ref=dfit)
+
+    t0 = time.perf_counter()
+    booster = xgb.train(
+        params, dfit,
+        num_boost_round=num_boost_round,
+        evals=[(dvalid, "valid")],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False,
     )
+    fit_seconds = time.perf_counter() - t0
+    best_iteration = int(booster.best_iteration)
+    best_score = float(booster.best_score)
+    booster = booster[: best_iteration + 1]
 
-    model.fit(X_train, y_train_mapped)
+    print(f"Fit: {fit_seconds:.2f}s | best iteration {best_iteration + 1}/{num_boost_round} "
+          f"(val mlogloss {best_score:.4f}, {split_idx - fit_idx} validation rows)")
 
     # Basic evaluation
-    y_pred_mapped = model.predict(X_test)
+    y_pred_mapped = model_registry.predict_proba(booster, X_test).argmax(axis=1)
     y_pred = pd.Series(y_pred_mapped).map(INV_CLASS_MAP)
 
     print("\n--- ML MODEL EVALUATION (LAST 30% PERIOD) ---")
@@ -214,21 +177,36 @@ def train_xgb_model(X: pd.DataFrame, y: pd.Series) -> XGBClassifier:
     print("Confusion Matrix:")
     print(confusion_matrix(y_test, y_pred, labels=[-1, 0, 1]))
 
-    return model
+    metrics = {
+        "n_train": int(split_idx),
+        "n_fit": int(fit_idx),
+        "n_valid": int(split_idx - fit_idx),
+        "n_test": int(n - split_idx),
+        "best_iteration": best_iteration,
+        "best_valid_mlogloss": best_score,
+        "fit_seconds": round(fit_seconds, 3),
+        "test_accuracy": float((y_pred.to_numpy() == y_test.to_numpy()).mean()),
+        "report": classification_report(y_test, y_pred, output_dict=True, zero_division=0),
+    }
+    return booster, metrics
 
 
 # ------------------------------------------------------------------------------------
 # MAIN
 # ------------------------------------------------------------------------------------
-def run_training_pipeline():
+def run_training_pipeline(symbol: str = None):
+    sc = get_symbol_config(symbol)
+    input_file = sc.analysis_file
+    registry_dir = model_registry.registry_directory(sc.target_directory)
+
     print(f"--- ML MODEL TRAINING (XGBoost) ---")
-    print(f"Input Data: {INPUT_FILE}")
+    print(f"Input Data: {input_file}")
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERROR: Input file not found: {INPUT_FILE}")
+    if not os.path.exists(input_file):
+        print(f"ERROR: Input file not found: {input_file}")
         return
 
-    df_raw = pd.read_csv(INPUT_FILE, thousands=",")
+    df_raw = pd.read_csv(input_file, thousands=",")
     df_clean = clean_data(df_raw.copy())
     if df_clean.empty:
         print("ERROR: Data empty after cleaning.")
@@ -236,28 +214,68 @@ def run_training_pipeline():
 
     print(f"Rows after cleaning: {len(df_clean)}")
 
-    df_feat = add_features(df_clean.copy())
-    df_labeled = build_labels(df_feat.copy(), up_thresh=0.002, down_thresh=-0.002)
+    df_feat = df_clean.copy()
+    df_feat = add_features(df_feat, feature_store.open_store(sc.target_directory, sc.symbol, df_feat))
+    # Configured label (label_engine); rows whose label needs future data are dropped
+    df_labeled = label_engine.add_label_columns(df_feat.copy(), sc)
+    df_labeled = df_labeled[df_labeled["future_ret"].notna()].reset_index(drop=True)
 
-    X, y, feature_cols = get_feature_matrix(df_labeled)
+    X, y, feature_cols = get_feature_matrix(df_labeled, sc)
 
     if len(X) < 200:
         print("ERROR: Not enough data for ML training (need at least ~200 rows).")
         return
 
-    model = train_xgb_model(X, y)
+    booster, metrics = train_xgb_model(X, y, sc.xgb_params, sc.n_estimators,
+                                       sc.early_stopping_rounds, sc.valid_fraction, sc)
+
+    # Save booster (native UBJSON) + metadata as a new registry version
+    n_train = metrics["n_train"]
+    version = model_registry.save_model(
+        registry_dir, sc.symbol, booster,
+        feature_cols=feature_cols,
+        train_start=df_labeled[DATE_COL].iloc[0],
+        train_end=df_labeled[DATE_COL].iloc[n_train - 1],
+        label_thresholds={"mode": sc.label_mode, "horizon": label_engine.label_horizon(sc),
+                          "up": sc.label_up_thresh, "down": sc.label_down_thresh},
+        data_hash_value=model_registry.data_hash(X.iloc[:n_train], y.iloc[:n_train]),
+        metrics=metrics,
+        params=dict(sc.xgb_params, n_estimators=sc.n_estimators),
+        extra={"best_iteration": metrics["best_iteration"]},
+    )
 
-    # Save model and feature columns together
-    bundle = {
-        "model": model,
-        "feature_cols": feature_cols,
+    print(f"\n✔ Saved trained model version {version} to: {registry_dir}")
+
+    # Gain importance + TreeSHAP of the training rows, cached with the version
+    att_path = attribution_store.save_version_attribution(
+        registry_dir, sc.symbol, version, booster,
+        X.iloc[:n_train], feature_cols, df_labeled[DATE_COL].iloc[:n_train],
+    )
+    print(f"✔ Feature attribution saved to: {att_path}")
+    return {
+        "symbol": sc.symbol,
+        "version": version,
+        "rows": len(X),
+        "best_iteration": metrics["best_iteration"],
+        "fit_seconds": metrics["fit_seconds"],
     }
 
-    with open(MODEL_FILE, "wb") as f:
-        pickle.dump(bundle, f)
 
-    print(f"\n✔ Saved trained model to: {MODEL_FILE}")
+def run_for_symbols(symbols):
+    """Train every symbol and report where the training time goes."""
+    summary = [r for r in (run_training_pipeline(s) for s in symbols) if r]
+
+    print("\n=== TRAINING SUMMARY ===")
+    print(f"{'Symbol':<14}{'Rows':>8}{'Best iter':>11}{'Fit (s)':>10}")
+    for r in summary:
+        print(f"{r['symbol']:<14}{r['rows']:>8}{r['best_iteration'] + 1:>11}{r['fit_seconds']:>10.2f}")
+    return summary
 
 
 if __name__ == "__main__":
-    run_training_pipeline()
+    # python MLTrainer.py              -> configured SYMBOL
+    # python MLTrainer.py SBIN DABUR   -> many symbols + timing summary
+    if len(sys.argv) > 1:
+        run_for_symbols(sys.argv[1:])
+    else:
+        run_training_pipeline()
@@ -0,0 +1,178 @@
+# NextSignal.py
+"""
+Next-day ML signal without rerunning the full trading pipeline.
+
+The rolling feature state (feature_engine.IncrementalFeatures) is kept in
+<target_dir>/<SYMBOL>_FeatureState.json. A run reads only the tail of the
+Analysis CSV, advances the state by the rows added since the last run and
+scores the newest row with one inplace_predict call on the registry booster.
+The first run (or --rebuild) warms the state up from the full history.
+
+Usage: python NextSignal.py [SYMBOL ...] [--rebuild]
+"""
+
+import os
+import io
+import csv
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+import feature_engine  # type: ignore
+import model_registry  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
+
+# Must match GenerateMLTrades.py
+CLASS_MAP = {-1: 0, 0: 1, 1: 2}
+INV_CLASS_MAP = {v: k for k, v in CLASS_MAP.items()}
+PROB_LONG = 0.55
+PROB_SHORT = 0.55
+
+TAIL_BLOCK_BYTES = 64 * 1024
+
+
+def state_file(target_directory: str, symbol: str) -> str:
+    return os.path.join(target_directory, f"{symbol}_FeatureState.json")
+
+
+# ------------------------------------------------------------------------------------
+# CSV TAIL
+# ------------------------------------------------------------------------------------
+def read_rows_after(path: str, after_date: Optional[str]) -> List[dict]:
+    """
+    Rows of the Analysis CSV dated after `after_date` (ISO yyyy-mm-dd),
+    reading the file backwards in blocks until an older row is reached.
+    """
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]))
+        header = [h.strip() for h in header]
+        data_start = f.tell()
+
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunk = b""
+        while pos > data_start:
+            step = min(TAIL_BLOCK_BYTES, pos - data_start)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+            lines = chunk.splitlines()
+            # first line may be partial unless we reached the data start
+            first_full = lines[1] if pos > data_start and len(lines) > 1 else (lines[0] if lines else b"")
+            if after_date is not None and first_full[:10].decode("utf-8", "ignore") <= after_date:
+                break
+
+    text = chunk.decode("utf-8")
+    lines = text.splitlines()
+    if pos > data_start and lines:
+        lines = lines[1:]
+
+    rows = []
+    for values in csv.reader(io.StringIO("\n".join(lines))):
+        if not values:
+            continue
+        row = dict(zip(header, values))
+        if after_date is None or row[feature_engine.DATE_COL][:10] > after_date:
+            rows.append(row)
+    rows.sort(key=lambda r: r[feature_engine.DATE_COL])
+    return rows
+
+
+def bootstrap_state(analysis_file: str) -> feature_engine.IncrementalFeatures:
+    """Full-history warm-up (pandas only needed here)."""
+    import pandas as pd
+    from GenerateMLTrades import clean_data  # type: ignore
+
+    df = clean_data(pd.read_csv(analysis_file, thousands=","))
+    return feature_engine.IncrementalFeatures.from_history(df)
+
+
+# ------------------------------------------------------------------------------------
+# SIGNAL
+# ------------------------------------------------------------------------------------
+def signal_from_proba(proba: np.ndarray):
+    """Same rule as GenerateMLTrades.simulate_trades_with_model."""
+    cls = int(np.argmax(proba))
+    conf = float(proba[cls])
+    label = INV_CLASS_MAP[cls]
+    if label == 1 and conf >= PROB_LONG:
+        return "BUY", label, conf
+    if label == -1 and conf >= PROB_SHORT:
+        return "SELL", label, conf
+    return "HOLD", label, conf
+
+
+def next_signal(symbol: str = None, rebuild: bool = False) -> Optional[dict]:
+    sc = get_symbol_config(symbol)
+    registry_dir = model_registry.registry_directory(sc.target_directory)
+    path = state_file(sc.target_directory, sc.symbol)
+
+    if not os.path.exists(sc.analysis_file):
+        print(f"ERROR: Input file not found: {sc.analysis_file}")
+        return None
+
+    metas = model_registry.list_versions(registry_dir, sc.symbol)
+    if not metas:
+        print(f"ERROR: No trained model versions for {sc.symbol} in: {registry_dir}")
+        return None
+
+    t0 = time.perf_counter()
+    state = None if rebuild else feature_engine.load_state(path)
+    if state is None:
+        state = bootstrap_state(sc.analysis_file)
+        n_new = state.n_rows
+    else:
+        new_rows = read_rows_after(sc.analysis_file, state.last_date)
+        n_new = sum(f is not None for f in state.update_batch(new_rows))
+    t_features = time.perf_counter()
+
+    if state.last_features is None:
+        print(f"ERROR: No usable rows for {sc.symbol}.")
+        return None
+
+    # Latest version trained before the signal date (oldest if none is)
+    meta = model_registry.select_version(metas, state.last_date) or metas[0]
+    missing = state.missing_features(meta["feature_cols"])
+    if missing and not rebuild:
+        # state saved before the model's features were tracked: warm up again
+        state = bootstrap_state(sc.analysis_file)
+        n_new = state.n_rows
+        t_features = time.perf_counter()
+        missing = state.missing_features(meta["feature_cols"])
+    if missing:
+        print(f"ERROR: Model {meta['version']} of {sc.symbol} needs features the incremental "
+              f"engine cannot build from {sc.analysis_file}: {', '.join(missing)}")
+        return None
+    booster = model_registry.load_booster(registry_dir, sc.symbol, meta["version"])
+    x = np.asarray([state.feature_vector(meta["feature_cols"])], dtype=np.float32)
+    proba = model_registry.predict_proba(booster, x)[0]
+    signal, label, conf = signal_from_proba(proba)
+    t_predict = time.perf_counter()
+
+    feature_engine.save_state(path, state)
+
+    result = {
+        "symbol": sc.symbol,
+        "date": state.last_date,
+        "signal": signal,
+        "label": label,
+        "confidence": conf,
+        "model_version": meta["version"],
+        "rows_updated": n_new,
+        "features_ms": (t_features - t0) * 1000.0,
+        "predict_ms": (t_predict - t_features) * 1000.0,
+    }
+    print(f"{sc.symbol} {state.last_date}: {signal} (label {label:+d}, conf {conf:.3f}) "
+          f"-> execute at next open | model {meta['version']} | "
+          f"{n_new} row(s) updated in {result['features_ms']:.1f} ms, "
+          f"predict {result['predict_ms']:.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    rebuild = "--rebuild" in sys.argv
+    for sym in (args or [None]):
+        next_signal(sym, rebuild=rebuild)
@@ -10,7 +10,9 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
-from config_loader import load_config  # type: ignore
+import cost_model  # type: ignore
+import rule_strategy  # type: ignore
+from config_loader import get_symbol_config, load_config  # type: ignore
 
 # --- Load config ONCE ---
 cfg = load_config()
@@ -113,103 +115,17 @@ def generate_signals(df, threshold_pct, min_oi_sum):
 # TRADE SIMULATION (PURE VWAP & FIXED SL/TP)
 # ------------------------------------------------------------------------------------
 def simulate_trades(df, investment_amount):
-
-    df['Quantity_Traded'] = 0
-    df['Position'] = 0
-    df['Daily_PnL'] = 0.0
-    
-    # State tracking columns
-    df['Entry_Price'] = 0.0
-    df['Entry_Type'] = None 
-
-    # Convert percentage values from config to decimal for calculations
-    VWAP_ENTRY_THRESHOLD_DEC = VWAP_ENTRY_THRESHOLD_PCT_INI / 100.0 
-    
-    # Fixed SL/TP percentages loaded from config and converted to decimal
-    STOP_LOSS_PCT = STOP_LOSS_PCT_INI / 100.0 
-    TAKE_PROFIT_PCT = TAKE_PROFIT_PCT_INI / 100.0 
-
-    for i in range(1, len(df)):
-        current_price = df.loc[i, CLOSE_COL]
-        previous_price = df.loc[i - 1, CLOSE_COL]
-
-        # Restore state from previous day
-        position = df.loc[i - 1, 'Position'] 
-        entry_price_prev = df.loc[i - 1, 'Entry_Price']
-        
-        # Carry forward the entry state by default
-        df.loc[i, 'Entry_Price'] = entry_price_prev
-        df.loc[i, 'Entry_Type'] = df.loc[i - 1, 'Entry_Type']
-        
-        # Calculate PnL based on the position held from the previous day
-        df.loc[i, 'Daily_PnL'] = (current_price - previous_price) * position
-
-        net_trade_qty = 0
-        current_position = position
-        calculated_trade_qty = math.floor(investment_amount / current_price) if current_price > 0 else 0
-        vwap = df.loc[i, 'vwap'] if 'vwap' in df.columns else None
-
-        # ------------------------------------------------------------------
-        # COMBINED EXIT/ENTRY LOGIC
-        # ------------------------------------------------------------------
-        
-        is_exiting = False
-        
-        # --- 1. EXIT LOGIC (SL/TP - Highest Priority) ---
-        if current_position != 0 and entry_price_prev > 0:
-            
-            # Stop Loss (SL) and Take Profit (TP) calculations
-            sl_price_long = entry_price_prev * (1 - STOP_LOSS_PCT)
-            tp_price_long = entry_price_prev * (1 + TAKE_PROFIT_PCT)
-
-            if current_position > 0: # Long position exit check
-                if current_price < sl_price_long:
-                    # Stop Loss
-                    net_trade_qty = -current_position
-                    is_exiting = True
-                elif current_price > tp_price_long:
-                    # Take Profit
-                    net_trade_qty = -current_position
-                    is_exiting = True
-            
-            # NOTE: Short position exit logic removed, as only long trades are taken.
-
-        # --- FINAL POSITION/STATE UPDATE AFTER EXITS ---
-        if is_exiting:
-            position = 0 
-            df.loc[i, 'Entry_Price'] = 0.0
-            df.loc[i, 'Entry_Type'] = None # Reset state
-        
-        # --- 2. ENTRY LOGIC (Only if position is flat - PURE VWAP SUPPORT: LONG ONLY) ---
-        
-        elif current_position == 0:
-            
-            if vwap and vwap > 0:
-                vwap_diff = current_price - vwap
-                vwap_diff_pct = abs(vwap_diff) / vwap
-
-                # VWAP Buy Entry (Price near VWAP and below it = Support)
-                is_vwap_support_buy = (vwap_diff < 0) and (vwap_diff_pct <= VWAP_ENTRY_THRESHOLD_DEC)
-
-                # VWAP Sell Entry (Price near VWAP and above it = Resistance) - REMOVED
-
-                if is_vwap_support_buy:
-                    net_trade_qty = calculated_trade_qty
-                    position += calculated_trade_qty
-                    df.loc[i, 'Entry_Price'] = current_price
-                    df.loc[i, 'Entry_Type'] = 'VWAP'
-                
-                # elif is_vwap_resistance_sell: # Logic for short entry is removed.
-                #     ...
-
-        # ------------------------------------------------------------------
-
-        # Update the DataFrame for the current row 'i'
-        df.loc[i, 'Quantity_Traded'] = net_trade_qty
-        df.loc[i, 'Position'] = position
-
-    df['Cumulative_PnL'] = df['Daily_PnL'].cumsum()
-    return df
+    """
+    Long-only VWAP support entries with fixed SL/TP (percent of entry), run
+    on the common execution core (rule_strategy.simulate_vwap_trades).
+    """
+    return rule_strategy.simulate_vwap_trades(
+        df, investment_amount,
+        vwap_threshold_pct=VWAP_ENTRY_THRESHOLD_PCT_INI,
+        stop_loss_pct=STOP_LOSS_PCT_INI,
+        take_profit_pct=TAKE_PROFIT_PCT_INI,
+        costs=get_symbol_config().cost_model,
+    )
 
 
 # ------------------------------------------------------------------------------------
@@ -245,7 +161,7 @@ def run_pipeline():
         TRADE_SIGNAL_COL, 
         'Signal', 'Quantity_Traded', 'Position', 
         'Entry_Price', 'Entry_Type', 
-        'Daily_PnL', 'Cumulative_PnL'
+        'Trade_Cost', 'Daily_PnL', 'Cumulative_PnL'
     ]
 
     # Filter output columns to only include those present in the final DataFrame
@@ -253,6 +169,7 @@ def run_pipeline():
 
     print(f"\nSaved trade file: {OUTPUT_FILE}")
     print(f"Final PnL: {df_trades['Cumulative_PnL'].iloc[-1]:,.2f}")
+    print(cost_model.format_summary(df_trades))
 
 
 if __name__ == "__main__":
@@ -1,24 +1,13 @@
 import os
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from plotly.offline import plot
-from plotly.subplots import make_subplots
-from openpyxl import load_workbook
-from config_loader import load_config  # type: ignore
+import feature_store  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 from utils_progress import print_progress_bar # type: ignore
 
 # ---------------- CONFIG / CONSTANTS ---------------- #
-
-cfg = load_config()
-TARGET_DIR = cfg["TARGET_DIRECTORY"]
-SYMBOL = cfg["SYMBOL"]
-
-TRADES_INPUT_FILE_NAME = f"{SYMBOL}_Trades_ML.csv"
-CHART_OUTPUT_FILE_NAME = f"{SYMBOL}_Chart.html"
-
-INPUT_FILE = os.path.join(TARGET_DIR, TRADES_INPUT_FILE_NAME)
-OUTPUT_INTERACTIVE_CHART_FILE = os.path.join(TARGET_DIR, CHART_OUTPUT_FILE_NAME)
+# Paths are resolved per symbol in run_plotting(); plotly is imported there
+# so importing this module stays cheap.
 
 DATE_COL = "DATE"
 OPEN_COL = "OPEN"
@@ -38,17 +27,25 @@ def sign(q: float) -> int:
     return 0
 
 
-def run_plotting():
+def run_plotting(symbol: str = None):
+    import plotly.graph_objects as go
+    from plotly.offline import plot
+    from plotly.subplots import make_subplots
+
+    sc = get_symbol_config(symbol)
+    input_file = os.path.join(sc.target_directory, f"{sc.symbol}_Trades_ML.csv")
+    output_chart_file = os.path.join(sc.target_directory, f"{sc.symbol}_Chart.html")
+
     print("\n--- Plotly Interactive Chart Generator (ML Trades) ---\n")
-    print("Reading trades from:", INPUT_FILE)
+    print("Reading trades from:", input_file)
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: Trade data input file not found: {INPUT_FILE}")
+    if not os.path.exists(input_file):
+        print(f"Error: Trade data input file not found: {input_file}")
         return
 
     try:
         # ---------------- LOAD & CLEAN DATA ---------------- #
-        df = pd.read_csv(INPUT_FILE, parse_dates=[DATE_COL])
+        df = pd.read_csv(input_file, parse_dates=[DATE_COL])
 
         df.sort_values(DATE_COL, inplace=True)
         df.reset_index(drop=True, inplace=True)
@@ -93,13 +90,11 @@ def run_plotting():
         df["Cumulative_PnL_calc"] = df["Cumulative_PnL"]
 
         # ---------------- INDICATORS ---------------- #
-        df["EMA_9"] = df[CLOSE_COL].ewm(span=9, adjust=False).mean()
-        df["EMA_21"] = df[CLOSE_COL].ewm(span=21, adjust=False).mean()
-        df["EMA_50"] = df[CLOSE_COL].ewm(span=50, adjust=False).mean()
-        df["EMA_100"] = df[CLOSE_COL].ewm(span=100, adjust=False).mean()
-        df["EMA_200"] = df[CLOSE_COL].ewm(span=200, adjust=False).mean()
-        df["EMA_5_Longs"] = df[LONG_COL].ewm(span=5, adjust=False).mean()
-        df["EMA_5_Shorts"] = df[SHORT_COL].ewm(span=5, adjust=False).mean()
+        store = feature_store.open_store(sc.target_directory, sc.symbol, df)
+        for span in (9, 21, 50, 100, 200):
+            df[f"EMA_{span}"] = store.get("ema", col=CLOSE_COL, span=span)
+        df["EMA_5_Longs"] = store.get("ema", col=LONG_COL, span=5)
+        df["EMA_5_Shorts"] = store.get("ema", col=SHORT_COL, span=5)
 
         # ---------------- OHLC FOR CANDLE (synthetic high/low) ---------------- #
         df["Open"] = df[OPEN_COL]
@@ -209,7 +204,7 @@ def run_plotting():
             shared_xaxes=True,
             vertical_spacing=0.02,
             subplot_titles=(
-                f"Interactive Chart: {os.path.basename(INPUT_FILE)}",
+                f"Interactive Chart: {os.path.basename(input_file)}",
                 "Open Interest (Longs / Shorts Till Now)",
             ),
         )
@@ -536,7 +531,7 @@ def run_plotting():
 
         # ---------------- SAVE TEMP TRADE RECORD FILE FOR ExcelGenerator ---------------- #
         try:
-            temp_trade_file = os.path.join(TARGET_DIR, f"{SYMBOL}_TradeRecords_TMP.csv")
+            temp_trade_file = os.path.join(sc.target_directory, f"{sc.symbol}_TradeRecords_TMP.csv")
             pd.DataFrame(trade_records).to_csv(temp_trade_file, index=False)
             print("Temporary Trade Records saved at:")
             print(temp_trade_file)
@@ -549,7 +544,7 @@ def run_plotting():
         # ---------------- SAVE HTML ---------------- #
         plot(
             fig,
-            filename=OUTPUT_INTERACTIVE_CHART_FILE,
+            filename=output_chart_file,
             auto_open=True,
             config={
                 "displayModeBar": True,
@@ -562,7 +557,7 @@ def run_plotting():
         )
 
         print("\nChart generated successfully:")
-        print(OUTPUT_INTERACTIVE_CHART_FILE)
+        print(output_chart_file)
 
     except Exception as e:
         print("An error occurred during chart generation:", e)
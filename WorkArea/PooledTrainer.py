@@ -0,0 +1,293 @@
+# PooledTrainer.py
+"""
+Pooled (multi-symbol) model training.
+
+Instead of one small model per symbol, the featured frames of many symbols
+are stacked into one date-sorted float32 matrix and a single model is fit:
+
+  - every feature is z-scored per symbol with expanding (past-only) mean/std,
+    so OI and volume scales of different stocks become comparable;
+  - a categorical symbol_id column lets the trees still split per symbol;
+  - labels use each symbol's own [ML] label settings (label_engine).
+
+Two modes:
+  python PooledTrainer.py [SYM ...]          one pooled model (70/30 split,
+                                             early stopping) saved to the
+                                             model registry as POOLED
+  python PooledTrainer.py --wf [SYM ...]     walk-forward: retrain on every
+                                             date before each block of
+                                             BLOCK_DAYS dates, predict the block;
+                                             writes <SYM>_ML_WF_Pooled_Predictions.csv
+
+Without symbols, the default symbol plus every [SYMBOL_<SYMBOL>] section is used.
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import feature_store  # type: ignore
+import label_engine  # type: ignore
+import model_registry  # type: ignore
+import WalkForwardTrainer as wf  # type: ignore
+from config_loader import configured_symbols, get_symbol_config  # type: ignore
+from feature_engine import FEATURE_COLS  # type: ignore
+from utils_progress import print_progress_bar  # type: ignore
+
+# ---------------- CONFIG / CONSTANTS ---------------- #
+POOLED_SYMBOL = "POOLED"       # registry name of the pooled model
+SYMBOL_COL = "SYMBOL"
+SYMBOL_ID_COL = "symbol_id"
+NORM_MIN_PERIODS = 20          # expanding z-score warm-up (0 before that)
+BLOCK_DAYS = 20                # pooled walk-forward retrains once per block of dates
+MIN_TRAIN_DATES = wf.MIN_TRAIN_SIZE
+
+
+# ------------------------------------------------------------------------------------
+# DATA
+# ------------------------------------------------------------------------------------
+def load_symbol_frame(symbol: str) -> pd.DataFrame:
+    """Cleaned, featured and labeled frame of one symbol (None if missing)."""
+    sc = get_symbol_config(symbol)
+    if not os.path.exists(sc.analysis_file):
+        print(f"Skipping {symbol}: input file not found: {sc.analysis_file}")
+        return None
+
+    df = wf.clean_data(pd.read_csv(sc.analysis_file, thousands=","))
+    if df.empty:
+        print(f"Skipping {symbol}: data empty after cleaning.")
+        return None
+
+    df = wf.add_features(df, feature_store.open_store(sc.target_directory, sc.symbol, df))
+    df = label_engine.add_label_columns(df, sc)
+    df[SYMBOL_COL] = symbol
+    return df
+
+
+def normalize_per_symbol(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    """Expanding z-score of `cols` (uses only rows up to each date)."""
+    x = df[cols]
+    mean = x.expanding(min_periods=NORM_MIN_PERIODS).mean()
+    std = x.expanding(min_periods=NORM_MIN_PERIODS).std()
+    z = (x - mean) / std
+    df[cols] = z.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    return df
+
+
+def build_pooled_frame(symbols: List[str]) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    """
+    Stack the symbols' frames sorted by (DATE, symbol_id).
+    Returns (frame, feature_cols incl. symbol_id, symbols actually loaded).
+    """
+    feature_cols = list(FEATURE_COLS)
+    frames, loaded = [], []
+    for symbol in symbols:
+        df = load_symbol_frame(symbol)
+        if df is None:
+            continue
+        df = normalize_per_symbol(df, feature_cols)
+        df[SYMBOL_ID_COL] = len(loaded)
+        frames.append(df[[wf.DATE_COL, SYMBOL_COL, SYMBOL_ID_COL, "future_ret", "Label"] + feature_cols])
+        loaded.append(symbol)
+
+    if not frames:
+        raise ValueError("No symbol data available for pooled training.")
+
+    pooled = pd.concat(frames, ignore_index=True)
+    pooled.sort_values([wf.DATE_COL, SYMBOL_ID_COL], inplace=True, kind="mergesort")
+    pooled.reset_index(drop=True, inplace=True)
+    return pooled, feature_cols + [SYMBOL_ID_COL], loaded
+
+
+def pooled_arrays(pooled: pd.DataFrame, feature_cols: List[str]):
+    """
+    Contiguous float32 features, mapped labels, weights and date keys.
+    Rows whose label needs data past the symbol's last row get weight 0, so
+    training sets stay plain prefixes of the date-sorted matrix.
+    """
+    X = wf.feature_array(pooled, feature_cols)
+    y = pooled["Label"].map(wf.CLASS_MAP).to_numpy(dtype=np.float32)
+    w = pooled["future_ret"].notna().to_numpy(dtype=np.float32)
+    dates = pooled[wf.DATE_COL].to_numpy(dtype="datetime64[D]")
+    return X, y, w, dates
+
+
+def _feature_types(feature_cols: List[str]) -> List[str]:
+    return ["c" if c == SYMBOL_ID_COL else "q" for c in feature_cols]
+
+
+# ------------------------------------------------------------------------------------
+# SINGLE POOLED MODEL
+# ------------------------------------------------------------------------------------
+def train_pooled(symbols: List[str]) -> dict:
+    """One early-stopped model on the first 70% of dates, evaluated on the rest."""
+    import xgboost as xgb
+
+    sc = get_symbol_config()
+    pooled, feature_cols, loaded = build_pooled_frame(symbols)
+    X, y, w, dates = pooled_arrays(pooled, feature_cols)
+    ft = _feature_types(feature_cols)
+
+    udates = np.unique(dates)
+    test_start = udates[int(len(udates) * 0.7)]
+    valid_start = udates[int(len(udates) * 0.7 * (1.0 - sc.valid_fraction))]
+    n_train = int(np.searchsorted(dates, test_start, side="left"))
+    n_fit = int(np.searchsorted(dates, valid_start, side="left"))
+
+    print(f"--- POOLED TRAINING ({len(loaded)} symbols, {len(pooled)} rows) ---")
+    print(f"Fit rows: {n_fit} | validation rows: {n_train - n_fit} | test rows: {len(pooled) - n_train}")
+
+    # Bin edges from the fit rows only (validation / test rows are not sketched)
+    dfit = xgb.QuantileDMatrix(X[:n_fit], label=y[:n_fit], weight=w[:n_fit],
+                               feature_types=ft, enable_categorical=True)
+    dvalid = xgb.QuantileDMatrix(X[n_fit:n_train], label=y[n_fit:n_train], weight=w[n_fit:n_train],
+                                 ref=dfit, feature_types=ft, enable_categorical=True)
+
+    t0 = time.perf_counter()
+    booster = xgb.train(sc.xgb_params, dfit, num_boost_round=sc.n_estimators,
+                        evals=[(dvalid, "valid")],
+                        early_stopping_rounds=sc.early_stopping_rounds, verbose_eval=False)
+    fit_seconds = time.perf_counter() - t0
+    best_iteration = int(booster.best_iteration)
+    booster = booster[: best_iteration + 1]
+
+    proba = booster.inplace_predict(X[n_train:])
+    pred = proba.argmax(axis=1)
+    test = pooled.iloc[n_train:].assign(hit=(pred == y[n_train:]))
+    test = test[w[n_train:] > 0]
+    per_symbol = test.groupby(SYMBOL_COL)["hit"].mean()
+
+    print(f"Fit: {fit_seconds:.2f}s | best iteration {best_iteration + 1}/{sc.n_estimators}")
+    print(f"Test accuracy: {test['hit'].mean():.3f}")
+    for symbol, acc in per_symbol.items():
+        print(f"  {symbol:<14}{acc:.3f}")
+
+    registry_dir = model_registry.registry_directory(sc.target_directory)
+    version = model_registry.save_model(
+        registry_dir, POOLED_SYMBOL, booster,
+        feature_cols=feature_cols,
+        train_start=pooled[wf.DATE_COL].iloc[0],
+        train_end=pooled[wf.DATE_COL].iloc[n_train - 1],
+        label_thresholds={s: {"mode": get_symbol_config(s).label_mode,
+                              "up": get_symbol_config(s).label_up_thresh,
+                              "down": get_symbol_config(s).label_down_thresh}
+                          for s in loaded},
+        data_hash_value=model_registry.data_hash(pd.DataFrame(X[:n_train], columns=feature_cols),
+                                                 pd.Series(y[:n_train])),
+        metrics={
+            "n_train": n_train,
+            "n_test": int(len(pooled) - n_train),
+            "best_iteration": best_iteration,
+            "fit_seconds": round(fit_seconds, 3),
+            "test_accuracy": float(test["hit"].mean()),
+            "test_accuracy_by_symbol": per_symbol.to_dict(),
+        },
+        params=sc.xgb_params,
+        extra={
+            "best_iteration": best_iteration,
+            "symbols": loaded,                 # symbol_id = index in this list
+            "normalization": f"expanding_zscore(min_periods={NORM_MIN_PERIODS})",
+        },
+    )
+    print(f"\n✔ Saved pooled model version {version} to: {registry_dir}")
+    return {"version": version, "symbols": loaded, "best_iteration": best_iteration}
+
+
+# ------------------------------------------------------------------------------------
+# POOLED WALK-FORWARD (PER DATE BLOCK)
+# ------------------------------------------------------------------------------------
+def walk_forward_pooled(symbols: List[str], block_days: int = BLOCK_DAYS) -> Dict[str, pd.DataFrame]:
+    """
+    For every block of `block_days` dates (after MIN_TRAIN_DATES dates):
+    train one model on all symbols' rows dated before the block, predict the
+    block's rows. Training sets are prefix views of the date-sorted matrix,
+    binned on the rows dated before the block (wf.PrefixReference).
+    Returns {symbol: predictions} in the WalkForwardTrainer output format.
+    """
+    import xgboost as xgb
+    from sklearn.metrics import classification_report
+
+    sc = get_symbol_config()
+    pooled, feature_cols, loaded = build_pooled_frame(symbols)
+    X, y, w, dates = pooled_arrays(pooled, feature_cols)
+    ft = _feature_types(feature_cols)
+    udates = np.unique(dates)
+    purge = max(label_engine.label_horizon(get_symbol_config(s)) for s in loaded) - 1
+
+    if len(udates) < MIN_TRAIN_DATES + 2:
+        raise ValueError(f"Not enough dates for pooled walk-forward (need {MIN_TRAIN_DATES + 2}, have {len(udates)})")
+
+    # Early-stopped round count of the latest pooled model, as in WalkForwardTrainer
+    metas = model_registry.list_versions(model_registry.registry_directory(sc.target_directory), POOLED_SYMBOL)
+    num_boost_round = sc.n_estimators
+    if metas and "best_iteration" in metas[-1]:
+        num_boost_round = min(sc.n_estimators, metas[-1]["best_iteration"] + 1)
+
+    print(f"\n--- POOLED WALK-FORWARD ({len(loaded)} symbols, retrain every {block_days} dates, "
+          f"{num_boost_round} rounds) ---")
+
+    ref = wf.PrefixReference(X, feature_types=ft, enable_categorical=True)
+    proba = np.full((len(X), 3), np.nan, dtype=np.float32)
+
+    block_starts = range(MIN_TRAIN_DATES, len(udates), block_days)
+    t0 = time.perf_counter()
+    for k, b in enumerate(block_starts, start=1):
+        print_progress_bar(k, len(block_starts), label="Pooled walk-forward")
+        start = int(np.searchsorted(dates, udates[b], side="left"))
+        stop = (int(np.searchsorted(dates, udates[b + block_days], side="left"))
+                if b + block_days < len(udates) else len(X))
+
+        # Train on dates before the block, minus `purge` dates for multi-day labels
+        end = int(np.searchsorted(dates, udates[b - purge], side="left"))
+        dtrain = xgb.QuantileDMatrix(X[:end], label=y[:end], weight=w[:end], ref=ref.at(start),
+                                     feature_types=ft, enable_categorical=True)
+        booster = xgb.train(sc.xgb_params, dtrain, num_boost_round=num_boost_round)
+        proba[start:stop] = booster.inplace_predict(X[start:stop])
+    print(f"Pooled walk-forward fit time: {time.perf_counter() - t0:.1f}s")
+
+    # Rows without a next-day close are never predicted (same as WalkForwardTrainer)
+    keep = ~np.isnan(proba[:, 0]) & (w > 0)
+    p = proba[keep]
+    cls = p.argmax(axis=1)
+    conf = p.max(axis=1)
+    labels = np.array([wf.INV_CLASS_MAP[c] for c in cls])
+    signal = np.where((labels == 1) & (conf >= wf.PROB_LONG), "BUY",
+                      np.where((labels == -1) & (conf >= wf.PROB_SHORT), "SELL", "HOLD"))
+
+    preds = pd.DataFrame({
+        "DATE": pooled[wf.DATE_COL].to_numpy()[keep],
+        SYMBOL_COL: pooled[SYMBOL_COL].to_numpy()[keep],
+        "ML_Label": labels,
+        "ML_Conf": conf.astype(float),
+        "ML_Signal": signal,
+        "True_Label": pooled["Label"].to_numpy()[keep].astype(int),
+    })
+
+    print("\n--- POOLED WALK-FORWARD EVALUATION (Out-of-sample) ---")
+    print(classification_report(preds["True_Label"], preds["ML_Label"], zero_division=0))
+
+    return {s: g.drop(columns=SYMBOL_COL).reset_index(drop=True) for s, g in preds.groupby(SYMBOL_COL)}
+
+
+def pooled_predictions_file(symbol: str) -> str:
+    sc = get_symbol_config(symbol)
+    return os.path.join(sc.target_directory, f"{sc.symbol}_ML_WF_Pooled_Predictions.csv")
+
+
+def run_pooled_walk_forward(symbols: List[str]) -> None:
+    for symbol, preds in walk_forward_pooled(symbols).items():
+        out = pooled_predictions_file(symbol)
+        preds.to_csv(out, index=False)
+        print(f"✔ {symbol}: {len(preds)} pooled walk-forward predictions saved to: {out}")
+
+
+if __name__ == "__main__":
+    symbols = [a for a in sys.argv[1:] if not a.startswith("--")] or configured_symbols()
+    if "--wf" in sys.argv:
+        run_pooled_walk_forward(symbols)
+    else:
+        train_pooled(symbols)
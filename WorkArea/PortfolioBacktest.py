@@ -0,0 +1,325 @@
+# PortfolioBacktest.py
+"""
+Portfolio backtest: one pool of capital over many symbols.
+
+The daily signal files of all symbols (see execution_core.SIGNAL_SOURCES)
+are aligned on the trading calendar (trading_calendar.py) into dense date x
+symbol matrices (execution price, close, int8 signal, optional ML_Conf).
+Sides, rankings and PnL are computed over whole matrices; only the final
+weight assignment steps through the days, since weights carried by
+untradable symbols limit what the other symbols can get:
+
+  - the signal of day t - 1 sets the side held from the execution price of
+    day t (OPEN for the ML files, close for the rule file) to the next one;
+    HOLD is flat for ML signals and keeps the side for rule signals
+  - max_positions: the candidates with the highest ML_Conf (else the lowest
+    volatility) of the decision day are held, at most max_positions
+  - allocation "equal": gross_exposure / max_positions per name (1 / n when
+    there is no limit); "vol": inverse volatility of the last vol_window
+    close returns, scaled to the same total; each name at most max_weight
+  - a symbol without a price on a day inside its first .. last row keeps its
+    weight until it trades again; that weight counts against max_positions
+    and gross_exposure. After its last row the weight is 0
+  - costs (each symbol's [COSTS]) are charged on the daily weight changes;
+    the brokerage cap and lot sizes are ignored in weight space
+
+Weights are reset to their targets every day (drift between signal changes
+is not traded). Outputs go to the [PORTFOLIO] / [PATHS] target directory:
+PORTFOLIO_Trades.csv (daily equity, PnL, drawdown, exposure, costs) and
+PORTFOLIO_Weights.csv (date x symbol weights).
+
+python PortfolioBacktest.py [SYM ...]
+"""
+
+import os
+import sys
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import cost_model  # type: ignore
+import execution_core  # type: ignore
+import trading_calendar  # type: ignore
+from config_loader import get_portfolio_config, get_symbol_config  # type: ignore
+
+# ---------------- CONFIG / CONSTANTS ---------------- #
+DATE_COL = "DATE"
+OPEN_COL = "OPEN"
+CLOSE_COL = "close"
+CONF_COL = "ML_Conf"
+TRADING_DAYS = 252
+OUTPUT_PREFIX = "PORTFOLIO"
+
+
+# ------------------------------------------------------------------------------------
+# DATE x SYMBOL MATRICES
+# ------------------------------------------------------------------------------------
+@dataclass
+class SignalMatrix:
+    dates: np.ndarray             # (T,) datetime64, trading calendar of the symbols
+    symbols: List[str]            # (N,)
+    price: np.ndarray             # (T, N) execution price, NaN where the symbol has no row
+    close: np.ndarray             # (T, N)
+    signal: np.ndarray            # (T, N) int8, HOLD where missing
+    score: Optional[np.ndarray]   # (T, N) ML_Conf, None when no file has it
+
+
+def load_symbol_signals(symbol: str, source: str) -> Optional[pd.DataFrame]:
+    """DATE, price columns, signal and ML_Conf of one symbol's trade file (None if missing)."""
+    sc = get_symbol_config(symbol)
+    suffix, signal_col = execution_core.SIGNAL_SOURCES[source]
+    path = os.path.join(sc.target_directory, f"{sc.symbol}{suffix}")
+    if not os.path.exists(path):
+        print(f"Skipping {symbol}: signal file not found: {path}")
+        return None
+
+    wanted = (DATE_COL, OPEN_COL, CLOSE_COL, signal_col, CONF_COL)
+    df = pd.read_csv(path, usecols=lambda c: c in wanted, parse_dates=[DATE_COL])
+    return df.rename(columns={signal_col: "Signal"})
+
+
+def build_matrix(frames: Dict[str, pd.DataFrame], execution: str = "next_open",
+                 calendar_directory: str = "") -> SignalMatrix:
+    """
+    Dense matrices on the trading calendar (bhavcopy days of
+    calendar_directory over the frames' span, else the union of their dates).
+    Frames need DATE, close, Signal (BUY / SELL / HOLD or codes) and OPEN for
+    next-open execution.
+    """
+    symbols = list(frames)
+    calendar = trading_calendar.calendar_for(*(f[DATE_COL] for f in frames.values()), directory=calendar_directory)
+    dates = calendar.dates.astype("datetime64[ns]")
+    T, N = len(dates), len(symbols)
+
+    price = np.full((T, N), np.nan)
+    close = np.full((T, N), np.nan)
+    signal = np.zeros((T, N), dtype=np.int8)
+    has_score = any(CONF_COL in f.columns for f in frames.values())
+    score = np.full((T, N), np.nan) if has_score else None
+
+    price_col = OPEN_COL if execution == "next_open" else CLOSE_COL
+    for j, f in enumerate(frames.values()):
+        rows = calendar.index_of(f[DATE_COL])
+        close[rows, j] = pd.to_numeric(f[CLOSE_COL], errors="coerce").to_numpy(dtype=float)
+        price[rows, j] = pd.to_numeric(f[price_col], errors="coerce").to_numpy(dtype=float)
+        signal[rows, j] = execution_core.signal_codes(f["Signal"].to_numpy())
+        if has_score and CONF_COL in f.columns:
+            score[rows, j] = pd.to_numeric(f[CONF_COL], errors="coerce").to_numpy(dtype=float)
+
+    return SignalMatrix(dates, symbols, price, close, signal, score)
+
+
+def _shift_down(a: np.ndarray, fill) -> np.ndarray:
+    """Row t gets row t - 1 (the decision day of execution day t)."""
+    out = np.empty_like(a)
+    out[0] = fill
+    out[1:] = a[:-1]
+    return out
+
+
+def _ffill(a: np.ndarray) -> np.ndarray:
+    """Forward fill NaNs down each column."""
+    return pd.DataFrame(a).ffill().to_numpy()
+
+
+# ------------------------------------------------------------------------------------
+# ALLOCATION
+# ------------------------------------------------------------------------------------
+def rolling_volatility(close: np.ndarray, window: int) -> np.ndarray:
+    """Std of the last `window` close-to-close returns per symbol (NaN in the warm-up)."""
+    returns = pd.DataFrame(close).ffill().pct_change(fill_method=None)
+    return returns.rolling(window, min_periods=max(window // 2, 2)).std().to_numpy()
+
+
+def target_weights(m: SignalMatrix,
+                   allocation: str = "equal",
+                   max_positions: int = 0,
+                   vol_window: int = 20,
+                   max_weight: float = 1.0,
+                   gross_exposure: float = 1.0,
+                   hold_exits: bool = True) -> np.ndarray:
+    """Signed weights (T, N) held from the execution price of each day."""
+    T, N = m.signal.shape
+    tradable = ~np.isnan(m.price)
+
+    # Side from the previous day's signal; rule signals keep the side on HOLD
+    side = _shift_down(m.signal, 0).astype(float)
+    if not hold_exits:
+        side = np.nan_to_num(_ffill(np.where(side != 0, side, np.nan)))
+
+    vol = _shift_down(rolling_volatility(m.close, vol_window), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv_vol = np.where(vol > 0, 1.0 / vol, np.nan)
+
+    candidate = (side != 0) & tradable
+    if allocation == "vol":
+        candidate &= ~np.isnan(inv_vol)
+    elif allocation != "equal":
+        raise ValueError(f"Unknown allocation: {allocation}")
+
+    # Rank of the candidates per day (ML_Conf, else low volatility)
+    limit = bool(max_positions) and max_positions < N
+    if limit:
+        score = _shift_down(m.score, np.nan) if m.score is not None else inv_vol
+        key = np.where(candidate, np.nan_to_num(score, nan=0.0), -np.inf)
+        order = np.argsort(-key, axis=1, kind="stable")
+        rank = np.empty_like(order)
+        rank[np.arange(T)[:, None], order] = np.arange(N)
+
+    # No price inside the symbol's first .. last row: the position cannot be
+    # traded and keeps its weight; after the last row it is closed
+    present = tradable | ~np.isnan(m.close)
+    first = np.where(present.any(axis=0), present.argmax(axis=0), T)
+    last = T - 1 - present[::-1].argmax(axis=0)
+    days = np.arange(T)[:, None]
+    carried = (days >= first) & (days <= last) & ~tradable
+
+    weights = np.zeros((T, N))
+    for t in range(T):
+        held = carried[t]
+        if t:
+            weights[t, held] = weights[t - 1, held]
+        kept = weights[t, held]
+        n_kept = int(np.count_nonzero(kept))
+
+        # New positions fill the slots and exposure the carried ones leave free
+        new = candidate[t]
+        if limit:
+            new = new & (rank[t] < max(max_positions - n_kept, 0))
+        n_new = int(new.sum())
+        if n_new == 0:
+            continue
+        slots = max_positions if max_positions else n_new + n_kept
+        budget = min(gross_exposure * n_new / slots,
+                     max(gross_exposure - float(np.abs(kept).sum()), 0.0))
+        if allocation == "equal":
+            weight = np.full(n_new, budget / n_new)
+        else:
+            raw = inv_vol[t, new]
+            weight = raw / raw.sum() * budget
+        weights[t, new] = np.minimum(weight, max_weight) * side[t, new]
+    return weights
+
+
+# ------------------------------------------------------------------------------------
+# SIMULATION
+# ------------------------------------------------------------------------------------
+def _cost_rates(costs: Sequence[cost_model.CostModel], N: int):
+    """Per-symbol fractions of traded value for buys / sells (brokerage uncapped)."""
+    costs = list(costs) if costs is not None else [cost_model.NO_COSTS] * N
+    brokerage = np.array([c.brokerage_pct / 100 * (1 + c.gst_pct / 100) for c in costs])
+    buy = np.array([c.buy_rate for c in costs]) + brokerage
+    sell = np.array([c.sell_rate for c in costs]) + brokerage
+    return buy, sell
+
+
+def simulate_portfolio(m: SignalMatrix,
+                       weights: np.ndarray,
+                       investment_amount: float,
+                       costs: Sequence[cost_model.CostModel] = None):
+    """
+    Portfolio equity from target weights. Returns the daily frame and the
+    (T, N) PnL contribution of every symbol.
+    """
+    T, N = weights.shape
+    price = _ffill(m.price)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.zeros((T, N))
+        ret[:-1] = price[1:] / price[:-1] - 1.0
+    ret = np.nan_to_num(ret, nan=0.0, posinf=0.0, neginf=0.0)
+
+    change = np.diff(weights, axis=0, prepend=np.zeros((1, N)))
+    buy_rate, sell_rate = _cost_rates(costs, N)
+    cost = np.abs(change) * np.where(change > 0, buy_rate, sell_rate)
+
+    contrib = weights * ret - cost                      # fraction of the day's starting equity
+    port_ret = contrib.sum(axis=1)
+    growth = np.cumprod(1.0 + port_ret)
+    equity_start = investment_amount * np.concatenate([[1.0], growth[:-1]])
+    pnl = equity_start[:, None] * contrib
+
+    equity = investment_amount * growth
+    daily = pd.DataFrame({
+        DATE_COL: m.dates,
+        "Equity": equity,
+        "Daily_PnL": equity_start * port_ret,
+        "Cumulative_PnL": equity - investment_amount,
+        "Drawdown_Pct": (equity / np.maximum.accumulate(equity) - 1.0) * 100,
+        "N_Positions": (weights != 0).sum(axis=1),
+        "Gross_Exposure": np.abs(weights).sum(axis=1),
+        "Net_Exposure": weights.sum(axis=1),
+        "Turnover": equity_start * np.abs(change).sum(axis=1),
+        "Trade_Cost": equity_start * cost.sum(axis=1),
+    })
+    return daily, pnl
+
+
+def summarize(daily: pd.DataFrame, investment_amount: float) -> Dict[str, float]:
+    ret = daily["Daily_PnL"].to_numpy() / (daily["Equity"] - daily["Daily_PnL"]).to_numpy()
+    sd = ret.std(ddof=1) if len(ret) > 1 else 0.0
+    return {
+        "final_pnl": float(daily["Cumulative_PnL"].iloc[-1]),
+        "return_pct": float(daily["Cumulative_PnL"].iloc[-1] / investment_amount * 100),
+        "max_drawdown_pct": float(daily["Drawdown_Pct"].min()),
+        "sharpe": float(ret.mean() / sd * math.sqrt(TRADING_DAYS)) if sd > 0 else 0.0,
+        "avg_positions": float(daily["N_Positions"].mean()),
+        "costs": float(daily["Trade_Cost"].sum()),
+    }
+
+
+# ------------------------------------------------------------------------------------
+# MAIN PIPELINE
+# ------------------------------------------------------------------------------------
+def run_portfolio_backtest(symbols: List[str] = None):
+    pc = get_portfolio_config()
+    symbols = symbols or pc.symbols
+    hold_exits = pc.signals != "rule"
+
+    print(f"--- Portfolio backtest: {len(symbols)} symbols, {pc.signals} signals ---")
+    print(f"Allocation: {pc.allocation} | max positions: {pc.max_positions or 'no limit'} | "
+          f"capital: {pc.investment_amount:,}")
+
+    frames = {}
+    for symbol in symbols:
+        df = load_symbol_signals(symbol, pc.signals)
+        if df is not None and not df.empty:
+            frames[symbol] = df
+    if not frames:
+        print("ERROR: No signal files found.")
+        return
+
+    t0 = time.perf_counter()
+    m = build_matrix(frames, "close" if pc.signals == "rule" else "next_open",
+                     get_symbol_config().bhavcopy_directory)
+    weights = target_weights(m, pc.allocation, pc.max_positions, pc.vol_window,
+                             pc.max_weight, pc.gross_exposure, hold_exits)
+    daily, pnl = simulate_portfolio(m, weights, pc.investment_amount,
+                                    [get_symbol_config(s).cost_model for s in m.symbols])
+    print(f"{len(m.dates)} dates x {len(m.symbols)} symbols in {time.perf_counter() - t0:.2f}s")
+
+    os.makedirs(pc.target_directory, exist_ok=True)
+    output_file = os.path.join(pc.target_directory, f"{OUTPUT_PREFIX}_Trades.csv")
+    weights_file = os.path.join(pc.target_directory, f"{OUTPUT_PREFIX}_Weights.csv")
+    daily.to_csv(output_file, index=False)
+    pd.DataFrame(weights, columns=m.symbols).assign(**{DATE_COL: m.dates})[[DATE_COL] + m.symbols] \
+        .to_csv(weights_file, index=False)
+
+    stats = summarize(daily, pc.investment_amount)
+    print(f"\n✔ Saved portfolio file: {output_file}")
+    print(f"Final PnL (portfolio): {stats['final_pnl']:,.2f} ({stats['return_pct']:.2f}%) | "
+          f"Max DD {stats['max_drawdown_pct']:.2f}% | Sharpe {stats['sharpe']:.2f} | "
+          f"avg positions {stats['avg_positions']:.1f} | costs {stats['costs']:,.2f}")
+
+    by_symbol = pd.Series(pnl.sum(axis=0), index=m.symbols).sort_values(ascending=False)
+    print("\nPnL by symbol:")
+    for symbol, value in by_symbol.items():
+        print(f"  {symbol:<14}{value:>14,.2f}")
+    return daily, weights
+
+
+if __name__ == "__main__":
+    run_portfolio_backtest([a for a in sys.argv[1:] if not a.startswith("--")] or None)
@@ -2,6 +2,8 @@ import subprocess
 import sys
 import os
 
+import pipeline_state  # type: ignore
+
 # Order of execution:
 # 1. Generate thresholds
 # 2. Generate analysis
@@ -36,6 +38,11 @@ def run_script(script_name):
 
 
 def main():
+    # Cheap mtime check (no pandas import) so "nothing new" exits immediately
+    if "--force" not in sys.argv and not pipeline_state.has_new_data("backtest"):
+        print("The walk-forward predictions and trades are newer than all inputs. Nothing to do (use --force to rerun).")
+        return
+
     print("\n=======================================")
     print(" WALK-FORWARD ML BACKTEST PIPELINE")
     print("=======================================\n")
@@ -2,6 +2,8 @@ import subprocess
 import sys
 import os
 
+import pipeline_state  # type: ignore
+
 # --- Script file names (make sure these match exactly your filenames) ---
 SCRIPT_1 = "GenerateThresholds.py"       # Analysis generator
 SCRIPT_2 = "GenerateAnalysis.py"
@@ -27,6 +29,11 @@ def run_script(script_name):
 
 # --- Main sequence ---
 if __name__ == "__main__":
+    # Cheap mtime check (no pandas import) so "nothing new" exits immediately
+    if "--force" not in sys.argv and not pipeline_state.has_new_data("trades"):
+        print("The trades and chart are newer than all inputs. Nothing to do (use --force to rerun).")
+        sys.exit(0)
+
     print("\n========================")
     print(" V- RUNNING FULL PIPELINE ")
     print("========================")
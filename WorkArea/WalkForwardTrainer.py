@@ -1,26 +1,20 @@
 # WalkForwardTrainer.py
 import os
-import pickle
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 
 import numpy as np
 import pandas as pd
-from xgboost import XGBClassifier
-from sklearn.metrics import classification_report, confusion_matrix
 
-from config_loader import load_config  # type: ignore
+import label_engine  # type: ignore
+import attribution_store  # type: ignore
+import feature_store  # type: ignore
+import model_registry  # type: ignore
+from config_loader import get_symbol_config  # type: ignore
 from utils_progress import print_progress_bar  # type: ignore
 
 # ---------------- CONFIG / CONSTANTS ---------------- #
-
-cfg = load_config()
-
-TARGET_DIR = cfg["TARGET_DIRECTORY"]
-SYMBOL = cfg["SYMBOL"]
-
-ANALYSIS_FILE_NAME = f"{SYMBOL}_Analysis.csv"
-INPUT_FILE = os.path.join(TARGET_DIR, ANALYSIS_FILE_NAME)
-WF_PRED_FILE = os.path.join(TARGET_DIR, f"{SYMBOL}_ML_WF_Predictions.csv")
+# Paths are resolved per symbol at run time (see run_walk_forward);
+# xgboost / sklearn are imported only inside walk_forward_train.
 
 DATE_COL = "DATE"
 OPEN_COL = "OPEN"
@@ -85,64 +79,18 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 # ------------------------------------------------------------------------------------
 # FEATURE ENGINEERING  (same as before)
 # ------------------------------------------------------------------------------------
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
+def add_features(df: pd.DataFrame, store=None) -> pd.DataFrame:
     """
     Build ML features from price, VWAP, OI, longs, shorts etc.
     All features are based on current and past data only (no lookahead).
+    Indicators come from the feature store (feature_store.add_ml_features);
+    pass a disk-backed store to reuse them across runs.
     """
-    # Returns
-    df["ret_1"] = df[CLOSE_COL].pct_change().fillna(0.0)
-    df["ret_3"] = df[CLOSE_COL].pct_change(3).fillna(0.0)
-    df["ret_5"] = df[CLOSE_COL].pct_change(5).fillna(0.0)
-
-    # Volatility (10-day rolling std of 1-day returns)
-    df["vol_10"] = df["ret_1"].rolling(10).std().fillna(0.0)
-
-    # EMAs
-    df["ema_10"] = df[CLOSE_COL].ewm(span=10, adjust=False).mean()
-    df["ema_20"] = df[CLOSE_COL].ewm(span=20, adjust=False).mean()
-    df["ema_50"] = df[CLOSE_COL].ewm(span=50, adjust=False).mean()
-
-    # Gaps vs EMA
-    df["gap_ema10"] = (df[CLOSE_COL] - df["ema_10"]) / df["ema_10"]
-    df["gap_ema20"] = (df[CLOSE_COL] - df["ema_20"]) / df["ema_20"]
-    df["gap_ema50"] = (df[CLOSE_COL] - df["ema_50"]) / df["ema_50"]
-
-    # VWAP gap (if available)
-    if VWAP_COL in df.columns:
-        df["gap_vwap"] = (df[CLOSE_COL] - df[VWAP_COL]) / df[VWAP_COL]
-    else:
-        df["gap_vwap"] = 0.0
-
-    # OI-based features
-    df["long_diff"] = df[LONG_TILL_NOW_COL].diff().fillna(0.0)
-    df["short_diff"] = df[SHORT_TILL_NOW_COL].diff().fillna(0.0)
-    df["oi_diff"] = df[OI_SUM_COL].diff().fillna(0.0)
-
-    total_ls = df[LONG_TILL_NOW_COL] + df[SHORT_TILL_NOW_COL] + 1e-6
-    df["long_ratio"] = df[LONG_TILL_NOW_COL] / total_ls
-    df["short_ratio"] = df[SHORT_TILL_NOW_COL] / total_ls
-
-    # Rolling OI trend (5-day change)
-    df["long_5ch"] = df[LONG_TILL_NOW_COL].pct_change(5).fillna(0.0)
-    df["short_5ch"] = df[SHORT_TILL_NOW_COL].pct_change(5).fillna(0.0)
-
-    # Replace inf / NaN in features
-    feature_cols = [
-        "ret_1", "ret_3", "ret_5",
-        "vol_10",
-        "gap_ema10", "gap_ema20", "gap_ema50", "gap_vwap",
-        "long_diff", "short_diff", "oi_diff",
-        "long_ratio", "short_ratio",
-        "long_5ch", "short_5ch"
-    ]
-    for col in feature_cols:
-        df[col] = df[col].replace([np.inf, -np.inf], 0.0).fillna(0.0)
-
-    return df
+    return feature_store.add_ml_features(df, store)
 
 
-def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+def get_feature_matrix(df: pd.DataFrame, sc=None) -> Tuple[pd.DataFrame, List[str]]:
+    """The 15 base features, plus the F&O ones when sc.fo_features is on."""
     feature_cols = [
         "ret_1", "ret_3", "ret_5",
         "vol_10",
@@ -150,7 +98,7 @@ def get_feature_matrix(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
         "long_diff", "short_diff", "oi_diff",
         "long_ratio", "short_ratio",
         "long_5ch", "short_5ch"
-    ]
+    ] + feature_store.fo_feature_cols(df, sc)
     X = df[feature_cols].copy()
     return X, feature_cols
 
@@ -180,65 +128,138 @@ def add_labels(df: pd.DataFrame,
 # ------------------------------------------------------------------------------------
 # WALK-FORWARD TRAINING
 # ------------------------------------------------------------------------------------
-def walk_forward_train(df: pd.DataFrame) -> pd.DataFrame:
+MAX_BIN = 256
+
+
+def feature_array(df: pd.DataFrame, feature_cols: List[str]) -> np.ndarray:
+    """Features as one C-contiguous float32 block (rows = days)."""
+    return np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32))
+
+
+class PrefixReference:
+    """
+    QuantileDMatrix reference for walk-forward folds, sketched on the prefix
+    X[:t] available at day t only (no look-ahead into the bin edges). It is
+    re-sketched whenever the prefix has doubled, so the edges follow the
+    growing history at O(n) total sketching cost.
+    """
+
+    def __init__(self, X: np.ndarray, **kwargs):
+        self.X = X
+        self.kwargs = kwargs
+        self.end = 0
+        self.ref = None
+
+    def at(self, t: int):
+        if self.ref is None or t >= 2 * self.end:
+            import xgboost as xgb
+            self.end = t
+            self.ref = xgb.QuantileDMatrix(self.X[:t], **self.kwargs)
+        return self.ref
+
+
+def walk_forward_proba(X: np.ndarray,
+                       y: np.ndarray,
+                       params: dict,
+                       num_boost_round: int,
+                       step: int = 1,
+                       min_train: int = MIN_TRAIN_SIZE,
+                       progress: bool = True,
+                       purge: int = 0,
+                       on_fold: Callable = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Walk-forward class probabilities for rows min_train .. n-2.
+
+    A model is trained on [0 .. t-1] every `step` days and predicts days
+    t .. t+step-1 (step=1 is the daily retrain). Every fold trains on the
+    prefix view X[:t] (no copy) through a QuantileDMatrix that reuses the
+    bin edges of a PrefixReference, so features are sketched only a few
+    times. The reference holds feature values of rows before t only (no
+    labels).
+
+    purge drops the last `purge` rows before t from training; use
+    label horizon - 1 so no training label looks past day t.
+
+    on_fold(t, stop, booster), if given, is called after every fold (e.g.
+    attribution_store.FoldRecorder).
+
+    Returns (row indices, proba) with proba shaped (len(indices), 3).
+    """
+    import xgboost as xgb
+
+    n = len(X)
+    last = n - 1  # last usable index is n-2
+    ref = PrefixReference(X, max_bin=MAX_BIN)
+
+    idx = np.arange(min_train, last)
+    proba = np.zeros((len(idx), 3), dtype=np.float32)
+
+    starts = range(min_train, last, step)
+    for k, t in enumerate(starts, start=1):
+        if progress:
+            print_progress_bar(k, len(starts), label="Walk-forward")
+
+        # TRAIN: use rows [0 .. t-1-purge] (views into X / y)
+        dtrain = xgb.QuantileDMatrix(X[:t - purge], label=y[:t - purge], ref=ref.at(t), max_bin=MAX_BIN)
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+
+        # PREDICT for days t .. t+step-1
+        stop = min(t + step, last)
+        proba[t - min_train:stop - min_train] = booster.inplace_predict(X[t:stop]).reshape(stop - t, -1)
+        if on_fold is not None:
+            on_fold(t, stop, booster)
+
+    return idx, proba
+
+
+def walk_forward_train(df: pd.DataFrame,
+                       params: dict = None,
+                       num_boost_round: int = None,
+                       step: int = 1,
+                       purge: int = 0,
+                       attribution_file: str = None,
+                       sc=None) -> pd.DataFrame:
     """
     Daily walk-forward:
       - For each day t (from MIN_TRAIN_SIZE to n-2):
           train on [0 .. t-1]
           predict for t
     Ensures the model has never seen day t or later when predicting for t.
+    params / num_boost_round default to the [ML] settings of `sc` (default:
+    the [PATHS] symbol), whose fo_features also selects the feature set;
+    step > 1 retrains only every `step` days, purge drops the newest training
+    rows for multi-day labels (see walk_forward_proba). With attribution_file
+    the gain importance and TreeSHAP of every fold are saved there.
     """
-    df = df.copy()
-    X_all, feature_cols = get_feature_matrix(df)
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    sc = sc or get_symbol_config()
+    if params is None or num_boost_round is None:
+        params = sc.xgb_params if params is None else params
+        num_boost_round = sc.n_estimators if num_boost_round is None else num_boost_round
+
+    _, feature_cols = get_feature_matrix(df, sc)
+    X = feature_array(df, feature_cols)
+    y = df["Label"].map(CLASS_MAP).to_numpy(dtype=np.float32)
+    dates = df[DATE_COL].to_numpy()
+    true_labels = df["Label"].to_numpy()
 
     n = len(df)
     if n < MIN_TRAIN_SIZE + 2:
         raise ValueError(f"Not enough data for walk-forward (need at least {MIN_TRAIN_SIZE + 2}, have {n})")
 
-    records = []
-
-    print(f"\n--- WALK-FORWARD TRAINING (Daily Retrain) ---")
+    print(f"\n--- WALK-FORWARD TRAINING ({'Daily Retrain' if step == 1 else f'Retrain every {step} days'}) ---")
     print(f"Total rows: {n}, first prediction will start at index {MIN_TRAIN_SIZE}")
 
-    total_steps = n - 1 - MIN_TRAIN_SIZE  # last usable index is n-2
-    step = 0
-
-    for t in range(MIN_TRAIN_SIZE, n - 1):
-        step += 1
-        print_progress_bar(step, total_steps, label="Walk-forward")
-
-        # TRAIN: use rows [0 .. t-1]
-        train_idx = list(range(0, t))
-        X_train = X_all.iloc[train_idx]
-        y_train = df["Label"].iloc[train_idx].map(CLASS_MAP)
-
-        # Just in case, drop any NaNs from y_train
-        mask = ~y_train.isna()
-        X_train = X_train[mask]
-        y_train = y_train[mask]
-
-        if len(X_train) < MIN_TRAIN_SIZE:
-            # Safety fallback, though this should not normally trigger
-            continue
-
-        model = XGBClassifier(
-            n_estimators=300,
-            max_depth=4,
-            learning_rate=0.05,
-            subsample=0.9,
-            colsample_bytree=0.9,
-            objective="multi:softprob",
-            num_class=3,
-            eval_metric="mlogloss",
-            tree_method="hist",
-            random_state=42,
-        )
-
-        model.fit(X_train, y_train)
-
-        # PREDICT for day t (single row)
-        X_pred = X_all.iloc[[t]]
-        proba = model.predict_proba(X_pred)[0]
+    recorder = attribution_store.FoldRecorder(X, feature_cols, dates) if attribution_file else None
+    idx, proba_all = walk_forward_proba(X, y, params, num_boost_round, step=step, purge=purge,
+                                        on_fold=recorder)
+    if recorder is not None:
+        recorder.save(attribution_file)
+        print(f"\n✔ Walk-forward feature attribution saved to: {attribution_file}")
+
+    records = []
+    for t, proba in zip(idx, proba_all):
         pred_class_mapped = int(np.argmax(proba))
         pred_conf = float(np.max(proba))
         pred_label = INV_CLASS_MAP[pred_class_mapped]
@@ -251,14 +272,12 @@ def walk_forward_train(df: pd.DataFrame) -> pd.DataFrame:
         else:
             signal = "HOLD"
 
-        true_label = int(df["Label"].iloc[t])
-
         records.append({
-            "DATE": df[DATE_COL].iloc[t],
+            "DATE": dates[t],
             "ML_Label": pred_label,
             "ML_Conf": pred_conf,
             "ML_Signal": signal,
-            "True_Label": true_label,
+            "True_Label": int(true_labels[t]),
         })
 
     preds_df = pd.DataFrame(records)
@@ -275,31 +294,62 @@ def walk_forward_train(df: pd.DataFrame) -> pd.DataFrame:
     return preds_df
 
 
+def tuned_num_boost_round(sc) -> int:
+    """
+    Boosting rounds for the walk-forward: the early-stopped best iteration
+    of the latest registry version (MLTrainer.py) when it was trained with
+    the current tree params, otherwise the configured n_estimators.
+    """
+    registry_dir = model_registry.registry_directory(sc.target_directory)
+    metas = model_registry.list_versions(registry_dir, sc.symbol)
+    if not metas or "best_iteration" not in metas[-1]:
+        return sc.n_estimators
+
+    trained = metas[-1].get("params", {})
+    current = sc.xgb_params
+    if any(trained.get(k) != current[k] for k in ("max_depth", "learning_rate", "subsample", "colsample_bytree")):
+        return sc.n_estimators
+    return min(sc.n_estimators, metas[-1]["best_iteration"] + 1)
+
+
 # ------------------------------------------------------------------------------------
 # MAIN
 # ------------------------------------------------------------------------------------
-def run_walk_forward():
+def run_walk_forward(symbol: str = None):
+    sc = get_symbol_config(symbol)
+    input_file = sc.analysis_file
+    wf_pred_file = os.path.join(sc.target_directory, f"{sc.symbol}_ML_WF_Predictions.csv")
+
     print(f"--- Walk-Forward Trainer ---")
-    print(f"Input Analysis File: {INPUT_FILE}")
-    print(f"Output Predictions:  {WF_PRED_FILE}")
+    print(f"Input Analysis File: {input_file}")
+    print(f"Output Predictions:  {wf_pred_file}")
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERROR: Input file not found: {INPUT_FILE}")
+    if not os.path.exists(input_file):
+        print(f"ERROR: Input file not found: {input_file}")
         return
 
-    df_raw = pd.read_csv(INPUT_FILE, thousands=",")
+    df_raw = pd.read_csv(input_file, thousands=",")
     df_clean = clean_data(df_raw.copy())
     if df_clean.empty:
         print("ERROR: Data empty after cleaning.")
         return
 
-    df_feat = add_features(df_clean.copy())
-    df_feat = add_labels(df_feat, up_thresh=0.002, down_thresh=-0.002)
+    df_feat = df_clean.copy()
+    df_feat = add_features(df_feat, feature_store.open_store(sc.target_directory, sc.symbol, df_feat))
+    df_feat = label_engine.add_label_columns(df_feat, sc)
+    purge = label_engine.label_horizon(sc) - 1
+
+    num_boost_round = tuned_num_boost_round(sc)
+    print(f"Boosting rounds per fold: {num_boost_round} (max {sc.n_estimators})")
+
+    print(f"Label: {sc.label_mode} (training rows purged per fold: {purge})")
 
-    preds_df = walk_forward_train(df_feat)
+    preds_df = walk_forward_train(df_feat, sc.xgb_params, num_boost_round, purge=purge,
+                                  attribution_file=attribution_store.wf_attribution_path(sc.target_directory, sc.symbol),
+                                  sc=sc)
 
-    preds_df.to_csv(WF_PRED_FILE, index=False)
-    print(f"\n✔ Walk-forward predictions saved to: {WF_PRED_FILE}")
+    preds_df.to_csv(wf_pred_file, index=False)
+    print(f"\n✔ Walk-forward predictions saved to: {wf_pred_file}")
 
 
 if __name__ == "__main__":
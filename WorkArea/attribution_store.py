@@ -0,0 +1,167 @@
+# attribution_store.py
+"""
+Feature attribution cache for the XGBoost signal models.
+
+For every model version MLTrainer stores, next to model.ubj / meta.json:
+
+    attribution.npz   feature_cols, gain (n_features,), shap (n_rows, n_features + 1, 3)
+                      for the training rows, dates of those rows
+
+and WalkForwardTrainer writes <SYMBOL>_ML_WF_Attribution.npz with the gain
+importance of every fold model plus the TreeSHAP values of the rows each fold
+predicted. SHAP values come from XGBoost's native pred_contribs (TreeSHAP);
+the last feature slot is the bias term. Arrays are float32 and stored
+column-wise in one compressed .npz, so reading a single column is cheap.
+
+python attribution_store.py [SYMBOL]  prints the feature ranking of the
+latest model version and of the walk-forward folds.
+"""
+
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ATTRIBUTION_FILE_NAME = "attribution.npz"
+
+
+def gain_importance(booster, feature_cols: List[str]) -> np.ndarray:
+    """Total gain per feature (0 for features never split on)."""
+    score = booster.get_score(importance_type="total_gain")
+    return np.array([score.get(c, score.get(f"f{i}", 0.0)) for i, c in enumerate(feature_cols)],
+                    dtype=np.float32)
+
+
+def shap_values(booster, X) -> np.ndarray:
+    """TreeSHAP contributions, shaped (n_rows, n_features + 1, n_classes)."""
+    import xgboost as xgb
+
+    arr = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    contribs = booster.predict(xgb.DMatrix(arr, feature_names=booster.feature_names), pred_contribs=True)
+    if contribs.ndim == 3:                       # multi-class: (rows, classes, features + 1)
+        contribs = contribs.transpose(0, 2, 1)
+    else:
+        contribs = contribs[:, :, None]
+    return contribs.astype(np.float32)
+
+
+def _date_strings(dates) -> np.ndarray:
+    return pd.to_datetime(pd.Series(dates)).dt.strftime("%Y-%m-%d").to_numpy(dtype="U10")
+
+
+# ------------------------------------------------------------------------------------
+# MODEL VERSION
+# ------------------------------------------------------------------------------------
+def attribution_path(registry_dir: str, symbol: str, version: str) -> str:
+    return os.path.join(registry_dir, symbol, version, ATTRIBUTION_FILE_NAME)
+
+
+def save_version_attribution(registry_dir: str, symbol: str, version: str,
+                             booster, X_train, feature_cols: List[str], dates) -> str:
+    """Gain + training-set TreeSHAP for one registry version."""
+    path = attribution_path(registry_dir, symbol, version)
+    np.savez_compressed(
+        path,
+        feature_cols=np.array(feature_cols),
+        gain=gain_importance(booster, feature_cols),
+        shap=shap_values(booster, X_train),
+        dates=_date_strings(dates),
+    )
+    return path
+
+
+def load_attribution(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+# ------------------------------------------------------------------------------------
+# WALK-FORWARD FOLDS
+# ------------------------------------------------------------------------------------
+class FoldRecorder:
+    """
+    on_fold callback for WalkForwardTrainer.walk_forward_proba: keeps the
+    gain importance of each fold model and the SHAP values of the rows it
+    predicted (not the whole training prefix, which would be O(t) per fold).
+    """
+
+    def __init__(self, X: np.ndarray, feature_cols: List[str], dates):
+        self.X = X
+        self.feature_cols = list(feature_cols)
+        self.dates = _date_strings(dates)
+        self.fold_start: List[int] = []
+        self.gain: List[np.ndarray] = []
+        self.pred_idx: List[np.ndarray] = []
+        self.shap: List[np.ndarray] = []
+
+    def __call__(self, t: int, stop: int, booster) -> None:
+        self.fold_start.append(t)
+        self.gain.append(gain_importance(booster, self.feature_cols))
+        self.pred_idx.append(np.arange(t, stop))
+        self.shap.append(shap_values(booster, self.X[t:stop]))
+
+    def save(self, path: str) -> str:
+        pred_idx = np.concatenate(self.pred_idx) if self.pred_idx else np.zeros(0, dtype=int)
+        np.savez_compressed(
+            path,
+            feature_cols=np.array(self.feature_cols),
+            fold_start=np.array(self.fold_start, dtype=np.int32),
+            fold_date=self.dates[np.array(self.fold_start, dtype=int)],
+            gain=np.vstack(self.gain) if self.gain else np.zeros((0, len(self.feature_cols)), np.float32),
+            pred_idx=pred_idx.astype(np.int32),
+            pred_date=self.dates[pred_idx],
+            shap=(np.concatenate(self.shap) if self.shap
+                  else np.zeros((0, len(self.feature_cols) + 1, 3), np.float32)),
+        )
+        return path
+
+
+def wf_attribution_path(target_directory: str, symbol: str) -> str:
+    return os.path.join(target_directory, f"{symbol}_ML_WF_Attribution.npz")
+
+
+# ------------------------------------------------------------------------------------
+# SUMMARY
+# ------------------------------------------------------------------------------------
+def importance_table(att: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    One row per feature: share of total gain and mean |SHAP| (summed over
+    classes), sorted by mean |SHAP|. Works for both file kinds.
+    """
+    cols = [str(c) for c in att["feature_cols"]]
+    gain = att["gain"]
+    gain = gain.mean(axis=0) if gain.ndim == 2 else gain
+    shap = np.abs(att["shap"][:, :len(cols), :]).sum(axis=2).mean(axis=0) if len(att["shap"]) else np.zeros(len(cols))
+
+    table = pd.DataFrame({
+        "feature": cols,
+        "gain_share": gain / gain.sum() if gain.sum() > 0 else gain,
+        "mean_abs_shap": shap,
+    })
+    return table.sort_values("mean_abs_shap", ascending=False).reset_index(drop=True)
+
+
+def main(symbol: str = None):
+    import model_registry  # type: ignore
+    from config_loader import get_symbol_config  # type: ignore
+
+    sc = get_symbol_config(symbol)
+    registry_dir = model_registry.registry_directory(sc.target_directory)
+    metas = model_registry.list_versions(registry_dir, sc.symbol)
+
+    if metas:
+        path = attribution_path(registry_dir, sc.symbol, metas[-1]["version"])
+        if os.path.exists(path):
+            print(f"--- Feature attribution: {sc.symbol} model {metas[-1]['version']} (training rows) ---")
+            print(importance_table(load_attribution(path)).to_string(index=False))
+
+    wf_path = wf_attribution_path(sc.target_directory, sc.symbol)
+    if os.path.exists(wf_path):
+        print(f"\n--- Feature attribution: {sc.symbol} walk-forward (out-of-sample rows) ---")
+        print(importance_table(load_attribution(wf_path)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,16 +1,87 @@
 # config_loader.py
+import os
 import configparser
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 
 CONFIG_FILE = "configProcess.ini"
 
-_cfg_cache = None   # Cached values (INI read only once)
+_parser_cache = None  # Parsed INI (read only once)
+_cfg_cache = None     # Cached [PATHS] values for the default symbol
+_symbol_cache: Dict[str, "SymbolConfig"] = {}
 
-def load_config():
-    global _cfg_cache
+# Built-in defaults, overridden by [PATHS] / [TRADING], then by [SYMBOL_<SYMBOL>]
+DEFAULTS = {
+    "target_directory": ".",
+    "equity_file_name": "",
+    "delivery_file_name": "",
+    "sd_multiplier": "0.2",
+    "trading_qty": "1000",
+    "investment_amount": "100000",
+    "vwap_expand_pct": "5.0",
+    "threshold_mode": "static",
+    "threshold_window": "250",
+    "threshold_min_periods": "60",
+    "threshold_store_dir": "thresholds",
+    # Folder of the downloaded bhavcopy files (trading calendar, see trading_calendar.py)
+    "bhavcopy_directory": "",
+    # F&O contracts in the daily OI / volume sums: all | futures | near_month (see fo_contracts.py)
+    "fo_contracts": "all",
+    "hard_exit_pct": "0.95",
+    "trailing_exit_pct": "-15",
+    "ema_exit_long_pct": "10",
+    "ema_exit_short_pct": "10",
+    # [ML] model / label settings (HyperSearch.py prints tuned values for [SYMBOL_<SYMBOL>])
+    "n_estimators": "300",
+    "max_depth": "4",
+    "learning_rate": "0.05",
+    "subsample": "0.9",
+    "colsample_bytree": "0.9",
+    "min_child_weight": "1",
+    "early_stopping_rounds": "30",
+    "valid_fraction": "0.15",
+    "label_up_thresh": "0.002",
+    "label_down_thresh": "-0.002",
+    # next_day | horizon_<h> | triple_barrier (see label_engine.py)
+    "label_mode": "next_day",
+    "tb_profit_take": "0.02",
+    "tb_stop_loss": "0.02",
+    "tb_max_days": "10",
+    "tb_entry": "next_open",
+    # Add the F&O analytics features (feature_store.FO_FEATURE_COLS) to the model inputs
+    "fo_features": "false",
+    # [COSTS] charges per order in % of turnover (see cost_model.py); none by default
+    "brokerage_pct": "0",
+    "brokerage_cap": "0",
+    "stt_buy_pct": "0",
+    "stt_sell_pct": "0",
+    "exchange_pct": "0",
+    "gst_pct": "0",
+    "stamp_pct": "0",
+    "slippage_bps": "0",
+    "lot_size": "1",
+}
+
+# XGBoost settings that are not tuned (3-class softprob on -1 / 0 / +1 labels)
+XGB_FIXED_PARAMS = {
+    "objective": "multi:softprob",
+    "num_class": 3,
+    "eval_metric": "mlogloss",
+    "tree_method": "hist",
+    "seed": 42,
+}
 
-    # Return cached config if already loaded
-    if _cfg_cache is not None:
-        return _cfg_cache
+
+def _clean(value: str) -> str:
+    return value.strip().strip('"').strip("'")
+
+
+def _read_parser() -> configparser.ConfigParser:
+    global _parser_cache
+
+    if _parser_cache is not None:
+        return _parser_cache
 
     cfg = configparser.ConfigParser()
     read_files = cfg.read(CONFIG_FILE)
@@ -21,7 +92,18 @@ def load_config():
     if "PATHS" not in cfg:
         raise KeyError("Section [PATHS] missing in configProcess.ini")
 
-    section = cfg["PATHS"]
+    _parser_cache = cfg
+    return _parser_cache
+
+
+def load_config():
+    global _cfg_cache
+
+    # Return cached config if already loaded
+    if _cfg_cache is not None:
+        return _cfg_cache
+
+    section = _read_parser()["PATHS"]
 
     # Load everything once
     _cfg_cache = {
@@ -32,7 +114,251 @@ def load_config():
         "TRADING_QTY": int(section.get("TRADING_QTY", "1000")),
         "INVESTMENT_AMOUNT": int(section.get("INVESTMENT_AMOUNT", "100000")),
         "DIFFERENCE_THRESHOLD_PCT": float(section.get("VWAP_EXPAND_PCT", "5.0")),
-        "SYMBOL": section.get("SYMBOL", "STOCK")
+        "SYMBOL": section.get("SYMBOL", "STOCK"),
+        # static = one threshold set from [THRESHOLDS_<SYMBOL>]
+        # rolling / expanding = per-date thresholds from past data only
+        "THRESHOLD_MODE": section.get("THRESHOLD_MODE", "static").strip().lower(),
+        "THRESHOLD_WINDOW": int(section.get("THRESHOLD_WINDOW", "250")),
+        "THRESHOLD_MIN_PERIODS": int(section.get("THRESHOLD_MIN_PERIODS", "60")),
+        # One THRESHOLDS_<SYMBOL>.ini per symbol (see threshold_store.py)
+        "THRESHOLD_STORE_DIR": section.get("THRESHOLD_STORE_DIR", "thresholds").strip().strip('"').strip("'"),
     }
 
     return _cfg_cache
+
+
+# ------------------------------------------------------------------------------------
+# PER-SYMBOL CONFIG
+# ------------------------------------------------------------------------------------
+@dataclass(frozen=True)
+class SymbolConfig:
+    """Immutable, fully resolved settings for one symbol."""
+    symbol: str
+    target_directory: str
+    equity_file_name: str
+    delivery_file_name: str
+    sd_multiplier: float
+    trading_qty: int
+    investment_amount: int
+    difference_threshold_pct: float
+    threshold_mode: str
+    threshold_window: int
+    threshold_min_periods: int
+    threshold_store_dir: str
+    bhavcopy_directory: str
+    fo_contracts: str
+    hard_exit_pct: float
+    trailing_exit_pct: float
+    ema_exit_long_pct: float
+    ema_exit_short_pct: float
+    n_estimators: int
+    max_depth: int
+    learning_rate: float
+    subsample: float
+    colsample_bytree: float
+    min_child_weight: float
+    early_stopping_rounds: int
+    valid_fraction: float
+    label_up_thresh: float
+    label_down_thresh: float
+    label_mode: str
+    tb_profit_take: float
+    tb_stop_loss: float
+    tb_max_days: int
+    tb_entry: str
+    fo_features: bool
+    brokerage_pct: float
+    brokerage_cap: float
+    stt_buy_pct: float
+    stt_sell_pct: float
+    exchange_pct: float
+    gst_pct: float
+    stamp_pct: float
+    slippage_bps: float
+    lot_size: int
+
+    @property
+    def thresholds(self) -> Mapping[str, float]:
+        """Read-only view of the stored thresholds (mtime-cached by threshold_store)."""
+        import threshold_store  # type: ignore
+        return MappingProxyType(threshold_store.load_thresholds(self.symbol, self.threshold_store_dir))
+
+    @property
+    def xgb_params(self) -> Dict[str, object]:
+        """Native xgb.train params (n_estimators is the maximum number of rounds)."""
+        return dict(
+            XGB_FIXED_PARAMS,
+            max_depth=self.max_depth,
+            learning_rate=self.learning_rate,
+            subsample=self.subsample,
+            colsample_bytree=self.colsample_bytree,
+            min_child_weight=self.min_child_weight,
+        )
+
+    @property
+    def cost_model(self):
+        """cost_model.CostModel from the [COSTS] settings."""
+        import cost_model  # type: ignore
+        return cost_model.CostModel.from_config(self)
+
+    @property
+    def analysis_file(self) -> str:
+        return os.path.join(self.target_directory, f"{self.symbol}_Analysis.csv")
+
+
+def default_symbol() -> str:
+    return _read_parser()["PATHS"].get("SYMBOL", "STOCK")
+
+
+def configured_symbols() -> List[str]:
+    """Default symbol plus every symbol with a [SYMBOL_<SYMBOL>] section."""
+    parser = _read_parser()
+    symbols = [default_symbol()]
+    for section in parser.sections():
+        if section.startswith("SYMBOL_") and section[7:] not in symbols:
+            symbols.append(section[7:])
+    return symbols
+
+
+def _resolve_target_directory(symbol: str, merged: dict, override: Optional[configparser.SectionProxy]) -> str:
+    """
+    [SYMBOL_<SYMBOL>] target_directory wins; otherwise a global path may use a
+    {symbol} placeholder. A plain global path belongs to the default symbol, so
+    other symbols use the sibling folder <parent>/<SYMBOL>/.
+    """
+    target = _clean(merged["target_directory"])
+    if override is not None and "target_directory" in override:
+        return target.format(symbol=symbol)
+    if "{symbol}" in target:
+        return target.format(symbol=symbol)
+    if symbol == default_symbol():
+        return target
+
+    parent = os.path.dirname(target.rstrip("/\\"))
+    return os.path.join(parent, symbol) + "/"
+
+
+def get_symbol_config(symbol: Optional[str] = None) -> SymbolConfig:
+    """
+    Resolve config for `symbol` (default: [PATHS] symbol) as
+    DEFAULTS -> [PATHS] / [TRADING] / [ML] / [COSTS] -> [SYMBOL_<SYMBOL>]. Cached by symbol.
+    """
+    symbol = symbol or default_symbol()
+    if symbol in _symbol_cache:
+        return _symbol_cache[symbol]
+
+    parser = _read_parser()
+    merged = dict(DEFAULTS)
+    for section in ("PATHS", "TRADING", "ML", "COSTS"):
+        if parser.has_section(section):
+            merged.update(parser[section])
+
+    override_name = f"SYMBOL_{symbol}"
+    override = parser[override_name] if parser.has_section(override_name) else None
+    if override is not None:
+        merged.update(override)
+
+    sc = SymbolConfig(
+        symbol=symbol,
+        target_directory=_resolve_target_directory(symbol, merged, override),
+        equity_file_name=_clean(merged["equity_file_name"]),
+        delivery_file_name=_clean(merged["delivery_file_name"]),
+        sd_multiplier=float(merged["sd_multiplier"]),
+        trading_qty=int(merged["trading_qty"]),
+        investment_amount=int(merged["investment_amount"]),
+        difference_threshold_pct=float(merged["vwap_expand_pct"]),
+        threshold_mode=merged["threshold_mode"].strip().lower(),
+        threshold_window=int(merged["threshold_window"]),
+        threshold_min_periods=int(merged["threshold_min_periods"]),
+        threshold_store_dir=_clean(merged["threshold_store_dir"]),
+        bhavcopy_directory=_clean(merged["bhavcopy_directory"]),
+        fo_contracts=merged["fo_contracts"].strip().lower(),
+        hard_exit_pct=float(merged["hard_exit_pct"]),
+        trailing_exit_pct=float(merged["trailing_exit_pct"]),
+        ema_exit_long_pct=float(merged["ema_exit_long_pct"]),
+        ema_exit_short_pct=float(merged["ema_exit_short_pct"]),
+        n_estimators=int(merged["n_estimators"]),
+        max_depth=int(merged["max_depth"]),
+        learning_rate=float(merged["learning_rate"]),
+        subsample=float(merged["subsample"]),
+        colsample_bytree=float(merged["colsample_bytree"]),
+        min_child_weight=float(merged["min_child_weight"]),
+        early_stopping_rounds=int(merged["early_stopping_rounds"]),
+        valid_fraction=float(merged["valid_fraction"]),
+        label_up_thresh=float(merged["label_up_thresh"]),
+        label_down_thresh=float(merged["label_down_thresh"]),
+        label_mode=merged["label_mode"].strip().lower(),
+        tb_profit_take=float(merged["tb_profit_take"]),
+        tb_stop_loss=float(merged["tb_stop_loss"]),
+        tb_max_days=int(merged["tb_max_days"]),
+        tb_entry=merged["tb_entry"].strip().lower(),
+        fo_features=merged["fo_features"].strip().lower() in ("1", "true", "yes", "on"),
+        brokerage_pct=float(merged["brokerage_pct"]),
+        brokerage_cap=float(merged["brokerage_cap"]),
+        stt_buy_pct=float(merged["stt_buy_pct"]),
+        stt_sell_pct=float(merged["stt_sell_pct"]),
+        exchange_pct=float(merged["exchange_pct"]),
+        gst_pct=float(merged["gst_pct"]),
+        stamp_pct=float(merged["stamp_pct"]),
+        slippage_bps=float(merged["slippage_bps"]),
+        lot_size=int(merged["lot_size"]),
+    )
+    _symbol_cache[symbol] = sc
+    return sc
+
+
+# ------------------------------------------------------------------------------------
+# PORTFOLIO CONFIG
+# ------------------------------------------------------------------------------------
+PORTFOLIO_DEFAULTS = {
+    "symbols": "",                # comma separated; empty = configured_symbols()
+    "signals": "wf",              # ml | wf | rule (trade file each symbol's signals come from)
+    "allocation": "equal",        # equal | vol
+    "max_positions": "10",        # 0 = no limit
+    "vol_window": "20",
+    "max_weight": "1.0",
+    "gross_exposure": "1.0",
+}
+
+
+@dataclass(frozen=True)
+class PortfolioConfig:
+    """[PORTFOLIO] settings of PortfolioBacktest.py (shared capital over many symbols)."""
+    symbols: List[str]
+    signals: str
+    allocation: str
+    max_positions: int
+    vol_window: int
+    max_weight: float
+    gross_exposure: float
+    investment_amount: int
+    target_directory: str
+
+
+def get_portfolio_config() -> PortfolioConfig:
+    """PORTFOLIO_DEFAULTS -> [PORTFOLIO]; capital and output folder default to [PATHS]."""
+    parser = _read_parser()
+    merged = dict(PORTFOLIO_DEFAULTS)
+    if parser.has_section("PORTFOLIO"):
+        merged.update(parser["PORTFOLIO"])
+    sc = get_symbol_config()
+
+    symbols = [s.strip() for s in _clean(merged["symbols"]).split(",") if s.strip()]
+    return PortfolioConfig(
+        symbols=symbols or configured_symbols(),
+        signals=merged["signals"].strip().lower(),
+        allocation=merged["allocation"].strip().lower(),
+        max_positions=int(merged["max_positions"]),
+        vol_window=int(merged["vol_window"]),
+        max_weight=float(merged["max_weight"]),
+        gross_exposure=float(merged["gross_exposure"]),
+        investment_amount=int(merged.get("investment_amount", sc.investment_amount)),
+        target_directory=_clean(merged.get("target_directory", sc.target_directory)),
+    )
+
+
+def clear_config_cache() -> None:
+    global _parser_cache, _cfg_cache
+    _parser_cache = None
+    _cfg_cache = None
+    _symbol_cache.clear()
@@ -0,0 +1,138 @@
+# cost_model.py
+"""
+Transaction costs, slippage and lot sizes for the backtests.
+
+Every order (leg) is charged on its turnover = |quantity| * price:
+
+    brokerage   brokerage_pct % of turnover, at most brokerage_cap per order (0 = no cap)
+    STT         stt_buy_pct / stt_sell_pct % of turnover
+    exchange    exchange_pct % of turnover (exchange transaction + SEBI fees)
+    GST         gst_pct % of brokerage + exchange fees
+    stamp duty  stamp_pct % of turnover, buy orders only
+    slippage    slippage_bps of turnover (execution worse than the quoted price)
+
+Quantities are rounded down to a multiple of lot_size (NSE F&O lot; 1 for
+shares). All rates come from [COSTS] / [SYMBOL_<SYMBOL>] in
+configProcess.ini; the defaults charge nothing.
+
+execution_core charges the legs inside its kernel (compounded capital pays
+them); cost_breakdown splits the charges of a backtest per bar, vectorized.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+COST_COMPONENTS = ("Brokerage", "STT", "Exchange_Fees", "GST", "Stamp_Duty", "Slippage")
+COST_COLUMNS = COST_COMPONENTS + ("Turnover", "Trade_Cost")
+
+
+@dataclass(frozen=True)
+class CostModel:
+    brokerage_pct: float = 0.0
+    brokerage_cap: float = 0.0
+    stt_buy_pct: float = 0.0
+    stt_sell_pct: float = 0.0
+    exchange_pct: float = 0.0
+    gst_pct: float = 0.0
+    stamp_pct: float = 0.0
+    slippage_bps: float = 0.0
+    lot_size: int = 1
+
+    @classmethod
+    def from_config(cls, sc) -> "CostModel":
+        return cls(
+            brokerage_pct=sc.brokerage_pct,
+            brokerage_cap=sc.brokerage_cap,
+            stt_buy_pct=sc.stt_buy_pct,
+            stt_sell_pct=sc.stt_sell_pct,
+            exchange_pct=sc.exchange_pct,
+            gst_pct=sc.gst_pct,
+            stamp_pct=sc.stamp_pct,
+            slippage_bps=sc.slippage_bps,
+            lot_size=sc.lot_size,
+        )
+
+    # Proportional charges other than brokerage, as fractions of turnover
+    @property
+    def buy_rate(self) -> float:
+        return (self.stt_buy_pct + self.exchange_pct * (1 + self.gst_pct / 100) + self.stamp_pct) / 100 \
+            + self.slippage_bps / 10_000
+
+    @property
+    def sell_rate(self) -> float:
+        return (self.stt_sell_pct + self.exchange_pct * (1 + self.gst_pct / 100)) / 100 + self.slippage_bps / 10_000
+
+    def kernel_args(self) -> tuple:
+        """(lot, buy_rate, sell_rate, brokerage rate, cap, GST multiplier) for the kernel."""
+        return (float(max(int(self.lot_size), 1)), self.buy_rate, self.sell_rate,
+                self.brokerage_pct / 100, float(self.brokerage_cap), 1 + self.gst_pct / 100)
+
+
+NO_COSTS = CostModel()
+
+
+def leg_cost(turnover: float, buy: bool, model: CostModel) -> float:
+    """Total charge of one order (same formula as the execution_core kernel)."""
+    brokerage = turnover * model.brokerage_pct / 100
+    if model.brokerage_cap > 0 and brokerage > model.brokerage_cap:
+        brokerage = model.brokerage_cap
+    return turnover * (model.buy_rate if buy else model.sell_rate) + brokerage * (1 + model.gst_pct / 100)
+
+
+def _leg_breakdown(qty: np.ndarray, price: np.ndarray, model: CostModel) -> dict:
+    turnover = np.abs(qty) * np.nan_to_num(price)
+    buy = qty > 0
+    brokerage = turnover * model.brokerage_pct / 100
+    if model.brokerage_cap > 0:
+        brokerage = np.minimum(brokerage, model.brokerage_cap)
+    exchange = turnover * model.exchange_pct / 100
+    return {
+        "Brokerage": brokerage,
+        "STT": turnover * np.where(buy, model.stt_buy_pct, model.stt_sell_pct) / 100,
+        "Exchange_Fees": exchange,
+        "GST": (brokerage + exchange) * model.gst_pct / 100,
+        "Stamp_Duty": np.where(buy, turnover * model.stamp_pct / 100, 0.0),
+        "Slippage": turnover * model.slippage_bps / 10_000,
+    }
+
+
+def cost_breakdown(price, exit_qty, entry_qty, model: CostModel, index=None) -> pd.DataFrame:
+    """
+    Per-bar charges of the exit and entry legs (signed quantities, executed
+    at `price`): one column per component plus Turnover.
+    """
+    price = np.asarray(price, dtype=float)
+    exit_qty = np.asarray(exit_qty, dtype=float)
+    entry_qty = np.asarray(entry_qty, dtype=float)
+    exit_legs = _leg_breakdown(exit_qty, price, model)
+    entry_legs = _leg_breakdown(entry_qty, price, model)
+
+    out = pd.DataFrame({c: exit_legs[c] + entry_legs[c] for c in COST_COMPONENTS}, index=index)
+    out["Turnover"] = (np.abs(exit_qty) + np.abs(entry_qty)) * np.nan_to_num(price)
+    return out
+
+
+def cost_summary(trades: pd.DataFrame) -> pd.Series:
+    """Aggregate charges of a backtest frame with Trade_Cost (and the component columns)."""
+    summary = {c: trades[c].sum() for c in COST_COMPONENTS if c in trades.columns}
+    summary["Trade_Cost"] = trades["Trade_Cost"].sum()
+    if "Turnover" in trades.columns:
+        turnover = trades["Turnover"].sum()
+        summary["Turnover"] = turnover
+        summary["Cost_Pct_Turnover"] = summary["Trade_Cost"] / turnover * 100 if turnover > 0 else 0.0
+    if "Daily_PnL" in trades.columns:
+        summary["Net_PnL"] = trades["Daily_PnL"].sum()
+        summary["Gross_PnL"] = summary["Net_PnL"] + summary["Trade_Cost"]
+    return pd.Series(summary)
+
+
+def format_summary(trades: pd.DataFrame) -> str:
+    s = cost_summary(trades)
+    text = f"Costs: {s['Trade_Cost']:,.2f}"
+    if "Cost_Pct_Turnover" in s:
+        text += f" ({s['Cost_Pct_Turnover']:.3f}% of turnover {s['Turnover']:,.0f})"
+    if "Gross_PnL" in s:
+        text += f" | Gross PnL {s['Gross_PnL']:,.2f} -> Net {s['Net_PnL']:,.2f}"
+    return text
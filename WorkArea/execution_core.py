@@ -0,0 +1,358 @@
+# execution_core.py
+"""
+Common execution core for all backtests.
+
+A strategy only turns the frame into arrays (vectorized):
+
+    signals(df)       int8 per bar, BUY = 1 / HOLD = 0 / SELL = -1; the
+                      signal of bar t is acted on at bar t + 1
+    entry_levels(df)  optional (long_level, short_level): an entry needs the
+                      level of the signal bar above the level of the previous
+                      entry on that side (reset to 0 when the side is closed)
+
+run_backtest executes them with one kernel:
+
+  execution  "next_open": trade at the open of the next bar (ML pipelines)
+             "close":     trade at the close of the bar (rule strategies)
+  sizing     "compound":  floor(capital / price), capital += realized PnL
+                          whenever a trade is closed (never below 0)
+             "fixed":     floor(investment_amount / price)
+  hold_exits        HOLD closes an open position (ML) or keeps it (rules)
+  reverse_same_bar  after a signal exit, enter the opposite side on the same bar
+  costs             cost_model.CostModel: quantities are rounded down to whole
+                    lots and every order pays its charges (taken from the
+                    capital when compounding and from Daily_PnL)
+
+Exit modules (StopLoss, TakeProfit, TrailingStop, EmaExit) are checked at the
+execution price of every bar before the signal; a bar with an exit does not
+open a new position. Daily_PnL is close-to-close on the position held over
+the bar (the position after the bar's trade for next-open execution, the
+previous bar's position for execution at the close), less Trade_Cost.
+
+The kernel is compiled with numba when it is installed and otherwise runs
+over Python lists.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import cost_model  # type: ignore
+
+OPEN_COL = "OPEN"
+CLOSE_COL = "close"
+
+BUY, HOLD, SELL = 1, 0, -1
+SIGNAL_CODES = {"BUY": BUY, "HOLD": HOLD, "SELL": SELL}
+
+# Daily signal files written by the backtests: file suffix and signal column
+SIGNAL_SOURCES = {
+    "ml": ("_Trades_ML.csv", "ML_Signal"),
+    "wf": ("_Trades_ML_WF.csv", "ML_Signal"),
+    "rule": ("_Trades.csv", "Signal"),
+}
+
+
+# ------------------------------------------------------------------------------------
+# SETTINGS / EXIT MODULES
+# ------------------------------------------------------------------------------------
+@dataclass(frozen=True)
+class ExecutionSettings:
+    execution: str = "next_open"      # next_open | close
+    sizing: str = "compound"          # compound | fixed
+    investment_amount: float = 100000.0
+    hold_exits: bool = True
+    reverse_same_bar: bool = True
+
+
+@dataclass(frozen=True)
+class StopLoss:
+    """Long exits below entry * (1 - pct), short above entry * (1 + pct)."""
+    pct: float
+
+
+@dataclass(frozen=True)
+class TakeProfit:
+    """Long exits above entry * (1 + pct), short below entry * (1 - pct)."""
+    pct: float
+
+
+@dataclass(frozen=True)
+class TrailingStop:
+    """Exit after a move of pct % against the best price since entry."""
+    pct: float
+
+
+@dataclass(frozen=True)
+class EmaExit:
+    """
+    EMA-armed exit: a long is armed once price > ema * (1 + arm_long) and
+    exits when price falls back below the EMA (shorts mirrored).
+    """
+    ema: np.ndarray
+    arm_long: float = 0.10
+    arm_short: float = 0.10
+
+
+# ------------------------------------------------------------------------------------
+# STRATEGIES
+# ------------------------------------------------------------------------------------
+class Strategy:
+    """Base class: vectorized per-bar signals (+ optional entry levels)."""
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        raise NotImplementedError
+
+    def entry_levels(self, df: pd.DataFrame) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        return None
+
+
+def signal_codes(signal) -> np.ndarray:
+    """BUY / SELL / HOLD strings (or int codes) -> int8 codes."""
+    s = pd.Series(signal)
+    if s.dtype == object:
+        return s.map(SIGNAL_CODES).fillna(HOLD).to_numpy(dtype=np.int8)
+    return s.to_numpy(dtype=np.int8)
+
+
+class SignalColumn(Strategy):
+    """Signals already in the frame (e.g. ML_Signal from the walk-forward)."""
+
+    def __init__(self, col: str = "ML_Signal"):
+        self.col = col
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        return signal_codes(df[self.col])
+
+
+class ProbaThreshold(Strategy):
+    """
+    3-class probabilities (columns SELL / HOLD / BUY): BUY / SELL when that
+    class is the argmax with at least prob_long / prob_short confidence.
+    """
+
+    def __init__(self, proba: np.ndarray, prob_long: float = 0.55, prob_short: float = 0.55):
+        self.proba = np.asarray(proba)
+        self.prob_long = prob_long
+        self.prob_short = prob_short
+
+    def signals(self, df: pd.DataFrame = None) -> np.ndarray:
+        cls = self.proba.argmax(axis=1)
+        conf = self.proba.max(axis=1)
+        return np.select([(cls == 2) & (conf >= self.prob_long), (cls == 0) & (conf >= self.prob_short)],
+                         [BUY, SELL], HOLD).astype(np.int8)
+
+
+# ------------------------------------------------------------------------------------
+# KERNEL
+# ------------------------------------------------------------------------------------
+def _execution_kernel(price, signal, ema, long_level, short_level, use_levels,
+                      compound, investment, hold_exits, reverse_same_bar,
+                      stop_long, stop_short, take_long, take_short, trail_pct,
+                      ema_arm_long, ema_arm_short, lot, buy_rate, sell_rate, brokerage_rate,
+                      brokerage_cap, gst_mult, qty_out, pos_out, entry_out, exit_out, cost_out):
+    """
+    Fills qty_out / pos_out / entry_out / exit_out (exit leg) / cost_out;
+    NaN exit parameters are disabled.
+    """
+    n = len(price)
+    capital = investment
+    position = 0.0
+    entry_price = 0.0
+    best = math.nan          # max (long) / min (short) price since entry
+    armed = False
+    last_long = 0.0
+    last_short = 0.0
+
+    for t in range(1, n):
+        px = price[t]
+        sig = signal[t - 1]
+        trade = 0.0
+        cost = 0.0
+        exited = False
+
+        # ---------------- EXIT MODULES ---------------- #
+        if position != 0.0:
+            e = ema[t]
+            if e > 0:
+                if position > 0:
+                    if (not armed) and ema_arm_long > 0:
+                        if px > e * (1.0 + ema_arm_long):
+                            armed = True
+                    elif armed and px < e:
+                        exited = True
+                else:
+                    if (not armed) and ema_arm_short > 0:
+                        if px < e * (1.0 - ema_arm_short):
+                            armed = True
+                    elif armed and px > e:
+                        exited = True
+
+            if not exited:
+                if position > 0:
+                    if px < entry_price * stop_long or px > entry_price * take_long:
+                        exited = True
+                    elif best > 0 and (px - best) / best * 100.0 <= -trail_pct:
+                        exited = True
+                else:
+                    if px > entry_price * stop_short or px < entry_price * take_short:
+                        exited = True
+                    elif best > 0 and (px - best) / best * 100.0 >= trail_pct:
+                        exited = True
+
+        # ---------------- SIGNAL EXIT ---------------- #
+        signal_exit = False
+        if not exited and position != 0.0:
+            if position > 0 and (sig == -1 or (hold_exits and sig == 0)):
+                signal_exit = True
+            elif position < 0 and (sig == 1 or (hold_exits and sig == 0)):
+                signal_exit = True
+
+        if exited or signal_exit:
+            turnover = abs(position) * px
+            brokerage = turnover * brokerage_rate
+            if brokerage_cap > 0 and brokerage > brokerage_cap:
+                brokerage = brokerage_cap
+            cost = turnover * (sell_rate if position > 0 else buy_rate) + brokerage * gst_mult
+            if compound:
+                capital += (px - entry_price) * position - cost
+                if capital < 0:
+                    capital = 0.0
+            exit_out[t] = -position
+            if position > 0:
+                last_long = 0.0
+            else:
+                last_short = 0.0
+            trade = -position
+            position = 0.0
+            entry_price = 0.0
+            best = math.nan
+            armed = False
+
+        # ---------------- ENTRY ---------------- #
+        if position == 0.0 and not exited and (reverse_same_bar or not signal_exit) and sig != 0:
+            allowed = True
+            if use_levels:
+                level = long_level[t - 1] if sig == 1 else short_level[t - 1]
+                allowed = level > (last_long if sig == 1 else last_short)
+                if allowed:
+                    if sig == 1:
+                        last_long = level
+                    else:
+                        last_short = level
+            if allowed and px > 0:
+                rate = buy_rate if sig == 1 else sell_rate
+                qty = math.floor((capital if compound else investment) / (px * (1.0 + rate)) / lot) * lot
+                if qty > 0:
+                    position = qty * 1.0 if sig == 1 else -qty * 1.0
+                    trade += position
+                    turnover = qty * px
+                    brokerage = turnover * brokerage_rate
+                    if brokerage_cap > 0 and brokerage > brokerage_cap:
+                        brokerage = brokerage_cap
+                    entry_cost = turnover * rate + brokerage * gst_mult
+                    cost += entry_cost
+                    if compound:
+                        capital -= entry_cost
+                        if capital < 0:
+                            capital = 0.0
+                    entry_price = px
+                    best = px
+                    armed = False
+        elif position > 0:
+            best = px if math.isnan(best) else max(best, px)
+        elif position < 0:
+            best = px if math.isnan(best) else min(best, px)
+
+        qty_out[t] = trade
+        pos_out[t] = position
+        entry_out[t] = entry_price
+        cost_out[t] = cost
+
+
+try:
+    from numba import njit  # type: ignore
+    _compiled_kernel = njit(cache=True)(_execution_kernel)
+except ImportError:
+    _compiled_kernel = None
+
+
+def _prices(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        raise KeyError(f"Required column '{col}' not found for trade execution.")
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+# ------------------------------------------------------------------------------------
+# RUN
+# ------------------------------------------------------------------------------------
+def run_backtest(df: pd.DataFrame,
+                 strategy: Strategy,
+                 settings: ExecutionSettings = ExecutionSettings(),
+                 exits: Sequence = (),
+                 costs: cost_model.CostModel = None) -> pd.DataFrame:
+    """
+    Quantity_Traded, Position, Entry_Price, Trade_Cost, Daily_PnL and
+    Cumulative_PnL for the frame (same index); with costs also the per-bar
+    cost components and Turnover. Needs close, and OPEN for next-open execution.
+    """
+    n = len(df)
+    close = _prices(df, CLOSE_COL)
+    price = _prices(df, OPEN_COL) if settings.execution == "next_open" else close
+    signal = np.asarray(strategy.signals(df), dtype=np.int8)
+
+    levels = strategy.entry_levels(df)
+    use_levels = levels is not None
+    long_level, short_level = levels if use_levels else (np.zeros(n), np.zeros(n))
+
+    nan = math.nan
+    stop_long = stop_short = take_long = take_short = trail = nan
+    ema, arm_long, arm_short = np.full(n, nan), 0.0, 0.0
+    for ex in exits:
+        if isinstance(ex, StopLoss):
+            stop_long, stop_short = 1.0 - ex.pct, 1.0 + ex.pct
+        elif isinstance(ex, TakeProfit):
+            take_long, take_short = 1.0 + ex.pct, 1.0 - ex.pct
+        elif isinstance(ex, TrailingStop):
+            trail = ex.pct
+        elif isinstance(ex, EmaExit):
+            ema, arm_long, arm_short = np.asarray(ex.ema, dtype=float), ex.arm_long, ex.arm_short
+        else:
+            raise TypeError(f"Unknown exit module: {ex!r}")
+
+    args = (settings.sizing == "compound", float(settings.investment_amount), settings.hold_exits,
+            settings.reverse_same_bar, stop_long, stop_short, take_long, take_short, trail,
+            float(arm_long), float(arm_short)) + (costs or cost_model.NO_COSTS).kernel_args()
+    if _compiled_kernel is not None:
+        qty, pos, entry, exit_qty, cost = (np.zeros(n) for _ in range(5))
+        _compiled_kernel(price, signal, ema, np.asarray(long_level, float), np.asarray(short_level, float),
+                         use_levels, *args, qty, pos, entry, exit_qty, cost)
+    else:
+        # Python lists: scalar access is much cheaper than on NumPy arrays
+        qty, pos, entry, exit_qty, cost = ([0.0] * n for _ in range(5))
+        _execution_kernel(price.tolist(), signal.tolist(), ema.tolist(),
+                          np.asarray(long_level, float).tolist(), np.asarray(short_level, float).tolist(),
+                          use_levels, *args, qty, pos, entry, exit_qty, cost)
+        qty, pos, entry, exit_qty, cost = map(np.array, (qty, pos, entry, exit_qty, cost))
+
+    # Close-to-close PnL on the position held over each bar
+    held = pos if settings.execution == "next_open" else np.concatenate([[0.0], pos[:-1]])
+    pnl = np.zeros(n)
+    if n > 1:
+        pnl[1:] = (close[1:] - close[:-1]) * held[1:]
+
+    out = pd.DataFrame({
+        "Quantity_Traded": qty,
+        "Position": pos,
+        "Entry_Price": entry,
+        "Trade_Cost": cost,
+        "Daily_PnL": pnl - cost,
+    }, index=df.index)
+    out["Cumulative_PnL"] = out["Daily_PnL"].cumsum()
+    if costs is not None:
+        breakdown = cost_model.cost_breakdown(price, exit_qty, qty - exit_qty, costs, index=df.index)
+        out = pd.concat([out, breakdown], axis=1)
+    return out
@@ -0,0 +1,333 @@
+# feature_engine.py
+"""
+Incremental version of GenerateMLTrades.add_features.
+
+Keeps only the rolling state the 15 model features need (last 5 closes,
+EMA 10/20/50, last 10 one-day returns, last 5 Longs/Shorts, previous OI,
+last valid values for forward fill; the previous put/call ratio for the
+F&O features of Analysis files with fo_analytics columns) and advances it
+one row at a time, so a new day's features cost a handful of float
+operations instead of a full recompute over the history.
+
+Standard library only; state round-trips through a small JSON file.
+"""
+
+import os
+import re
+import json
+import math
+import tempfile
+from collections import deque
+from typing import Dict, List, Mapping, Optional
+
+# Same column names as GenerateMLTrades.py / MLTrainer.py
+DATE_COL = "DATE"
+OPEN_COL = "OPEN"
+CLOSE_COL = "close"
+VWAP_COL = "vwap"
+LONG_TILL_NOW_COL = "Longs Till Now"
+SHORT_TILL_NOW_COL = "Shorts Till Now"
+OI_SUM_COL = "Daily_Open_Interest_Sum"
+
+FEATURE_COLS = [
+    "ret_1", "ret_3", "ret_5",
+    "vol_10",
+    "gap_ema10", "gap_ema20", "gap_ema50", "gap_vwap",
+    "long_diff", "short_diff", "oi_diff",
+    "long_ratio", "short_ratio",
+    "long_5ch", "short_5ch"
+]
+
+# Same as feature_store.py: F&O analytics inputs and the features built from them
+PCR_COL = "FO_PCR_OI"
+ROLLOVER_COL = "FO_Rollover_Pct"
+NEAR_SHARE_COL = "FO_Near_Share"
+FUTURES_SHARE_COL = "FO_Futures_Share"
+FO_INPUT_COLS = (PCR_COL, ROLLOVER_COL, NEAR_SHARE_COL, FUTURES_SHARE_COL)
+FO_FEATURE_COLS = ["fo_pcr", "fo_pcr_diff", "fo_rollover", "fo_near_share", "fo_fut_share"]
+
+EMA_SPANS = (10, 20, 50)
+VOL_WINDOW = 10
+PCT_LAGS = (1, 3, 5)
+MAX_LAG = max(PCT_LAGS)
+
+# Columns forward-filled by clean_data (rows still missing a required one are dropped)
+FFILL_COLS = (OPEN_COL, CLOSE_COL, VWAP_COL, LONG_TILL_NOW_COL, SHORT_TILL_NOW_COL, OI_SUM_COL)
+REQUIRED_COLS = (CLOSE_COL, LONG_TILL_NOW_COL, SHORT_TILL_NOW_COL, OI_SUM_COL)
+
+_NON_NUMERIC = re.compile(r"[^\d\.\-]")
+
+
+def _to_float(value) -> float:
+    """float() that maps missing / unparsable values to NaN (strings cleaned as in clean_data)."""
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        value = _NON_NUMERIC.sub("", value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _finite(x: float) -> float:
+    """add_features replaces inf / NaN features by 0."""
+    return x if math.isfinite(x) else 0.0
+
+
+def _pct(cur: float, past: Optional[float]) -> float:
+    if past is None:
+        return 0.0
+    if past == 0.0:
+        return 0.0 if cur == 0.0 else math.copysign(math.inf, cur)
+    return cur / past - 1.0
+
+
+def _sample_std(values) -> float:
+    n = len(values)
+    mean = sum(values) / n
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+
+
+class IncrementalFeatures:
+    """
+    Rolling feature state for one symbol. Feed rows in date order with
+    update(row); each call returns that row's features (same values as
+    add_features on the full history), or None for rows clean_data drops.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.last_date: Optional[str] = None
+        self.last_valid: Dict[str, float] = {}               # forward-fill state
+        self.closes = deque(maxlen=MAX_LAG)                   # close[t-5 .. t-1]
+        self.rets = deque(maxlen=VOL_WINDOW)                  # ret_1[t-9 .. t]
+        self.emas: Dict[int, Optional[float]] = {s: None for s in EMA_SPANS}
+        self.longs = deque(maxlen=MAX_LAG)
+        self.shorts = deque(maxlen=MAX_LAG)
+        self.prev_oi: Optional[float] = None
+        self.prev_pcr: Optional[float] = None                # raw FO_PCR_OI (may be NaN)
+        self.last_features: Optional[Dict[str, float]] = None
+
+    # --------------------------------------------------------------------------------
+    def _fill(self, row: Mapping) -> Dict[str, float]:
+        out = {}
+        for col in FFILL_COLS:
+            v = _to_float(row.get(col))
+            if math.isnan(v):
+                v = self.last_valid.get(col, math.nan)
+            else:
+                self.last_valid[col] = v
+            out[col] = v
+        return out
+
+    def update(self, row: Mapping) -> Optional[Dict[str, float]]:
+        """Advance the state by one row (a mapping of Analysis CSV columns)."""
+        vals = self._fill(row)
+        if any(math.isnan(vals[c]) for c in REQUIRED_COLS):
+            return None
+
+        close = vals[CLOSE_COL]
+        longs = vals[LONG_TILL_NOW_COL]
+        shorts = vals[SHORT_TILL_NOW_COL]
+        oi = vals[OI_SUM_COL]
+        vwap = vals[VWAP_COL]
+
+        def lag(buf, k):
+            return buf[-k] if len(buf) >= k else None
+
+        f = {}
+        # vol_10 is taken over ret_1 before its inf -> 0 replacement
+        ret_1 = _pct(close, lag(self.closes, 1))
+        f["ret_1"] = _finite(ret_1)
+        f["ret_3"] = _finite(_pct(close, lag(self.closes, 3)))
+        f["ret_5"] = _finite(_pct(close, lag(self.closes, 5)))
+
+        self.rets.append(ret_1)
+        f["vol_10"] = _finite(_sample_std(self.rets)) if len(self.rets) == VOL_WINDOW else 0.0
+
+        for span in EMA_SPANS:
+            alpha = 2.0 / (span + 1.0)
+            prev = self.emas[span]
+            ema = close if prev is None else alpha * close + (1.0 - alpha) * prev
+            self.emas[span] = ema
+            f[f"gap_ema{span}"] = _finite((close - ema) / ema) if ema != 0.0 else 0.0
+
+        f["gap_vwap"] = _finite((close - vwap) / vwap) if vwap == vwap and vwap != 0.0 else 0.0
+
+        f["long_diff"] = longs - self.longs[-1] if self.longs else 0.0
+        f["short_diff"] = shorts - self.shorts[-1] if self.shorts else 0.0
+        f["oi_diff"] = oi - self.prev_oi if self.prev_oi is not None else 0.0
+
+        total_ls = longs + shorts + 1e-6
+        f["long_ratio"] = _finite(longs / total_ls) if total_ls != 0.0 else 0.0
+        f["short_ratio"] = _finite(shorts / total_ls) if total_ls != 0.0 else 0.0
+
+        f["long_5ch"] = _finite(_pct(longs, lag(self.longs, 5)))
+        f["short_5ch"] = _finite(_pct(shorts, lag(self.shorts, 5)))
+
+        # F&O analytics (not forward-filled, as in add_features)
+        if PCR_COL in row:
+            pcr = _to_float(row.get(PCR_COL))
+            f["fo_pcr"] = _finite(pcr)
+            f["fo_pcr_diff"] = _finite(pcr - self.prev_pcr) if self.prev_pcr is not None else 0.0
+            f["fo_rollover"] = _finite(_to_float(row.get(ROLLOVER_COL)) / 100.0)
+            f["fo_near_share"] = _finite(_to_float(row.get(NEAR_SHARE_COL)))
+            f["fo_fut_share"] = _finite(_to_float(row.get(FUTURES_SHARE_COL)))
+            self.prev_pcr = pcr
+
+        self.closes.append(close)
+        self.longs.append(longs)
+        self.shorts.append(shorts)
+        self.prev_oi = oi
+        self.n_rows += 1
+        date = row.get(DATE_COL)
+        self.last_date = str(date)[:10] if date is not None else self.last_date
+        self.last_features = f
+        return f
+
+    def update_batch(self, rows) -> List[Optional[Dict[str, float]]]:
+        """
+        update() over many rows in order. `rows` is a DataFrame or an iterable
+        of mappings; returns one feature dict (or None) per input row.
+        """
+        if hasattr(rows, "columns"):
+            cols = [c for c in (DATE_COL,) + FFILL_COLS + FO_INPUT_COLS if c in rows.columns]
+            rows = (dict(zip(cols, values)) for values in zip(*(rows[c].tolist() for c in cols)))
+        return [self.update(row) for row in rows]
+
+    def feature_vector(self, feature_cols: List[str] = None) -> List[float]:
+        """Latest features in model order."""
+        if self.last_features is None:
+            raise ValueError("No rows processed yet.")
+        missing = self.missing_features(feature_cols)
+        if missing:
+            raise KeyError(f"Features not available incrementally: {', '.join(missing)}")
+        return [self.last_features[c] for c in (feature_cols or FEATURE_COLS)]
+
+    def missing_features(self, feature_cols: List[str] = None) -> List[str]:
+        """Columns of `feature_cols` the latest row has no value for."""
+        return [c for c in (feature_cols or FEATURE_COLS) if c not in (self.last_features or {})]
+
+    # --------------------------------------------------------------------------------
+    # PERSISTENCE
+    # --------------------------------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {
+            "n_rows": self.n_rows,
+            "last_date": self.last_date,
+            "last_valid": self.last_valid,
+            "closes": list(self.closes),
+            "rets": list(self.rets),
+            "emas": {str(k): v for k, v in self.emas.items()},
+            "longs": list(self.longs),
+            "shorts": list(self.shorts),
+            "prev_oi": self.prev_oi,
+            "prev_pcr": self.prev_pcr,
+            "last_features": self.last_features,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "IncrementalFeatures":
+        st = cls()
+        st.n_rows = d["n_rows"]
+        st.last_date = d["last_date"]
+        st.last_valid = dict(d["last_valid"])
+        st.closes.extend(d["closes"])
+        st.rets.extend(d["rets"])
+        st.emas = {int(k): v for k, v in d["emas"].items()}
+        st.longs.extend(d["longs"])
+        st.shorts.extend(d["shorts"])
+        st.prev_oi = d["prev_oi"]
+        st.prev_pcr = d.get("prev_pcr")
+        st.last_features = d["last_features"]
+        return st
+
+    @classmethod
+    def from_history(cls, df) -> "IncrementalFeatures":
+        """Warm up from a date-sorted DataFrame (e.g. the cleaned Analysis CSV)."""
+        st = cls()
+        st.update_batch(df)
+        return st
+
+
+def save_state(path: str, state: IncrementalFeatures) -> None:
+    """Atomic JSON write (temp file + os.replace), same as threshold_store."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".feature_state.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_state(path: str) -> Optional[IncrementalFeatures]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return IncrementalFeatures.from_dict(json.load(f))
+
+
+# ------------------------------------------------------------------------------------
+# BATCH EQUIVALENCE
+# ------------------------------------------------------------------------------------
+def frame_feature_cols(df) -> List[str]:
+    """FEATURE_COLS, plus FO_FEATURE_COLS when df has the F&O analytics columns."""
+    return FEATURE_COLS + (FO_FEATURE_COLS if PCR_COL in df.columns else [])
+
+
+def features_frame(df, state: Optional[IncrementalFeatures] = None):
+    """
+    Features for every row of `df` via the incremental path, as a DataFrame
+    aligned with df.index (rows the state skipped are NaN).
+    """
+    import pandas as pd
+
+    state = state or IncrementalFeatures()
+    out = state.update_batch(df)
+    cols = frame_feature_cols(df)
+    nan_row = dict.fromkeys(cols, math.nan)
+    return pd.DataFrame([f or nan_row for f in out], index=df.index, columns=cols)
+
+
+def verify_against_add_features(df, split: int = None, atol: float = 1e-9) -> float:
+    """
+    Check that streaming rows through the engine reproduces
+    GenerateMLTrades.add_features on a cleaned frame. The state is warmed up
+    on the first `split` rows, round-tripped through to_dict / from_dict and
+    then fed the rest, so the persisted path is covered too.
+    Returns the max abs difference; raises ValueError above `atol`.
+    """
+    import numpy as np
+    import pandas as pd
+    from GenerateMLTrades import add_features  # type: ignore
+
+    expected = add_features(df.copy())[frame_feature_cols(df)]
+
+    split = len(df) // 2 if split is None else split
+    head = IncrementalFeatures()
+    got_head = features_frame(df.iloc[:split], head)
+    tail = IncrementalFeatures.from_dict(json.loads(json.dumps(head.to_dict())))
+    got_tail = features_frame(df.iloc[split:], tail)
+    got = pd.concat([got_head, got_tail])
+
+    diff = float(np.nanmax(np.abs(got.to_numpy() - expected.to_numpy()))) if len(df) else 0.0
+    if diff > atol:
+        raise ValueError(f"incremental features differ from add_features by {diff:g} (atol {atol:g})")
+    return diff
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from config_loader import get_symbol_config  # type: ignore
+    from GenerateMLTrades import clean_data  # type: ignore
+
+    sc = get_symbol_config()
+    df = clean_data(pd.read_csv(sc.analysis_file, thousands=","))
+    print(f"{sc.symbol}: {len(df)} rows, max abs diff vs add_features = "
+          f"{verify_against_add_features(df):.3g}")
@@ -0,0 +1,301 @@
+# feature_store.py
+"""
+Per-symbol feature store for the derived indicators.
+
+Every indicator (EMAs, returns, OI / delivery changes, ...) is defined once
+here and requested by name + params:
+
+    store = feature_store.open_store(sc.target_directory, sc.symbol, df)
+    ema50 = store.get("ema", col="close", span=50)
+
+Values are computed on first request and memoized in memory and on disk
+(<target_dir>/features/<SYMBOL>/<indicator>__<params>__<data version>.npy).
+The data version is a hash of the source columns the indicator reads, so a
+changed or extended Analysis file gets new entries while GenerateAnalysis,
+the ML trainers and PlotChart share the ones that are still valid. Only the
+newest MAX_VERSIONS files of each indicator/params are kept.
+
+The store assumes its source columns are not modified after it was opened.
+"""
+
+import os
+import re
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAX_VERSIONS = 3
+
+# Column names (same as the Analysis file / ML scripts)
+CLOSE_COL = "close"
+VWAP_COL = "vwap"
+LONG_TILL_NOW_COL = "Longs Till Now"
+SHORT_TILL_NOW_COL = "Shorts Till Now"
+OI_SUM_COL = "Daily_Open_Interest_Sum"
+PCR_COL = "FO_PCR_OI"
+ROLLOVER_COL = "FO_Rollover_Pct"
+NEAR_SHARE_COL = "FO_Near_Share"
+FUTURES_SHARE_COL = "FO_Futures_Share"
+
+# Optional F&O analytics features (fo_analytics.py columns), used when [ML] fo_features = true
+FO_FEATURE_COLS = ["fo_pcr", "fo_pcr_diff", "fo_rollover", "fo_near_share", "fo_fut_share"]
+
+# name -> (function(store, **params) -> Series, params naming source columns)
+INDICATORS: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+
+
+def indicator(name: str, sources: Tuple[str, ...] = ("col",)):
+    """Register an indicator; `sources` are the params that name input columns."""
+    def register(fn):
+        INDICATORS[name] = (fn, sources)
+        return fn
+    return register
+
+
+# ------------------------------------------------------------------------------------
+# INDICATORS
+# ------------------------------------------------------------------------------------
+@indicator("ema")
+def _ema(store, col: str, span: int) -> pd.Series:
+    return store.column(col).ewm(span=span, adjust=False).mean()
+
+
+@indicator("pct_change")
+def _pct_change(store, col: str, periods: int = 1) -> pd.Series:
+    return store.column(col).pct_change(periods)
+
+
+@indicator("diff")
+def _diff(store, col: str, periods: int = 1) -> pd.Series:
+    return store.column(col).diff(periods)
+
+
+@indicator("return_std")
+def _return_std(store, col: str, window: int, periods: int = 1) -> pd.Series:
+    """Rolling std of the (0-filled) periods-day returns."""
+    return store.get("pct_change", col=col, periods=periods).fillna(0.0).rolling(window).std()
+
+
+@indicator("ema_gap")
+def _ema_gap(store, col: str, span: int) -> pd.Series:
+    ema = store.get("ema", col=col, span=span)
+    return (store.column(col) - ema) / ema
+
+
+@indicator("rel_gap", sources=("col", "ref"))
+def _rel_gap(store, col: str, ref: str) -> pd.Series:
+    base = store.column(ref)
+    return (store.column(col) - base) / base
+
+
+@indicator("share", sources=("col", "other"))
+def _share(store, col: str, other: str, eps: float = 1e-6) -> pd.Series:
+    """col / (col + other + eps)."""
+    x = store.column(col)
+    return x / (x + store.column(other) + eps)
+
+
+@indicator("change_pct")
+def _change_pct(store, col: str, zero_as: float = float("nan")) -> pd.Series:
+    """Day-over-day % change; a zero previous value is replaced by zero_as."""
+    x = store.column(col)
+    prev = x.shift(1)
+    return (x - prev) / prev.replace(0, zero_as) * 100
+
+
+@indicator("lagged_mean")
+def _lagged_mean(store, col: str, window: int) -> pd.Series:
+    """Mean of the previous `window` days (today excluded)."""
+    return store.column(col).shift(1).rolling(window=window, min_periods=window).mean()
+
+
+@indicator("rel_to_lagged_mean")
+def _rel_to_lagged_mean(store, col: str, window: int) -> pd.Series:
+    """Today as % of the previous `window`-day mean (NaN where the mean is 0)."""
+    avg = store.get("lagged_mean", col=col, window=window)
+    out = np.where(avg != 0, (store.column(col) / avg) * 100, np.nan)
+    return pd.Series(out, index=avg.index)
+
+
+# ------------------------------------------------------------------------------------
+# STORE
+# ------------------------------------------------------------------------------------
+def store_directory(target_directory: str, symbol: str) -> str:
+    return os.path.join(target_directory, "features", symbol)
+
+
+def _key_name(name: str, params: dict) -> str:
+    text = ",".join(f"{k}={params[k]}" for k in sorted(params))
+    return f"{name}__{re.sub(r'[^A-Za-z0-9_.=,-]', '_', text)}"
+
+
+class FeatureStore:
+    """Lazy, memoized indicators over one symbol's DataFrame."""
+
+    def __init__(self, df: pd.DataFrame, cache_dir: Optional[str] = None):
+        self.df = df
+        self.cache_dir = cache_dir
+        self._memo: Dict[str, np.ndarray] = {}
+        self._versions: Dict[str, str] = {}
+        self.stats = {"memory": 0, "disk": 0, "computed": 0}
+
+    def column(self, col: str) -> pd.Series:
+        return self.df[col]
+
+    def data_version(self, cols) -> str:
+        h = hashlib.sha1()
+        for col in cols:
+            if col not in self._versions:
+                values = np.ascontiguousarray(self.df[col].to_numpy(dtype=float))
+                self._versions[col] = hashlib.sha1(values.tobytes()).hexdigest()
+            h.update(col.encode())
+            h.update(self._versions[col].encode())
+        return h.hexdigest()[:16]
+
+    def get(self, name: str, **params) -> pd.Series:
+        """Indicator `name` for every row of the frame (index aligned)."""
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator: {name}")
+        fn, sources = INDICATORS[name]
+
+        key_name = _key_name(name, params)
+        key = f"{key_name}__{self.data_version(params[s] for s in sources)}"
+
+        values = self._memo.get(key)
+        if values is not None:
+            self.stats["memory"] += 1
+        else:
+            values = self._load(key)
+            if values is not None:
+                self.stats["disk"] += 1
+            else:
+                values = fn(self, **params).to_numpy(dtype=float)
+                self.stats["computed"] += 1
+                self._save(key_name, key, values)
+            self._memo[key] = values
+
+        return pd.Series(values.copy(), index=self.df.index)
+
+    # ---------------- DISK ---------------- #
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            values = np.load(path)
+        except (OSError, ValueError):
+            return None
+        return values if len(values) == len(self.df) else None
+
+    def _save(self, key_name: str, key: str, values: np.ndarray) -> None:
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._path(key) + f".{os.getpid()}.tmp.npy"
+        np.save(tmp, values)
+        os.replace(tmp, self._path(key))
+
+        # Keep only the newest MAX_VERSIONS data versions of this indicator/params
+        prefix = key_name + "__"
+        old = sorted(
+            (os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)
+             if f.startswith(prefix) and f.endswith(".npy") and f[len(prefix):-4].isalnum()),
+            key=os.path.getmtime,
+        )
+        for path in old[:-MAX_VERSIONS]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def open_store(target_directory: str, symbol: str, df: pd.DataFrame) -> FeatureStore:
+    """Disk-backed store for `symbol` under <target_dir>/features/<SYMBOL>."""
+    return FeatureStore(df, store_directory(target_directory, symbol))
+
+
+# ------------------------------------------------------------------------------------
+# ML FEATURES
+# ------------------------------------------------------------------------------------
+def add_ml_features(df: pd.DataFrame, store: FeatureStore = None) -> pd.DataFrame:
+    """
+    The 15 ML features (feature_engine.FEATURE_COLS) plus ema_10/20/50
+    and, when the F&O analytics columns are present, FO_FEATURE_COLS, from
+    current and past data only. Shared by MLTrainer, GenerateMLTrades
+    and WalkForwardTrainer (their add_features).
+    """
+    store = store or FeatureStore(df)
+
+    # Returns
+    df["ret_1"] = store.get("pct_change", col=CLOSE_COL, periods=1).fillna(0.0)
+    df["ret_3"] = store.get("pct_change", col=CLOSE_COL, periods=3).fillna(0.0)
+    df["ret_5"] = store.get("pct_change", col=CLOSE_COL, periods=5).fillna(0.0)
+
+    # Volatility (10-day rolling std of 1-day returns)
+    df["vol_10"] = store.get("return_std", col=CLOSE_COL, window=10).fillna(0.0)
+
+    # EMAs
+    for span in (10, 20, 50):
+        df[f"ema_{span}"] = store.get("ema", col=CLOSE_COL, span=span)
+
+    # Gaps vs EMA
+    for span in (10, 20, 50):
+        df[f"gap_ema{span}"] = store.get("ema_gap", col=CLOSE_COL, span=span)
+
+    # VWAP gap (if available)
+    if VWAP_COL in df.columns:
+        df["gap_vwap"] = store.get("rel_gap", col=CLOSE_COL, ref=VWAP_COL)
+    else:
+        df["gap_vwap"] = 0.0
+
+    # OI-based features
+    df["long_diff"] = store.get("diff", col=LONG_TILL_NOW_COL).fillna(0.0)
+    df["short_diff"] = store.get("diff", col=SHORT_TILL_NOW_COL).fillna(0.0)
+    df["oi_diff"] = store.get("diff", col=OI_SUM_COL).fillna(0.0)
+
+    df["long_ratio"] = store.get("share", col=LONG_TILL_NOW_COL, other=SHORT_TILL_NOW_COL)
+    df["short_ratio"] = store.get("share", col=SHORT_TILL_NOW_COL, other=LONG_TILL_NOW_COL)
+
+    # Rolling OI trend (5-day change)
+    df["long_5ch"] = store.get("pct_change", col=LONG_TILL_NOW_COL, periods=5).fillna(0.0)
+    df["short_5ch"] = store.get("pct_change", col=SHORT_TILL_NOW_COL, periods=5).fillna(0.0)
+
+    # Replace inf / NaN in features
+    feature_cols = [
+        "ret_1", "ret_3", "ret_5",
+        "vol_10",
+        "gap_ema10", "gap_ema20", "gap_ema50", "gap_vwap",
+        "long_diff", "short_diff", "oi_diff",
+        "long_ratio", "short_ratio",
+        "long_5ch", "short_5ch"
+    ]
+    # F&O analytics (Analysis files built with fo_analytics)
+    if PCR_COL in df.columns:
+        df["fo_pcr"] = store.column(PCR_COL)
+        df["fo_pcr_diff"] = store.get("diff", col=PCR_COL)
+        df["fo_rollover"] = store.column(ROLLOVER_COL) / 100.0
+        df["fo_near_share"] = store.column(NEAR_SHARE_COL)
+        df["fo_fut_share"] = store.column(FUTURES_SHARE_COL)
+        feature_cols += FO_FEATURE_COLS
+
+    for col in feature_cols:
+        df[col] = df[col].replace([np.inf, -np.inf], 0.0).fillna(0.0)
+
+    return df
+
+
+def fo_feature_cols(df: pd.DataFrame, sc=None) -> List[str]:
+    """
+    FO_FEATURE_COLS when the symbol's [ML] fo_features (SymbolConfig `sc`)
+    is on and df has them, else [] (also without `sc`).
+    """
+    if sc is not None and sc.fo_features and all(c in df.columns for c in FO_FEATURE_COLS):
+        return list(FO_FEATURE_COLS)
+    return []
@@ -0,0 +1,121 @@
+# fo_analytics.py
+"""
+Daily F&O open-interest analytics by expiry and contract type.
+
+From the de-duplicated contract rows (fo_contracts.normalize_contracts +
+deduplicate_contracts) every row gets three categorical codes:
+
+    day      index of DATE among the sorted trading days
+    kind     0 futures, 1 calls (CE / CA), 2 puts (PE / PA), 3 other options
+    expiry   0 near, 1 next, 2 far month: rank of EXPIRY_DATE among the
+             day's expiries of the same segment (futures / options), so
+             weekly option expiries do not shift the futures months
+
+combined into one integer key. A single np.bincount over that key sums the
+OI into a (days, 4, 3) cube, and the daily columns are reductions of it:
+
+    FO_Near_OI / FO_Next_OI / FO_Far_OI    OI by expiry (futures + options)
+    FO_Futures_OI / FO_Options_OI          OI by segment
+    FO_Call_OI / FO_Put_OI                 option OI by type
+    FO_PCR_OI                              put / call OI
+    FO_Rollover_Pct                        next + far month futures OI as % of futures OI
+    FO_Near_Share / FO_Futures_Share       near-month and futures share of all OI
+
+Ratios are NaN on days without the denominator (no calls, no futures).
+"""
+
+import numpy as np
+import pandas as pd
+
+import fo_contracts  # type: ignore
+
+CALL_TYPES = ("CE", "CA")
+PUT_TYPES = ("PE", "PA")
+FUTURES, CALLS, PUTS, OTHER_OPTIONS = range(4)
+N_KINDS, N_EXPIRIES = 4, 3
+
+FO_COLUMNS = (
+    "FO_Near_OI", "FO_Next_OI", "FO_Far_OI",
+    "FO_Futures_OI", "FO_Options_OI",
+    "FO_Call_OI", "FO_Put_OI",
+    "FO_PCR_OI", "FO_Rollover_Pct",
+    "FO_Near_Share", "FO_Futures_Share",
+)
+
+
+def contract_kind(df: pd.DataFrame) -> np.ndarray:
+    """int8 kind code per row (FUTURES / CALLS / PUTS / OTHER_OPTIONS)."""
+    kind = np.full(len(df), OTHER_OPTIONS, dtype=np.int8)
+    if fo_contracts.OPTION_TYPE_COL in df.columns:
+        option_type = df[fo_contracts.OPTION_TYPE_COL]
+        kind[option_type.isin(CALL_TYPES).to_numpy()] = CALLS
+        kind[option_type.isin(PUT_TYPES).to_numpy()] = PUTS
+    kind[fo_contracts.is_future(df)] = FUTURES
+    return kind
+
+
+def expiry_rank(day: np.ndarray, segment: np.ndarray, expiry: pd.Series) -> np.ndarray:
+    """
+    0 / 1 / 2+ rank of each row's expiry among the distinct expiries of its
+    (day, segment); rows without an expiry rank last.
+    """
+    exp_codes, expiries = pd.factorize(expiry, sort=True)
+    n_exp = len(expiries) + 1
+    exp_codes = np.where(exp_codes < 0, len(expiries), exp_codes)
+
+    group = day.astype(np.int64) * 2 + segment
+    keys, inverse = np.unique(group * n_exp + exp_codes, return_inverse=True)
+    key_group = keys // n_exp
+    pos = np.arange(len(keys))
+    start = np.maximum.accumulate(np.where(np.r_[True, key_group[1:] != key_group[:-1]], pos, 0))
+    return np.minimum(pos - start, N_EXPIRIES - 1)[inverse]
+
+
+def oi_cube(contracts: pd.DataFrame):
+    """(sorted days, (days, kind, expiry) OI sums)."""
+    day, days = pd.factorize(contracts[fo_contracts.DATE_COL], sort=True)
+    kind = contract_kind(contracts)
+    if fo_contracts.EXPIRY_COL in contracts.columns:
+        rank = expiry_rank(day, (kind != FUTURES).astype(np.int64), contracts[fo_contracts.EXPIRY_COL])
+    else:
+        rank = np.zeros(len(contracts), dtype=np.int64)
+
+    oi = pd.to_numeric(contracts[fo_contracts.OI_COL], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    cell = (day.astype(np.int64) * N_KINDS + kind) * N_EXPIRIES + rank
+    cube = np.bincount(cell, weights=oi, minlength=len(days) * N_KINDS * N_EXPIRIES)
+    return days, cube.reshape(len(days), N_KINDS, N_EXPIRIES)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+def daily_analytics(contracts: pd.DataFrame) -> pd.DataFrame:
+    """DATE + FO_COLUMNS, one row per day of `contracts`."""
+    if contracts.empty or fo_contracts.OI_COL not in contracts.columns:
+        return pd.DataFrame({fo_contracts.DATE_COL: pd.Series(dtype="datetime64[ns]"),
+                             **{c: pd.Series(dtype=float) for c in FO_COLUMNS}})
+
+    days, cube = oi_cube(contracts)
+    by_expiry = cube.sum(axis=1)
+    futures = cube[:, FUTURES]
+    calls = cube[:, CALLS].sum(axis=1)
+    puts = cube[:, PUTS].sum(axis=1)
+    futures_oi = futures.sum(axis=1)
+    total = by_expiry.sum(axis=1)
+
+    return pd.DataFrame({
+        fo_contracts.DATE_COL: days,
+        "FO_Near_OI": by_expiry[:, 0],
+        "FO_Next_OI": by_expiry[:, 1],
+        "FO_Far_OI": by_expiry[:, 2],
+        "FO_Futures_OI": futures_oi,
+        "FO_Options_OI": total - futures_oi,
+        "FO_Call_OI": calls,
+        "FO_Put_OI": puts,
+        "FO_PCR_OI": _ratio(puts, calls),
+        "FO_Rollover_Pct": _ratio(futures[:, 1:].sum(axis=1), futures_oi) * 100,
+        "FO_Near_Share": _ratio(by_expiry[:, 0], total),
+        "FO_Futures_Share": _ratio(futures_oi, total),
+    })
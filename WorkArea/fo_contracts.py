@@ -0,0 +1,157 @@
+# fo_contracts.py
+"""
+F&O contract rows of the *FAO*.csv downloads: key normalization,
+de-duplication, contract selection and the daily aggregate of
+GenerateAnalysis.build_base_dataframe.
+
+Monthly re-downloads overlap in date range, so the same contract-day shows
+up in several files. A row is identified by its contract key
+
+    DATE, EXPIRY_DATE, INSTRUMENT, STRIKE_PRICE, OPTION_TYPE
+
+(INSTRUMENT may be missing, STRIKE_PRICE and OPTION_TYPE together in
+futures-only files). The key is normalized (dates parsed, text upper-cased,
+strikes numeric), hashed to one uint64 per row and only the first row of
+each hash is kept, so de-duplication is a single hash-table pass instead of
+a multi-column sort or merge. Without DATE and EXPIRY_DATE, or with only one
+of STRIKE_PRICE / OPTION_TYPE, the key cannot tell contracts apart:
+de-duplication is then skipped with a warning rather than collapsing a
+day's contracts into one row.
+
+Contract selection ([PATHS] fo_contracts):
+
+    all         every contract (default)
+    futures     futures only (INSTRUMENT FUT*, or OPTION_TYPE XX / FF)
+    near_month  contracts of each day's nearest expiry
+"""
+
+import warnings
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+DATE_COL = "DATE"
+EXPIRY_COL = "EXPIRY_DATE"
+INSTRUMENT_COL = "INSTRUMENT"
+STRIKE_COL = "STRIKE_PRICE"
+OPTION_TYPE_COL = "OPTION_TYPE"
+VOLUME_COL = "Volume"
+OI_COL = "OPEN_INTEREST"
+
+KEY_COLS = (DATE_COL, EXPIRY_COL, INSTRUMENT_COL, STRIKE_COL, OPTION_TYPE_COL)
+VALUE_COLS = (VOLUME_COL, OI_COL)
+CONTRACT_COLS = KEY_COLS + VALUE_COLS
+FUTURE_OPTION_TYPES = ("XX", "FF", "")
+
+CONTRACT_MODES = ("all", "futures", "near_month")
+
+VOLUME_SUM_COL = "Daily_F&O_Volume_Sum"
+OI_SUM_COL = "Daily_Open_Interest_Sum"
+
+
+def _map_unique(series: pd.Series, fn) -> pd.Series:
+    """Apply `fn` to the distinct values only (few expiries / strings, many rows)."""
+    codes, uniques = pd.factorize(series)
+    mapped = np.asarray(fn(pd.Series(uniques, dtype=object)))
+    return pd.Series(pd.api.extensions.take(mapped, codes, allow_fill=True), index=series.index)
+
+
+def _categorical(series: pd.Series) -> pd.Series:
+    """Stripped, upper-cased text as a categorical (hashing / grouping work on the codes)."""
+    codes, uniques = pd.factorize(series)
+    codes = np.where(codes < 0, len(uniques), codes)       # missing -> ""
+    labels = pd.Series(list(uniques) + [""], dtype=object).astype(str).str.strip().str.upper()
+    label_codes, categories = pd.factorize(labels)
+    return pd.Series(pd.Categorical.from_codes(label_codes[codes], categories), index=series.index)
+
+
+def _parse_dates(values: pd.Series) -> np.ndarray:
+    return pd.to_datetime(values, errors="coerce", dayfirst=True).to_numpy(dtype="datetime64[ns]")
+
+
+def key_columns(df: pd.DataFrame) -> List[str]:
+    return [c for c in KEY_COLS if c in df.columns]
+
+
+def normalize_contracts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Key and value columns only, with EXPIRY_DATE as datetime, INSTRUMENT /
+    OPTION_TYPE as stripped, upper-cased categoricals and STRIKE_PRICE numeric.
+    DATE is expected to be parsed already (GenerateAnalysis._clean_dataframe).
+    """
+    df = df[key_columns(df) + [c for c in VALUE_COLS if c in df.columns]].copy()
+    if EXPIRY_COL in df.columns:
+        df[EXPIRY_COL] = _map_unique(df[EXPIRY_COL], _parse_dates)
+    for col in (INSTRUMENT_COL, OPTION_TYPE_COL):
+        if col in df.columns:
+            df[col] = _categorical(df[col])
+    if STRIKE_COL in df.columns:
+        df[STRIKE_COL] = pd.to_numeric(df[STRIKE_COL], errors="coerce")
+    return df
+
+
+def missing_key_columns(df: pd.DataFrame) -> List[str]:
+    """Key columns a contract key needs but df lacks ([] when it can be de-duplicated)."""
+    required = [DATE_COL, EXPIRY_COL]
+    if STRIKE_COL in df.columns or OPTION_TYPE_COL in df.columns:
+        required += [STRIKE_COL, OPTION_TYPE_COL]
+    return [c for c in required if c not in df.columns]
+
+
+def contract_hash(df: pd.DataFrame) -> np.ndarray:
+    """uint64 hash of each row's contract key."""
+    return pd.util.hash_pandas_object(df[key_columns(df)], index=False).to_numpy()
+
+
+def deduplicate_contracts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    First row of every contract key (df as returned by normalize_contracts);
+    df unchanged, with a warning, when key columns are missing.
+    """
+    if df.empty:
+        return df
+    missing = missing_key_columns(df)
+    if missing:
+        warnings.warn(f"F&O data lacks contract key column(s) {', '.join(missing)}; "
+                      "overlapping rows are not de-duplicated.", UserWarning)
+        return df
+    duplicated = pd.Series(contract_hash(df)).duplicated(keep="first").to_numpy()
+    return df[~duplicated] if duplicated.any() else df
+
+
+def is_future(df: pd.DataFrame) -> np.ndarray:
+    if INSTRUMENT_COL in df.columns:
+        return df[INSTRUMENT_COL].str.startswith("FUT").to_numpy(dtype=bool)
+    if OPTION_TYPE_COL in df.columns:
+        return df[OPTION_TYPE_COL].isin(FUTURE_OPTION_TYPES).to_numpy(dtype=bool)
+    return np.ones(len(df), dtype=bool)
+
+
+def select_contracts(df: pd.DataFrame, mode: str = "all") -> pd.DataFrame:
+    """Rows of the contracts aggregated under `mode` (see CONTRACT_MODES)."""
+    if mode == "all":
+        return df
+    if mode == "futures":
+        return df[is_future(df)]
+    if mode == "near_month":
+        if EXPIRY_COL not in df.columns:
+            return df
+        nearest = df.groupby(DATE_COL)[EXPIRY_COL].transform("min")
+        return df[(df[EXPIRY_COL] == nearest).to_numpy()]
+    raise ValueError(f"Unknown fo_contracts mode: {mode} (expected one of {CONTRACT_MODES})")
+
+
+def daily_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """DATE, Daily_F&O_Volume_Sum, Daily_Open_Interest_Sum."""
+    aggregated = (
+        df.groupby(DATE_COL)
+        .agg({VOLUME_COL: "sum", OI_COL: "sum"})
+        .reset_index()
+    )
+    return aggregated.rename(columns={VOLUME_COL: VOLUME_SUM_COL, OI_COL: OI_SUM_COL})
+
+
+def prepare_contracts(fao: pd.DataFrame, mode: str = "all") -> pd.DataFrame:
+    """normalize -> de-duplicate -> select: the rows the daily aggregates are built from."""
+    return select_contracts(deduplicate_contracts(normalize_contracts(fao)), mode)
@@ -0,0 +1,515 @@
+# intraday_engine.py
+"""
+Event-driven backtest on intraday bars, with the daily signal files as the
+decision layer.
+
+Bars are stored per symbol as raw little-endian column files
+
+    <target_dir>/bars/<SYMBOL>/ts.bin       int64   bar time (ns since epoch, exchange time)
+                               open.bin ... float64 open / high / low / close / volume
+
+and replayed through np.memmap in chunks of CHUNK_BARS, so a run over tens
+of millions of bars only holds one chunk per symbol in memory
+(write_bars converts a CSV the same way, chunk by chunk).
+
+The daily decisions (ML_Signal from GenerateMLTrades / GenerateMLTrades_WF,
+Signal from Older/GenerateTrades) are events at the end of their day: the
+signal of day d is acted on in the first session after d. A heap orders the
+streams (signals of every symbol, then the bars of every symbol) by time;
+each popped stream replays events until the next stream is due.
+
+Per session and symbol:
+  - an open position is closed at the first bar's open (market) when the
+    signal is the opposite side, or HOLD with hold_exits
+  - an entry order is placed for a BUY / SELL signal and lives until the
+    end of the session:
+        MarketOrder       open of the first bar
+        LimitAtVwap(pct)  buy at session VWAP * (1 - pct %), sell at
+                          VWAP * (1 + pct %); VWAP of the bars before the
+                          current one (typical price * volume)
+        StopOrder(pct)    buy when price trades pct % above the session
+                          open, sell pct % below it
+  - sizing / HOLD / reversal follow execution_core.ExecutionSettings; an
+    optional cost_model.CostModel rounds entries to lots and charges every fill
+  - Daily_PnL marks the position to the last close of the session
+
+python intraday_engine.py [SYMBOL] [--signals ml|wf|rule] [--order market|limit_vwap|stop] [--pct X]
+python intraday_engine.py [SYMBOL] --import <bars.csv>
+"""
+
+import os
+import sys
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import cost_model  # type: ignore
+import execution_core  # type: ignore
+
+BAR_FIELDS = (("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"),
+              ("close", "<f8"), ("volume", "<f8"))
+CHUNK_BARS = 1 << 16
+NS_PER_DAY = 86_400 * 10**9
+
+DATE_COL = "DATE"
+BUY, HOLD, SELL = execution_core.BUY, execution_core.HOLD, execution_core.SELL
+SIGNAL_NAMES = {BUY: "BUY", HOLD: "HOLD", SELL: "SELL"}
+
+
+# ------------------------------------------------------------------------------------
+# BAR STORE (memory-mapped column files)
+# ------------------------------------------------------------------------------------
+def bar_directory(target_directory: str, symbol: str) -> str:
+    return os.path.join(target_directory, "bars", symbol)
+
+
+def write_bars(csv_path: str, out_dir: str, chunksize: int = 1_000_000) -> int:
+    """
+    Convert a bar CSV (timestamp / datetime, open, high, low, close[, volume];
+    any case) into the column files, chunk by chunk. Rows must be in time
+    order. Returns the number of bars.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    files = {name: open(os.path.join(out_dir, f"{name}.bin"), "wb") for name, _ in BAR_FIELDS}
+    n, last_ts = 0, None
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk.columns = chunk.columns.str.strip().str.lower()
+            time_col = "timestamp" if "timestamp" in chunk.columns else "datetime"
+            if time_col not in chunk.columns:
+                raise KeyError("Bar file needs a 'timestamp' or 'datetime' column.")
+            ts = pd.to_datetime(chunk[time_col]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            if (np.diff(ts) < 0).any() or (last_ts is not None and len(ts) and ts[0] < last_ts):
+                raise ValueError(f"Bars in {csv_path} are not in time order.")
+
+            columns = {"ts": ts}
+            for name, _ in BAR_FIELDS[1:]:
+                if name in chunk.columns:
+                    columns[name] = pd.to_numeric(chunk[name], errors="coerce").to_numpy(dtype=float)
+                elif name == "volume":
+                    columns[name] = np.zeros(len(chunk))
+                else:
+                    raise KeyError(f"Required column '{name}' not found in bar file.")
+
+            for name, dtype in BAR_FIELDS:
+                np.ascontiguousarray(columns[name], dtype=dtype).tofile(files[name])
+            n += len(chunk)
+            last_ts = ts[-1] if len(ts) else last_ts
+    finally:
+        for f in files.values():
+            f.close()
+    return n
+
+
+def open_bars(bar_dir: str) -> Dict[str, np.ndarray]:
+    """Read-only memmaps of the column files (empty arrays for an empty store)."""
+    bars = {}
+    for name, dtype in BAR_FIELDS:
+        path = os.path.join(bar_dir, f"{name}.bin")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Bar file not found: {path}")
+        bars[name] = np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) else np.zeros(0, dtype)
+    if len({len(v) for v in bars.values()}) != 1:
+        raise ValueError(f"Bar columns in {bar_dir} have different lengths.")
+    return bars
+
+
+# ------------------------------------------------------------------------------------
+# ORDER TYPES
+# ------------------------------------------------------------------------------------
+@dataclass(frozen=True)
+class MarketOrder:
+    """Fill at the open of the first bar of the session."""
+    name: str = "market"
+
+
+@dataclass(frozen=True)
+class LimitAtVwap:
+    """Limit at the running session VWAP -/+ pct % (buy / sell)."""
+    pct: float = 0.1
+    name: str = "limit_vwap"
+
+
+@dataclass(frozen=True)
+class StopOrder:
+    """Stop pct % above (buy) / below (sell) the session open."""
+    pct: float = 0.5
+    name: str = "stop"
+
+
+@dataclass
+class _Order:
+    side: int
+    kind: object
+    exit: bool = False
+
+
+# ------------------------------------------------------------------------------------
+# EVENT STREAMS
+# ------------------------------------------------------------------------------------
+def _time_limit(stream, until: tuple):
+    """Events of `stream` due before this time come before the heap key `until`."""
+    return until[0] + 1 if (stream.priority, stream.seq) < until[1:] else until[0]
+
+
+class _SignalStream:
+    """Daily decisions of one symbol, each due at midnight after its date."""
+    priority = 0
+    seq = 0
+
+    def __init__(self, symbol: str, dates: np.ndarray, codes: np.ndarray):
+        self.symbol = symbol
+        self.due = ((dates.astype("datetime64[ns]").astype(np.int64) // NS_PER_DAY + 1) * NS_PER_DAY).tolist()
+        self.codes = codes.tolist()
+        self.i = 0
+
+    def next_ts(self) -> Optional[int]:
+        return self.due[self.i] if self.i < len(self.due) else None
+
+    def replay(self, engine: "IntradayEngine", until: tuple) -> None:
+        book = engine.books[self.symbol]
+        limit = _time_limit(self, until)
+        while self.i < len(self.due) and self.due[self.i] < limit:
+            book.signal = self.codes[self.i]
+            self.i += 1
+
+
+class _BarStream:
+    """Bars of one symbol, copied from the memmaps one chunk at a time."""
+    priority = 1
+    seq = 0
+
+    def __init__(self, symbol: str, bars: Dict[str, np.ndarray], chunk_bars: int = CHUNK_BARS):
+        self.symbol = symbol
+        self.bars = bars
+        self.n = len(bars["ts"])
+        self.chunk_bars = chunk_bars
+        self.start = 0
+        self._load()
+
+    def _load(self) -> None:
+        stop = min(self.start + self.chunk_bars, self.n)
+        self.cols = [self.bars[name][self.start:stop].tolist() for name, _ in BAR_FIELDS]
+        self.i = 0
+
+    def next_ts(self) -> Optional[int]:
+        if self.i == len(self.cols[0]):
+            self.start += len(self.cols[0])
+            if self.start >= self.n:
+                return None
+            self._load()
+        return self.cols[0][self.i]
+
+    def replay(self, engine: "IntradayEngine", until: tuple) -> None:
+        book = engine.books[self.symbol]
+        on_bar = engine.on_bar
+        while True:
+            ts, o, h, l, c, v = self.cols
+            i, end = self.i, len(ts)
+            limit = _time_limit(self, until)
+            while i < end and ts[i] < limit:
+                on_bar(book, ts[i], o[i], h[i], l[i], c[i], v[i])
+                i += 1
+            self.i = i
+            if i < end or self.next_ts() is None:
+                return
+
+
+# ------------------------------------------------------------------------------------
+# ENGINE
+# ------------------------------------------------------------------------------------
+class _Book:
+    """Position, capital and session state of one symbol."""
+
+    def __init__(self, symbol: str, capital: float):
+        self.symbol = symbol
+        self.capital = capital
+        self.position = 0.0
+        self.entry_price = 0.0
+        self.mark = 0.0              # last price the position was marked at
+        self.signal = None           # decision waiting for the next session
+        self.day = None
+        self.orders: List[_Order] = []
+        self.cum_pnl = 0.0
+        self._new_session(None, None, math.nan)
+
+    def _new_session(self, day, decision, open_px) -> None:
+        self.day = day
+        self.decision = decision
+        self.session_open = open_px
+        self.pv = 0.0
+        self.vol = 0.0
+        self.typ_sum = 0.0
+        self.n_bars = 0
+        self.traded = 0.0
+        self.cost = 0.0
+        self.pnl = 0.0
+        self.last_close = math.nan
+
+    def vwap(self) -> float:
+        if self.n_bars == 0:
+            return math.nan
+        return self.pv / self.vol if self.vol > 0 else self.typ_sum / self.n_bars
+
+
+class IntradayEngine:
+    """
+    Replays bar streams against daily decisions. run() returns one row per
+    symbol and session plus the fill log.
+    """
+
+    def __init__(self,
+                 entry_order=MarketOrder(),
+                 settings: execution_core.ExecutionSettings = execution_core.ExecutionSettings(),
+                 costs: cost_model.CostModel = None,
+                 chunk_bars: int = CHUNK_BARS):
+        self.entry_order = entry_order
+        self.settings = settings
+        self.costs = costs or cost_model.NO_COSTS
+        self.chunk_bars = chunk_bars
+        self.books: Dict[str, _Book] = {}
+        self.sessions: List[tuple] = []
+        self.fills: List[tuple] = []
+
+    # ---------------- SESSIONS ---------------- #
+    def _open_session(self, book: _Book, day: int, open_px: float) -> None:
+        decision = book.signal
+        book.signal = None
+        book._new_session(day, decision, open_px)
+        book.orders = []
+        if decision is None:
+            return
+
+        side = (book.position > 0) - (book.position < 0)
+        exiting = side != 0 and (decision == -side or (self.settings.hold_exits and decision == HOLD))
+        if exiting:
+            book.orders.append(_Order(-side, MarketOrder(), exit=True))
+        if decision != HOLD and decision != side and (side == 0 or (exiting and self.settings.reverse_same_bar)):
+            book.orders.append(_Order(decision, self.entry_order))
+
+    def _close_session(self, book: _Book) -> None:
+        if book.position != 0.0 and book.last_close == book.last_close:
+            book.pnl += book.position * (book.last_close - book.mark)
+            book.mark = book.last_close
+        book.cum_pnl += book.pnl
+        self.sessions.append((
+            pd.Timestamp(book.day * NS_PER_DAY), book.symbol,
+            None if book.decision is None else int(book.decision),
+            book.traded, book.position, book.entry_price, book.cost,
+            book.vwap(), book.last_close, book.pnl, book.cum_pnl,
+        ))
+
+    # ---------------- FILLS ---------------- #
+    def _fill_price(self, book: _Book, order: _Order, o: float, h: float, l: float) -> float:
+        kind = order.kind
+        if isinstance(kind, MarketOrder):
+            return o
+        if isinstance(kind, LimitAtVwap):
+            vwap = book.vwap()
+            if not vwap > 0:
+                return math.nan
+            if order.side > 0:
+                limit = vwap * (1.0 - kind.pct / 100.0)
+                return min(o, limit) if l <= limit else math.nan
+            limit = vwap * (1.0 + kind.pct / 100.0)
+            return max(o, limit) if h >= limit else math.nan
+        if isinstance(kind, StopOrder):
+            if order.side > 0:
+                stop = book.session_open * (1.0 + kind.pct / 100.0)
+                return max(o, stop) if h >= stop else math.nan
+            stop = book.session_open * (1.0 - kind.pct / 100.0)
+            return min(o, stop) if l <= stop else math.nan
+        raise TypeError(f"Unknown order type: {kind!r}")
+
+    def _fill(self, book: _Book, ts: int, order: _Order, px: float) -> bool:
+        compound = self.settings.sizing == "compound"
+        if order.exit:
+            qty = -book.position
+            realized = (px - book.entry_price) * book.position
+            entry = 0.0
+        else:
+            costs = self.costs
+            budget = book.capital if compound else self.settings.investment_amount
+            rate = costs.buy_rate if order.side > 0 else costs.sell_rate
+            lot = max(int(costs.lot_size), 1)
+            qty = math.floor(budget / (px * (1.0 + rate)) / lot) * lot * order.side if px > 0 else 0
+            if qty == 0:
+                return False
+            realized = 0.0
+            entry = px
+
+        cost = cost_model.leg_cost(abs(qty) * px, qty > 0, self.costs)
+        if compound:
+            book.capital = max(book.capital + realized - cost, 0.0)
+        book.cost += cost
+        book.pnl += book.position * (px - book.mark) - cost
+        book.mark = px
+        book.position += qty
+        book.entry_price = entry
+        book.traded += qty
+        self.fills.append((pd.Timestamp(ts), book.symbol, order.kind.name,
+                           "EXIT" if order.exit else ("BUY" if order.side > 0 else "SELL"), qty, px, cost))
+        return True
+
+    def on_bar(self, book: _Book, ts: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        day = ts // NS_PER_DAY
+        if day != book.day:
+            if book.day is not None:
+                self._close_session(book)
+            self._open_session(book, day, o)
+
+        if book.orders:
+            remaining = []
+            for order in book.orders:
+                # an entry waits for the exit ahead of it
+                if not order.exit and book.position != 0.0:
+                    remaining.append(order)
+                    continue
+                px = self._fill_price(book, order, o, h, l)
+                if math.isnan(px):
+                    remaining.append(order)
+                else:
+                    self._fill(book, ts, order, px)   # an entry too small for one share is dropped
+            book.orders = remaining
+
+        if v == v and c == c:
+            typical = (h + l + c) / 3.0
+            book.pv += typical * v
+            book.vol += v
+            book.typ_sum += typical
+            book.n_bars += 1
+            book.last_close = c
+
+    # ---------------- RUN ---------------- #
+    def run(self,
+            bars: Dict[str, Dict[str, np.ndarray]],
+            signals: Dict[str, pd.DataFrame],
+            signal_col: str = "Signal") -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        bars: symbol -> column arrays (open_bars); signals: symbol -> frame
+        with DATE and signal_col (BUY / SELL / HOLD or int codes).
+        """
+        self.books = {s: _Book(s, float(self.settings.investment_amount)) for s in bars}
+        self.sessions, self.fills = [], []
+
+        streams = []
+        for symbol, sig in signals.items():
+            if symbol in self.books:
+                sig = sig.sort_values(DATE_COL)
+                streams.append(_SignalStream(symbol, pd.to_datetime(sig[DATE_COL]).to_numpy(),
+                                             execution_core.signal_codes(sig[signal_col].to_numpy())))
+        streams += [_BarStream(s, b, self.chunk_bars) for s, b in bars.items()]
+
+        # heap key (time, priority, seq): signals before bars at the same time
+        heap = []
+        for seq, stream in enumerate(streams):
+            stream.seq = seq
+            ts = stream.next_ts()
+            if ts is not None:
+                heap.append((ts, stream.priority, seq, stream))
+        heapq.heapify(heap)
+
+        while heap:
+            _, _, seq, stream = heapq.heappop(heap)
+            until = heap[0][:3] if heap else (math.inf, 0, 0)
+            stream.replay(self, until)
+            ts = stream.next_ts()
+            if ts is not None:
+                heapq.heappush(heap, (ts, stream.priority, seq, stream))
+
+        for book in self.books.values():
+            if book.day is not None:
+                self._close_session(book)
+
+        sessions = pd.DataFrame(self.sessions, columns=[
+            DATE_COL, "Symbol", "Signal_Code", "Quantity_Traded", "Position", "Entry_Price", "Trade_Cost",
+            "Session_VWAP", "close", "Daily_PnL", "Cumulative_PnL",
+        ])
+        sessions.insert(3, "Signal", sessions["Signal_Code"].map(SIGNAL_NAMES))
+        fills = pd.DataFrame(self.fills, columns=["Timestamp", "Symbol", "Order", "Side", "Quantity", "Price", "Cost"])
+        return sessions, fills
+
+
+
+# ------------------------------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------------------------------
+def load_signals(target_directory: str, symbol: str, source: str = "ml") -> Tuple[pd.DataFrame, str]:
+    """Daily decision frame (DATE + signal column) of a backtest output file."""
+    suffix, col = execution_core.SIGNAL_SOURCES[source]
+    path = os.path.join(target_directory, f"{symbol}{suffix}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Signal file not found: {path}")
+    df = pd.read_csv(path, usecols=[DATE_COL, col], parse_dates=[DATE_COL])
+    return df, col
+
+
+def order_from_name(name: str, pct: float = None):
+    if name == "market":
+        return MarketOrder()
+    if name == "limit_vwap":
+        return LimitAtVwap() if pct is None else LimitAtVwap(pct)
+    if name == "stop":
+        return StopOrder() if pct is None else StopOrder(pct)
+    raise ValueError(f"Unknown order type: {name}")
+
+
+def run_intraday_backtest(symbol: str = None, source: str = "ml", entry_order=MarketOrder()):
+    """
+    Intraday replay of one symbol's daily signals. ML signals trade like the
+    daily ML simulators (compounding, HOLD exits, same-session reversal), rule
+    signals like Older/GenerateTrades (fixed size, positions kept on HOLD).
+    """
+    from config_loader import get_symbol_config  # type: ignore
+
+    sc = get_symbol_config(symbol)
+    bar_dir = bar_directory(sc.target_directory, sc.symbol)
+    output_file = os.path.join(sc.target_directory, f"{sc.symbol}_Trades_Intraday.csv")
+    fills_file = os.path.join(sc.target_directory, f"{sc.symbol}_Intraday_Fills.csv")
+
+    print(f"--- Intraday backtest: {sc.symbol} ({source} signals, {entry_order.name} entries) ---")
+    print(f"Bars: {bar_dir}")
+
+    signals, col = load_signals(sc.target_directory, sc.symbol, source)
+    if source == "rule":
+        settings = execution_core.ExecutionSettings(sizing="fixed", investment_amount=sc.investment_amount,
+                                                    hold_exits=False, reverse_same_bar=False)
+    else:
+        settings = execution_core.ExecutionSettings(investment_amount=sc.investment_amount)
+
+    engine = IntradayEngine(entry_order, settings, sc.cost_model)
+    sessions, fills = engine.run({sc.symbol: open_bars(bar_dir)}, {sc.symbol: signals}, col)
+
+    sessions.to_csv(output_file, index=False)
+    fills.to_csv(fills_file, index=False)
+    print(f"Sessions: {len(sessions)}, fills: {len(fills)}")
+    print(f"Saved: {output_file}")
+    if len(sessions):
+        print(f"Final PnL (intraday): {sessions['Cumulative_PnL'].iloc[-1]:,.2f}")
+        print(cost_model.format_summary(sessions))
+    return sessions, fills
+
+
+def _option(name: str, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv[:-1] else default
+
+
+if __name__ == "__main__":
+    options = {"--signals", "--order", "--pct", "--import"}
+    args = [a for i, a in enumerate(sys.argv[1:], 1)
+            if not a.startswith("--") and sys.argv[i - 1] not in options]
+    symbol_arg = args[0] if args else None
+
+    if "--import" in sys.argv:
+        from config_loader import get_symbol_config  # type: ignore
+        sc_ = get_symbol_config(symbol_arg)
+        out = bar_directory(sc_.target_directory, sc_.symbol)
+        print(f"Imported {write_bars(_option('--import'), out):,} bars into {out}")
+    else:
+        pct_arg = _option("--pct")
+        run_intraday_backtest(symbol_arg, _option("--signals", "ml"),
+                              order_from_name(_option("--order", "market"), None if pct_arg is None else float(pct_arg)))
@@ -0,0 +1,182 @@
+# label_engine.py
+"""
+Vectorized label builder for the ML trainers.
+
+Label modes (configProcess.ini [ML] label_mode):
+
+  next_day        close[t+1] / close[t] - 1 vs label_up_thresh / label_down_thresh
+                  (the original build_labels / add_labels rule)
+  horizon_<h>     same rule on the h-day forward return (h = 3, 5, 10, ...)
+  triple_barrier  walk the next tb_max_days closes from the entry price:
+                  +1 if the profit-take barrier (+tb_profit_take) is touched
+                  first, -1 if the stop-loss barrier (-tb_stop_loss) is touched
+                  first, otherwise the time-limit return vs the up/down
+                  thresholds. Entry is close[t] or the next open (tb_entry).
+
+Everything works on whole arrays: forward returns are shifted slices, the
+triple barrier builds the (n x max_days) window of future closes once with
+sliding_window_view and finds the first touch with argmax, so there is no
+per-row Python loop.
+
+Labels are -1 / 0 / +1; future_ret is NaN where the label needs data past the
+last row (those rows must not be trained on).
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+OPEN_COL = "OPEN"
+CLOSE_COL = "close"
+
+HORIZONS = (1, 3, 5, 10)
+TB_COL = "Label_tb"
+
+
+def horizon_col(h: int) -> str:
+    return f"Label_h{h}"
+
+
+# ------------------------------------------------------------------------------------
+# FIXED HORIZON
+# ------------------------------------------------------------------------------------
+def forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    """close[t+h] / close[t] - 1, NaN for the last h rows."""
+    close = np.asarray(close, dtype=float)
+    out = np.full(len(close), np.nan)
+    if horizon < len(close):
+        out[:-horizon] = close[horizon:] / close[:-horizon] - 1.0
+    return out
+
+
+def threshold_labels(ret: np.ndarray, up_thresh: float, down_thresh: float) -> np.ndarray:
+    """+1 above up_thresh, -1 below down_thresh, 0 otherwise (and for NaN)."""
+    labels = np.zeros(len(ret), dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        labels[ret > up_thresh] = 1
+        labels[ret < down_thresh] = -1
+    return labels
+
+
+# ------------------------------------------------------------------------------------
+# TRIPLE BARRIER
+# ------------------------------------------------------------------------------------
+def triple_barrier(close: np.ndarray,
+                   open_: np.ndarray = None,
+                   profit_take: float = 0.02,
+                   stop_loss: float = 0.02,
+                   max_days: int = 10,
+                   up_thresh: float = 0.002,
+                   down_thresh: float = -0.002,
+                   entry: str = "close") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Triple-barrier labels on the close path after day t.
+
+    entry="close" enters at close[t]; entry="next_open" at open[t+1] (the
+    price the trade simulators actually execute at). A barrier touched on
+    the same day by both sides counts as the stop-loss.
+
+    Returns (labels int8, exit_day int16 [1..max_days, 0 = time limit],
+    exit return float; NaN where the outcome is not known yet).
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    if entry == "next_open":
+        if open_ is None:
+            raise ValueError("entry='next_open' needs the open prices.")
+        entry_px = np.append(np.asarray(open_, dtype=float)[1:], np.nan)
+    else:
+        entry_px = close
+
+    # path[t, k] = close[t + 1 + k], NaN past the end
+    padded = np.concatenate([close[1:], np.full(max_days, np.nan)])
+    path = sliding_window_view(padded, max_days)[:n]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel = path / entry_px[:, None] - 1.0
+        up_hit = rel >= profit_take
+        dn_hit = rel <= -stop_loss
+
+    never = max_days
+    first_up = np.where(up_hit.any(axis=1), up_hit.argmax(axis=1), never)
+    first_dn = np.where(dn_hit.any(axis=1), dn_hit.argmax(axis=1), never)
+    hit = np.minimum(first_up, first_dn)
+
+    final_ret = rel[:, -1]
+    labels = threshold_labels(final_ret, up_thresh, down_thresh)   # time-limit outcome
+    labels[first_up < first_dn] = 1
+    labels[(first_dn <= first_up) & (first_dn < never)] = -1
+
+    exit_day = np.where(hit < never, hit + 1, 0).astype(np.int16)
+    exit_ret = np.where(hit < never, rel[np.arange(n), np.minimum(hit, never - 1)], final_ret)
+
+    # Outcome unknown: no barrier touched before the data ends
+    unknown = (hit >= never) & np.isnan(final_ret)
+    unknown |= np.isnan(entry_px)
+    labels[unknown] = 0
+    exit_ret[unknown] = np.nan
+    exit_day[unknown] = 0
+    return labels, exit_day, exit_ret
+
+
+# ------------------------------------------------------------------------------------
+# CONFIG-DRIVEN SELECTION
+# ------------------------------------------------------------------------------------
+def label_horizon(sc) -> int:
+    """How many days past t the configured label looks (1 for next_day)."""
+    mode = sc.label_mode
+    if mode == "next_day":
+        return 1
+    if mode.startswith("horizon_"):
+        return int(mode.split("_", 1)[1])
+    if mode == "triple_barrier":
+        return sc.tb_max_days
+    raise ValueError(f"Unknown label_mode: {mode}")
+
+
+def compute_label(sc,
+                  close: np.ndarray,
+                  open_: np.ndarray = None,
+                  up_thresh: float = None,
+                  down_thresh: float = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (labels, future_ret) for the configured label_mode. The thresholds
+    default to sc.label_up_thresh / sc.label_down_thresh.
+    """
+    up = sc.label_up_thresh if up_thresh is None else up_thresh
+    down = sc.label_down_thresh if down_thresh is None else down_thresh
+
+    if sc.label_mode == "triple_barrier":
+        labels, _, ret = triple_barrier(close, open_, sc.tb_profit_take, sc.tb_stop_loss,
+                                        sc.tb_max_days, up, down, sc.tb_entry)
+        return labels, ret
+
+    ret = forward_returns(close, label_horizon(sc))
+    return threshold_labels(ret, up, down), ret
+
+
+def add_label_columns(df: pd.DataFrame, sc, horizons: Iterable[int] = HORIZONS) -> pd.DataFrame:
+    """
+    Add every candidate label (Label_h1 .. Label_h10, Label_tb) plus the
+    configured one as Label / future_ret, which is what the trainers use.
+    """
+    close = df[CLOSE_COL].to_numpy(dtype=float)
+    open_ = df[OPEN_COL].to_numpy(dtype=float) if OPEN_COL in df.columns else None
+
+    new_cols = {}
+    for h in horizons:
+        new_cols[horizon_col(h)] = threshold_labels(forward_returns(close, h),
+                                                    sc.label_up_thresh, sc.label_down_thresh)
+    if open_ is not None or sc.tb_entry != "next_open":
+        new_cols[TB_COL] = triple_barrier(close, open_, sc.tb_profit_take, sc.tb_stop_loss,
+                                          sc.tb_max_days, sc.label_up_thresh,
+                                          sc.label_down_thresh, sc.tb_entry)[0]
+
+    labels, ret = compute_label(sc, close, open_)
+    new_cols["future_ret"] = ret
+    new_cols["Label"] = labels.astype(int)
+
+    for col, values in new_cols.items():
+        df[col] = values
+    return df
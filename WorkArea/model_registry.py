@@ -0,0 +1,214 @@
+# model_registry.py
+"""
+Versioned model storage for the XGBoost signal models.
+
+Layout (one directory per version, several versions per symbol):
+
+    <target_dir>/models/<SYMBOL>/<version>/model.ubj   booster, XGBoost native UBJSON
+    <target_dir>/models/<SYMBOL>/<version>/meta.json   feature list, training range,
+                                                       label thresholds, data hash, metrics
+
+version = "<train_end YYYYMMDD>_<created YYYYMMDDHHMMSS>", so versions sort by
+training date. Only the booster is loaded for inference (no sklearn wrapper,
+no pickle).
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MODEL_FILE_NAME = "model.ubj"
+META_FILE_NAME = "meta.json"
+
+# (registry_dir, symbol, version) -> Booster, so repeated loads in one process are free
+_booster_cache: Dict[Tuple[str, str, str], object] = {}
+
+
+def registry_directory(target_directory: str) -> str:
+    return os.path.join(target_directory, "models")
+
+
+def data_hash(X: pd.DataFrame, y: Optional[pd.Series] = None) -> str:
+    """Short content hash of the training matrix (and labels)."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    h.update(",".join(map(str, X.columns)).encode())
+    if y is not None:
+        h.update(np.ascontiguousarray(y.to_numpy(dtype=np.int64)).tobytes())
+    return h.hexdigest()[:16]
+
+
+# ------------------------------------------------------------------------------------
+# SAVE
+# ------------------------------------------------------------------------------------
+def save_model(registry_dir: str,
+               symbol: str,
+               booster,
+               feature_cols: List[str],
+               train_start,
+               train_end,
+               label_thresholds: Dict[str, float],
+               data_hash_value: str,
+               metrics: Optional[dict] = None,
+               params: Optional[dict] = None,
+               extra: Optional[dict] = None) -> str:
+    """
+    Store one trained booster + metadata sidecar. Returns the version string.
+    `booster` may be an xgboost.Booster or an XGBClassifier.
+    """
+    if hasattr(booster, "get_booster"):
+        booster = booster.get_booster()
+
+    train_start = pd.Timestamp(train_start)
+    train_end = pd.Timestamp(train_end)
+    created = datetime.now()
+    version = f"{train_end:%Y%m%d}_{created:%Y%m%d%H%M%S}"
+
+    version_dir = os.path.join(registry_dir, symbol, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    booster.save_model(os.path.join(version_dir, MODEL_FILE_NAME))
+
+    meta = {
+        "symbol": symbol,
+        "version": version,
+        "created": created.isoformat(timespec="seconds"),
+        "format": "ubj",
+        "feature_cols": list(feature_cols),
+        "train_start": train_start.strftime("%Y-%m-%d"),
+        "train_end": train_end.strftime("%Y-%m-%d"),
+        "label_thresholds": dict(label_thresholds),
+        "data_hash": data_hash_value,
+        "metrics": metrics or {},
+        "params": params or {},
+    }
+    if extra:
+        meta.update(extra)
+
+    with open(os.path.join(version_dir, META_FILE_NAME), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    return version
+
+
+# ------------------------------------------------------------------------------------
+# LOOKUP / LOAD
+# ------------------------------------------------------------------------------------
+def list_versions(registry_dir: str, symbol: str) -> List[dict]:
+    """Metadata of every stored version for `symbol`, oldest training end first."""
+    symbol_dir = os.path.join(registry_dir, symbol)
+    if not os.path.isdir(symbol_dir):
+        return []
+
+    metas = []
+    for version in sorted(os.listdir(symbol_dir)):
+        meta_path = os.path.join(symbol_dir, version, META_FILE_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                metas.append(json.load(f))
+    metas.sort(key=lambda m: (m["train_end"], m["version"]))
+    return metas
+
+
+def select_version(metas: List[dict], as_of=None) -> Optional[dict]:
+    """
+    Latest version whose training data ended strictly before `as_of`
+    (latest overall when as_of is None). None if no version qualifies.
+    """
+    if not metas:
+        return None
+    if as_of is None:
+        return metas[-1]
+
+    as_of = pd.Timestamp(as_of).strftime("%Y-%m-%d")
+    eligible = [m for m in metas if m["train_end"] < as_of]
+    return eligible[-1] if eligible else None
+
+
+def load_booster(registry_dir: str, symbol: str, version: str):
+    """Load (and cache) the booster of one version."""
+    key = (registry_dir, symbol, version)
+    if key not in _booster_cache:
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(os.path.join(registry_dir, symbol, version, MODEL_FILE_NAME))
+        _booster_cache[key] = booster
+    return _booster_cache[key]
+
+
+def load_model(registry_dir: str, symbol: str, as_of=None, version: str = None):
+    """
+    Returns (booster, meta) for an explicit version, or for the version
+    selected by `as_of` (see select_version).
+    """
+    metas = list_versions(registry_dir, symbol)
+    if version is not None:
+        meta = next((m for m in metas if m["version"] == version), None)
+    else:
+        meta = select_version(metas, as_of)
+
+    if meta is None:
+        raise FileNotFoundError(
+            f"No model version for {symbol} in {registry_dir}"
+            + (f" trained before {as_of}" if as_of is not None else "")
+        )
+    return load_booster(registry_dir, symbol, meta["version"]), meta
+
+
+# ------------------------------------------------------------------------------------
+# INFERENCE
+# ------------------------------------------------------------------------------------
+def predict_proba(booster, X) -> np.ndarray:
+    """Class probabilities (n_rows x n_classes) straight from the booster."""
+    arr = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    proba = booster.inplace_predict(arr)
+    return np.asarray(proba).reshape(arr.shape[0], -1)
+
+
+def predict_proba_by_date(registry_dir: str,
+                          symbol: str,
+                          df: pd.DataFrame,
+                          date_col: str = "DATE") -> Tuple[np.ndarray, pd.Series]:
+    """
+    Probabilities for every row of `df`, each row scored by the latest model
+    version trained strictly before that row's date. Rows older than every
+    version fall back to the oldest version. Versions trained on feature
+    columns that `df` lacks (e.g. F&O features) are skipped.
+
+    Returns (proba, version per row).
+    """
+    metas = list_versions(registry_dir, symbol)
+    if not metas:
+        raise FileNotFoundError(f"No model versions for {symbol} in {registry_dir}")
+    usable = [m for m in metas if all(c in df.columns for c in m["feature_cols"])]
+    if not usable:
+        missing = sorted({c for m in metas for c in m["feature_cols"] if c not in df.columns})
+        raise KeyError(f"No model version for {symbol} can score this frame; "
+                       f"missing feature columns: {', '.join(missing)}")
+    metas = usable
+
+    dates = pd.to_datetime(df[date_col]).dt.strftime("%Y-%m-%d").to_numpy()
+    train_ends = np.array([m["train_end"] for m in metas])
+
+    # index of latest version with train_end < date (-1 -> none, use oldest)
+    idx = np.searchsorted(train_ends, dates, side="left") - 1
+    idx = np.maximum(idx, 0)
+
+    proba = None
+    for i in np.unique(idx):
+        meta = metas[i]
+        rows = np.flatnonzero(idx == i)
+        booster = load_booster(registry_dir, symbol, meta["version"])
+        p = predict_proba(booster, df.iloc[rows][meta["feature_cols"]])
+        if proba is None:
+            proba = np.zeros((len(df), p.shape[1]), dtype=float)
+        proba[rows] = p
+
+    versions = pd.Series([metas[i]["version"] for i in idx], index=df.index)
+    return proba, versions
@@ -0,0 +1,64 @@
+# pipeline_state.py
+"""
+Cheap "is there anything new to process?" check for the pipeline runners.
+
+Each runner is keyed on its own final outputs (PIPELINE_OUTPUTS): it has
+work to do when one of them is missing or older than any of its inputs,
+i.e. the raw downloads, the Analysis CSV, configProcess.ini and the
+symbol's threshold store file. Another runner rewriting the Analysis CSV
+therefore makes this runner's outputs stale instead of marking it done.
+
+Standard library only (no pandas / numpy / xgboost), so a run with no new
+data can start, compare file mtimes and exit in well under 200 ms.
+"""
+
+import os
+import glob
+from typing import Sequence
+
+import threshold_store  # type: ignore
+from config_loader import CONFIG_FILE, get_symbol_config  # type: ignore
+
+# Raw downloads consumed by GenerateAnalysis.build_base_dataframe
+INPUT_PATTERNS = ("Quote-Equity-*.csv", "*-EQ-N.csv", "*FAO*.csv")
+
+# Final outputs per runner, relative to the target directory ({symbol} filled in;
+# glob patterns count by their newest match)
+PIPELINE_OUTPUTS = {
+    "train": (os.path.join("models", "{symbol}", "*", "meta.json"),),
+    "trades": ("{symbol}_Trades_ML.csv", "{symbol}_Chart.html"),
+    "backtest": ("{symbol}_ML_WF_Predictions.csv", "{symbol}_Trades_ML_WF.csv"),
+}
+
+
+def _newest(pattern: str) -> float:
+    """Latest mtime of the files matching `pattern` (0.0 if there are none)."""
+    return max((os.path.getmtime(fn) for fn in glob.glob(pattern)), default=0.0)
+
+
+def newest_input_mtime(target_directory: str, symbol: str = None) -> float:
+    """
+    Latest mtime of any raw input file, plus (with `symbol`) the Analysis CSV,
+    configProcess.ini and the symbol's threshold store file.
+    """
+    newest = max((_newest(os.path.join(target_directory, p)) for p in INPUT_PATTERNS), default=0.0)
+    if symbol is not None:
+        sc = get_symbol_config(symbol)
+        newest = max(newest, _newest(sc.analysis_file), _newest(CONFIG_FILE),
+                     _newest(threshold_store.threshold_path(sc.symbol, sc.threshold_store_dir)))
+    return newest
+
+
+def outputs_mtime(target_directory: str, symbol: str, outputs: Sequence[str]) -> float:
+    """Oldest mtime over the outputs (0.0 when any of them is missing)."""
+    return min(_newest(os.path.join(target_directory, o.format(symbol=symbol))) for o in outputs)
+
+
+def has_new_data(pipeline: str, symbol: str = None) -> bool:
+    """
+    True when any final output of `pipeline` (a PIPELINE_OUTPUTS key) is
+    missing or older than the inputs, i.e. the runner has something to do.
+    """
+    sc = get_symbol_config(symbol)
+    built = outputs_mtime(sc.target_directory, sc.symbol, PIPELINE_OUTPUTS[pipeline])
+    return built == 0.0 or newest_input_mtime(sc.target_directory, sc.symbol) > built
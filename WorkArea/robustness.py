@@ -0,0 +1,210 @@
+# robustness.py
+"""
+Monte Carlo / bootstrap robustness of a backtest.
+
+Takes a PnL series, either per trade (Trade_PnL of <SYMBOL>_TradeRecords_TMP.csv
+from PlotChart) or per day (Daily_PnL of a trade file), and resamples it
+n_sims times:
+
+    block    circular block bootstrap (blocks of `block` steps, 1 = i.i.d.);
+             keeps short-range dependence, final PnL varies
+    shuffle  random order of the same values (trade-shuffle); final PnL is
+             fixed, drawdowns and recoveries vary
+
+Each chunk of simulations is one (n_sims, n) index matrix, so resampling and
+the path statistics (final PnL, max drawdown, longest time under water) are
+NumPy operations over the whole matrix. Chunks get independent seeds from
+one SeedSequence, so the results do not depend on the number of worker
+processes.
+
+python robustness.py [SYMBOL] [--source ml|wf|rule|trades] [--method block|shuffle]
+                     [--sims N] [--block B] [--workers N] [--seed S]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import execution_core  # type: ignore
+
+CHUNK_CELLS = 20_000_000       # simulations per chunk * path length
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+STAT_COLS = ("final_pnl", "max_drawdown", "max_drawdown_pct", "time_to_recovery", "recovered")
+
+
+# ------------------------------------------------------------------------------------
+# RESAMPLING (index matrices)
+# ------------------------------------------------------------------------------------
+def block_bootstrap_indices(n: int, n_sims: int, block: int, rng: np.random.Generator) -> np.ndarray:
+    """(n_sims, n) indices of a circular block bootstrap."""
+    block = max(1, min(block, n))
+    n_blocks = -(-n // block)
+    starts = rng.integers(0, n, size=(n_sims, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)) % n
+    return idx.reshape(n_sims, n_blocks * block)[:, :n]
+
+
+def shuffle_indices(n: int, n_sims: int, rng: np.random.Generator) -> np.ndarray:
+    """(n_sims, n) independent permutations of range(n)."""
+    return rng.permuted(np.broadcast_to(np.arange(n), (n_sims, n)), axis=1)
+
+
+# ------------------------------------------------------------------------------------
+# PATH STATISTICS
+# ------------------------------------------------------------------------------------
+def path_stats(pnl: np.ndarray, initial: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Per row of a (n_sims, n) PnL matrix: final PnL, max drawdown (amount and
+    % of the peak equity, initial capital included), longest run of steps
+    below a previous peak and whether the path ends at a new high.
+    """
+    equity = initial + np.cumsum(pnl, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial)
+    drawdown = equity - peak
+
+    under = drawdown < 0
+    steps = np.cumsum(under, axis=1)
+    # steps since the last step at a peak
+    run = steps - np.maximum.accumulate(np.where(under, 0, steps), axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd_pct = np.where(peak > 0, drawdown / peak * 100, np.nan)
+    return {
+        "final_pnl": equity[:, -1] - initial,
+        "max_drawdown": drawdown.min(axis=1),
+        "max_drawdown_pct": np.nanmin(dd_pct, axis=1) if initial > 0 else np.full(len(pnl), np.nan),
+        "time_to_recovery": run.max(axis=1),
+        "recovered": ~under[:, -1],
+    }
+
+
+def _simulate_chunk(pnl: np.ndarray, n_sims: int, method: str, block: int,
+                    seed: np.random.SeedSequence, initial: float) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    if method == "block":
+        idx = block_bootstrap_indices(len(pnl), n_sims, block, rng)
+    elif method == "shuffle":
+        idx = shuffle_indices(len(pnl), n_sims, rng)
+    else:
+        raise ValueError(f"Unknown resampling method: {method}")
+    return path_stats(pnl[idx], initial)
+
+
+def simulate(pnl,
+             n_sims: int = 10_000,
+             method: str = "block",
+             block: int = 5,
+             initial: float = 0.0,
+             seed: int = 42,
+             workers: int = 1) -> pd.DataFrame:
+    """
+    One row of path statistics per simulation. Chunks of at most
+    CHUNK_CELLS resampled values run in `workers` processes.
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    pnl = pnl[~np.isnan(pnl)]
+    if len(pnl) == 0:
+        raise ValueError("Empty PnL series.")
+
+    per_chunk = max(1, CHUNK_CELLS // len(pnl))
+    sizes = [min(per_chunk, n_sims - start) for start in range(0, n_sims, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(pnl, size, method, block, s, initial) for size, s in zip(sizes, seeds)]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_chunk, *zip(*jobs)))
+    else:
+        parts = [_simulate_chunk(*job) for job in jobs]
+
+    return pd.DataFrame({c: np.concatenate([p[c] for p in parts]) for c in STAT_COLS})
+
+
+def summarize(sims: pd.DataFrame, actual: Dict[str, float] = None) -> pd.DataFrame:
+    """
+    Quantiles of each statistic, probability of a loss / of no recovery and,
+    with `actual` (path_stats of the real curve), where the backtest ranks.
+    """
+    rows = []
+    for col in STAT_COLS[:-1]:
+        values = sims[col].to_numpy(dtype=float)
+        row = {"stat": col, "mean": np.nanmean(values)}
+        row.update({f"q{int(q * 100):02d}": np.nanquantile(values, q) for q in QUANTILES})
+        if actual is not None:
+            row["actual"] = actual[col]
+            row["actual_pct_rank"] = float((values <= actual[col]).mean() * 100)
+        rows.append(row)
+    table = pd.DataFrame(rows).set_index("stat")
+    table.attrs["p_loss"] = float((sims["final_pnl"] < 0).mean())
+    table.attrs["p_not_recovered"] = float((~sims["recovered"].astype(bool)).mean())
+    return table
+
+
+# ------------------------------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------------------------------
+def load_pnl(target_directory: str, symbol: str, source: str = "wf") -> np.ndarray:
+    """Trade_PnL of the trade records (source 'trades') or Daily_PnL of a trade file."""
+    if source == "trades":
+        path, col = os.path.join(target_directory, f"{symbol}_TradeRecords_TMP.csv"), "Trade_PnL"
+    else:
+        suffix, _ = execution_core.SIGNAL_SOURCES[source]
+        path, col = os.path.join(target_directory, f"{symbol}{suffix}"), "Daily_PnL"
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"PnL file not found: {path}")
+    return pd.read_csv(path, usecols=[col])[col].to_numpy(dtype=float)
+
+
+def run_robustness(symbol: str = None, source: str = "wf", method: str = "block",
+                   n_sims: int = 10_000, block: int = 5, workers: int = 1, seed: int = 42):
+    from config_loader import get_symbol_config  # type: ignore
+
+    sc = get_symbol_config(symbol)
+    pnl = load_pnl(sc.target_directory, sc.symbol, source)
+    pnl = pnl[~np.isnan(pnl)]
+    unit = "trades" if source == "trades" else "days"
+
+    print(f"--- Robustness: {sc.symbol} ({source}, {len(pnl)} {unit}) ---")
+    print(f"Method: {method}{f' (block {block})' if method == 'block' else ''} | "
+          f"simulations: {n_sims:,} | workers: {workers}")
+
+    t0 = time.perf_counter()
+    sims = simulate(pnl, n_sims, method, block, float(sc.investment_amount), seed, workers)
+    print(f"Simulated in {time.perf_counter() - t0:.2f}s")
+
+    actual = {k: float(v[0]) for k, v in path_stats(pnl[None, :], float(sc.investment_amount)).items()}
+    table = summarize(sims, actual)
+
+    output_file = os.path.join(sc.target_directory, f"{sc.symbol}_Robustness_{source}_{method}.csv")
+    sims.to_csv(output_file, index=False)
+
+    pd.set_option("display.width", 160)
+    print(table.round(2).to_string())
+    print(f"P(loss): {table.attrs['p_loss']:.1%} | P(not recovered at end): {table.attrs['p_not_recovered']:.1%}")
+    print(f"time_to_recovery in {unit}")
+    print(f"\n✔ Saved simulations: {output_file}")
+    return sims, table
+
+
+def _arg(flag: str, default=None):
+    return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv[:-1] else default
+
+
+if __name__ == "__main__":
+    flags = ("--source", "--method", "--sims", "--block", "--workers", "--seed")
+    flag_values = {_arg(f) for f in flags}
+    args = [a for a in sys.argv[1:] if not a.startswith("--") and a not in flag_values]
+    run_robustness(
+        args[0] if args else None,
+        source=_arg("--source", "wf"),
+        method=_arg("--method", "block"),
+        n_sims=int(_arg("--sims", 10_000)),
+        block=int(_arg("--block", 5)),
+        workers=int(_arg("--workers", 1)),
+        seed=int(_arg("--seed", 42)),
+    )
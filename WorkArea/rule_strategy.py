@@ -0,0 +1,242 @@
+# rule_strategy.py
+"""
+Vectorized signals and strategies for the rule-based OI / Longs / Shorts
+strategy (Older/GenerateTrades.py).
+
+generate_signals evaluates the doubling / range / net-change / min-OI rules
+as column masks combined with np.select into an int8 Signal_Code column
+(BUY = 1, HOLD = 0, SELL = -1). With group_col set it works on a stacked
+multi-symbol frame: the _Prev columns are shifted within each symbol.
+
+simulate_trades runs the strategy (OIFlowStrategy) on execution_core:
+execution at the close, fixed size, with the EMA-armed, stop and trailing
+exit modules and optional transaction costs (cost_model.CostModel). simulate_vwap_trades does the same for the long-only VWAP
+support strategy of Older/GenerateTrades_VWAP.py with stop loss / take profit.
+
+Rules (unchanged from the original simulate_trades), evaluated on day i with
+the previous day's signal:
+  - EMA-armed exit: a long is armed once close > EMA50 * (1 + ema_exit_long)
+    and exits when close falls back below EMA50 (shorts mirrored)
+  - hard exit: long when close < entry * hard_exit_pct, short when
+    close > entry * (2 - hard_exit_pct)            ([TRADING] hard_exit_pct)
+  - trailing exit: long when the drawdown from the max since entry reaches
+    trailing_exit_pct %, short when the bounce from the min reaches
+    -trailing_exit_pct %                           ([TRADING] trailing_exit_pct)
+  - opposite signal closes the position (VWAP filter applies)
+  - entries need Longs (Shorts) Till Now above the other side and above the
+    level of the last entry trigger; size = floor(investment / close)
+"""
+
+import numpy as np
+import pandas as pd
+
+import cost_model  # type: ignore
+import execution_core  # type: ignore
+
+CLOSE_COL = "close"
+VWAP_COL = "vwap"
+EMA_COL = "EMA50"
+SIGNAL_COL = "Signal"
+SIGNAL_CODE_COL = "Signal_Code"
+OI_SUM_COL = "Daily_Open_Interest_Sum"
+LONG_TILL_NOW_COL = "Longs Till Now"
+SHORT_TILL_NOW_COL = "Shorts Till Now"
+
+# int8 signal codes
+BUY, HOLD, SELL = execution_core.BUY, execution_core.HOLD, execution_core.SELL
+SIGNAL_NAMES = np.array(["SELL", "HOLD", "BUY"], dtype=object)  # index = code + 1
+
+VWAP_BAND_PCT = 0.5
+
+
+# ------------------------------------------------------------------------------------
+# SIGNALS
+# ------------------------------------------------------------------------------------
+def dynamic_min_oi(df: pd.DataFrame, group_col: str = None) -> np.ndarray:
+    """
+    Per-row minimum OI: the 25th percentile of the symbol's OI (1 if that is
+    0), as Older/GenerateTrades.calculate_dynamic_min_oi.
+    """
+    oi = df[OI_SUM_COL]
+    q = oi.groupby(df[group_col]).transform(lambda s: s.quantile(0.25)) if group_col else \
+        pd.Series(oi.quantile(0.25), index=df.index)
+    q = q.fillna(0).to_numpy(dtype=float)
+    return np.where(q == 0, 1.0, np.trunc(q))
+
+
+def generate_signals(df: pd.DataFrame,
+                     threshold_pct: float,
+                     min_oi_sum,
+                     group_col: str = None) -> pd.DataFrame:
+    """
+    Adds Net_Position_Change, Signal_Threshold_Value, LTN_Prev / STN_Prev and
+    Signal_Code (int8). min_oi_sum is a scalar or one value per row.
+
+    BUY : Longs Till Now doubled (prev > 1), |LTN - STN| within the threshold,
+          LTN > STN and longs increased
+          - otherwise net change > threshold and longs increased
+    SELL: the mirror image on Shorts Till Now
+    Days with OI below min_oi_sum are HOLD.
+    """
+    ltn = df[LONG_TILL_NOW_COL]
+    stn = df[SHORT_TILL_NOW_COL]
+
+    df["Net_Position_Change"] = ltn - stn
+    df["Signal_Threshold_Value"] = df[OI_SUM_COL] * threshold_pct
+
+    if group_col:
+        prev = df.groupby(group_col, sort=False)[[LONG_TILL_NOW_COL, SHORT_TILL_NOW_COL]].shift(1)
+        df["LTN_Prev"] = prev[LONG_TILL_NOW_COL].fillna(0)
+        df["STN_Prev"] = prev[SHORT_TILL_NOW_COL].fillna(0)
+    else:
+        df["LTN_Prev"] = ltn.shift(1).fillna(0)
+        df["STN_Prev"] = stn.shift(1).fillna(0)
+
+    ltn, stn = ltn.to_numpy(dtype=float), stn.to_numpy(dtype=float)
+    ltn_prev, stn_prev = df["LTN_Prev"].to_numpy(dtype=float), df["STN_Prev"].to_numpy(dtype=float)
+    net = df["Net_Position_Change"].to_numpy(dtype=float)
+    threshold = df["Signal_Threshold_Value"].to_numpy(dtype=float)
+
+    longs_increased = ltn > ltn_prev
+    shorts_increased = stn > stn_prev
+    within_range = np.abs(ltn - stn) <= threshold
+    long_doubling = (ltn_prev > 1) & (ltn >= 2 * ltn_prev)
+    short_doubling = (stn_prev > 1) & (stn >= 2 * stn_prev)
+
+    conditions = [
+        df[OI_SUM_COL].to_numpy(dtype=float) < np.asarray(min_oi_sum, dtype=float),
+        long_doubling & within_range & (ltn > stn) & longs_increased,
+        short_doubling & within_range & (stn > ltn) & shorts_increased,
+        (net > threshold) & longs_increased,
+        (net < -threshold) & shorts_increased,
+    ]
+    df[SIGNAL_CODE_COL] = np.select(conditions, [HOLD, BUY, SELL, BUY, SELL], HOLD).astype(np.int8)
+    return df
+
+
+def signal_names(codes) -> np.ndarray:
+    """int8 codes -> BUY / SELL / HOLD strings."""
+    return SIGNAL_NAMES[np.asarray(codes, dtype=int) + 1]
+
+
+# ------------------------------------------------------------------------------------
+# STRATEGIES (execution_core)
+# ------------------------------------------------------------------------------------
+def _column(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _next(mask: np.ndarray) -> np.ndarray:
+    """mask of the bar after each bar (the bar a signal is executed on)."""
+    return np.append(mask[1:], True)
+
+
+class OIFlowStrategy(execution_core.Strategy):
+    """
+    Longs / Shorts doubling strategy: Signal_Code (or Signal) from
+    generate_signals, executed at the close.
+
+    The VWAP filter of the execution bar blocks a BUY when close is more
+    than VWAP_BAND_PCT % below VWAP (a SELL when above), both for entries and
+    opposite-signal exits. Entries need Longs (Shorts) Till Now above the
+    other side and above the level of the last entry on that side.
+    """
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        col = SIGNAL_CODE_COL if SIGNAL_CODE_COL in df.columns else SIGNAL_COL
+        signal = execution_core.signal_codes(df[col])
+
+        close, vwap = _column(df, CLOSE_COL), _column(df, VWAP_COL)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            near = np.abs(close - vwap) / vwap * 100.0 <= VWAP_BAND_PCT
+        has_vwap = vwap > 0
+        allow_buy = ~has_vwap | near | (close > vwap)
+        allow_sell = ~has_vwap | near | (close < vwap)
+
+        blocked = ((signal == BUY) & ~_next(allow_buy)) | ((signal == SELL) & ~_next(allow_sell))
+        return np.where(blocked, HOLD, signal).astype(np.int8)
+
+    def entry_levels(self, df: pd.DataFrame):
+        ltn, stn = _column(df, LONG_TILL_NOW_COL), _column(df, SHORT_TILL_NOW_COL)
+        return np.where(ltn > stn, ltn, -np.inf), np.where(stn > ltn, stn, -np.inf)
+
+
+class VwapSupportStrategy(execution_core.Strategy):
+    """
+    Long-only VWAP support entry (Older/GenerateTrades_VWAP.py): buy at the
+    close when it is below VWAP by at most threshold_pct %.
+    """
+
+    def __init__(self, threshold_pct: float = 0.5):
+        self.threshold = threshold_pct / 100.0
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        close, vwap = _column(df, CLOSE_COL), _column(df, VWAP_COL)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            diff = close - vwap
+            support = (vwap > 0) & (diff < 0) & (np.abs(diff) / vwap <= self.threshold)
+        # the condition of bar t is traded at the close of bar t (signal of bar t - 1)
+        return np.append(support[1:], False).astype(np.int8)
+
+
+def _apply(df: pd.DataFrame, result: pd.DataFrame) -> pd.DataFrame:
+    df["Quantity_Traded"] = result["Quantity_Traded"].astype(np.int64)
+    df["Position"] = result["Position"].astype(np.int64)
+    cost_cols = [c for c in cost_model.COST_COLUMNS if c in result.columns]
+    df[cost_cols] = result[cost_cols]
+    df["Daily_PnL"] = result["Daily_PnL"]
+    df["Cumulative_PnL"] = result["Cumulative_PnL"]
+    return df
+
+
+def simulate_trades(df: pd.DataFrame,
+                    investment_amount: float,
+                    ema_exit_long: float = 0.10,
+                    ema_exit_short: float = 0.10,
+                    hard_exit_pct: float = 0.95,
+                    trailing_exit_pct: float = -15.0,
+                    costs: cost_model.CostModel = None) -> pd.DataFrame:
+    """
+    Adds Quantity_Traded, Position, Daily_PnL and Cumulative_PnL to a frame
+    with close, Signal_Code (or Signal), Longs/Shorts Till Now and optionally
+    vwap / EMA50. ema_exit_* are fractions (0.10 = 10 %); hard_exit_pct is
+    the long stop as a fraction of entry (0.95), trailing_exit_pct the
+    trailing move in percent (-15).
+    """
+    settings = execution_core.ExecutionSettings(
+        execution="close", sizing="fixed", investment_amount=investment_amount,
+        hold_exits=False, reverse_same_bar=False,
+    )
+    exits = (
+        execution_core.EmaExit(_column(df, EMA_COL), ema_exit_long, ema_exit_short),
+        execution_core.StopLoss(1.0 - hard_exit_pct),
+        execution_core.TrailingStop(-trailing_exit_pct),
+    )
+    return _apply(df, execution_core.run_backtest(df, OIFlowStrategy(), settings, exits, costs))
+
+
+def simulate_vwap_trades(df: pd.DataFrame,
+                         investment_amount: float,
+                         vwap_threshold_pct: float = 0.5,
+                         stop_loss_pct: float = 15.0,
+                         take_profit_pct: float = 50.0,
+                         costs: cost_model.CostModel = None) -> pd.DataFrame:
+    """
+    VWAP support longs with a fixed stop loss / take profit (percent of the
+    entry price). Adds Entry_Price / Entry_Type as well.
+    """
+    settings = execution_core.ExecutionSettings(
+        execution="close", sizing="fixed", investment_amount=investment_amount,
+        hold_exits=False, reverse_same_bar=False,
+    )
+    exits = (
+        execution_core.StopLoss(stop_loss_pct / 100.0),
+        execution_core.TakeProfit(take_profit_pct / 100.0),
+    )
+    result = execution_core.run_backtest(df, VwapSupportStrategy(vwap_threshold_pct), settings, exits, costs)
+    df = _apply(df, result)
+    df["Entry_Price"] = result["Entry_Price"]
+    df["Entry_Type"] = np.where(result["Position"] != 0, "VWAP", None)
+    return df
@@ -0,0 +1,113 @@
+# threshold_store.py
+"""
+Per-symbol threshold storage.
+
+Each symbol's thresholds live in their own small INI file
+(<store_dir>/THRESHOLDS_<SYMBOL>.ini, one [THRESHOLDS_<SYMBOL>] section), so
+parallel runs for different symbols never touch the same file. Writes go to
+a temp file in the same directory and are moved into place with os.replace,
+which is atomic: readers see either the old or the new file, never a
+half-written one.
+
+Reads are cached in-process and re-read only when the file's mtime changes.
+Symbols without a store file fall back to the legacy [THRESHOLDS_<SYMBOL>]
+section in configProcess.ini.
+"""
+
+import os
+import configparser
+import tempfile
+from typing import Dict, Optional, Tuple
+
+from config_loader import CONFIG_FILE, load_config  # type: ignore
+
+# symbol -> (path, mtime_ns, thresholds)
+_cache: Dict[str, Tuple[str, int, Dict[str, float]]] = {}
+
+
+def _section(symbol: str) -> str:
+    return f"THRESHOLDS_{symbol}"
+
+
+def store_directory() -> str:
+    cfg = load_config()
+    return cfg.get("THRESHOLD_STORE_DIR", "thresholds")
+
+
+def threshold_path(symbol: str, store_dir: Optional[str] = None) -> str:
+    store_dir = store_dir or store_directory()
+    return os.path.join(store_dir, f"{_section(symbol)}.ini")
+
+
+def _read_section(path: str, section: str) -> Dict[str, float]:
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    if not parser.has_section(section):
+        return {}
+
+    out = {}
+    for k, v in parser.items(section):
+        try:
+            out[k] = float(v)
+        except ValueError:
+            pass
+    return out
+
+
+# ------------------------------------------------------------------------------------
+# WRITE
+# ------------------------------------------------------------------------------------
+def save_thresholds(symbol: str, thresholds: dict, store_dir: Optional[str] = None) -> str:
+    """Atomically write one symbol's thresholds. Returns the file path."""
+    path = threshold_path(symbol, store_dir)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    parser = configparser.ConfigParser()
+    section = _section(symbol)
+    parser.add_section(section)
+    for k, v in thresholds.items():
+        parser.set(section, k, f"{v:.6f}")
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{section}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            parser.write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _cache.pop(symbol, None)
+    return path
+
+
+# ------------------------------------------------------------------------------------
+# READ
+# ------------------------------------------------------------------------------------
+def load_thresholds(symbol: str, store_dir: Optional[str] = None) -> Dict[str, float]:
+    """
+    Thresholds for `symbol` as {name: float}; {} if none are stored.
+    Returns a copy, callers may modify it.
+    """
+    path = threshold_path(symbol, store_dir)
+    if not os.path.exists(path):
+        path = CONFIG_FILE     # legacy location
+    if not os.path.exists(path):
+        return {}
+
+    mtime = os.stat(path).st_mtime_ns
+    cached = _cache.get(symbol)
+    if cached is not None and cached[0] == path and cached[1] == mtime:
+        return dict(cached[2])
+
+    thresholds = _read_section(path, _section(symbol))
+    _cache[symbol] = (path, mtime, thresholds)
+    return dict(thresholds)
+
+
+def clear_cache() -> None:
+    _cache.clear()
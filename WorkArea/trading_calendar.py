@@ -0,0 +1,208 @@
+# trading_calendar.py
+"""
+NSE trading-day calendar and date-aligned dense arrays.
+
+The calendar is the sorted set of trading days, built once from the bhavcopy
+files of the C# downloader (cmDDMONYYYYbhav.csv / bhavcopy_DDMONYYYY.zip in
+[PATHS] bhavcopy_directory) or, without them, from the union of the dates of
+the series at hand. Each day has an integer index 0..T-1; index_of maps
+dates to these indices through a day-number lookup table (one array read per
+date, -1 for a date that is not a trading day).
+
+With every series expressed in calendar indices, joins are array indexing:
+
+    align        one series -> dense (T,) values and a present mask
+    panel        per-symbol frames -> (T, N) matrices and a (T, N) present mask
+    left_join    DataFrame.merge(right, on=DATE, how="left") by index lookup
+                 (right has one row per date; the last one wins)
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DATE_COL = "DATE"
+
+BHAVCOPY_PATTERNS = (
+    re.compile(r"^cm(\d{2})([A-Za-z]{3})(\d{4})bhav\.csv(?:\.zip)?$", re.IGNORECASE),
+    re.compile(r"^bhavcopy_(\d{2})([A-Za-z]{3})(\d{4})\.zip$", re.IGNORECASE),
+)
+MONTHS = {m: i for i, m in enumerate(
+    ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"), start=1)}
+
+
+def _days(dates) -> np.ndarray:
+    """Dates (anything pd.to_datetime accepts) -> int64 day numbers, NaT as INT64 min."""
+    values = pd.to_datetime(pd.Series(np.asarray(dates).ravel()), errors="coerce").to_numpy(dtype="datetime64[ns]")
+    return values.astype("datetime64[D]").astype(np.int64)
+
+
+# ------------------------------------------------------------------------------------
+# CALENDAR
+# ------------------------------------------------------------------------------------
+class TradingCalendar:
+    """Sorted trading days with O(1) date -> index lookup."""
+
+    def __init__(self, dates):
+        days = _days(dates)
+        days = np.unique(days[days != np.iinfo(np.int64).min])
+        if len(days) == 0:
+            raise ValueError("Empty trading calendar.")
+
+        self.days = days
+        self.dates = days.astype("datetime64[D]")
+        self._first = int(days[0])
+        self._lookup = np.full(int(days[-1]) - self._first + 1, -1, dtype=np.int64)
+        self._lookup[days - self._first] = np.arange(len(days))
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __repr__(self) -> str:
+        return f"TradingCalendar({len(self)} days, {self.dates[0]} .. {self.dates[-1]})"
+
+    @classmethod
+    def from_dates(cls, *series) -> "TradingCalendar":
+        """Union of the dates of all series."""
+        return cls(np.concatenate([_days(s) for s in series]).astype("datetime64[D]"))
+
+    @classmethod
+    def from_bhavcopy(cls, directory: str) -> Optional["TradingCalendar"]:
+        """Days of the bhavcopy files in `directory` (None when there are none)."""
+        if not directory or not os.path.isdir(directory):
+            return None
+        days = []
+        for name in os.listdir(directory):
+            for pattern in BHAVCOPY_PATTERNS:
+                m = pattern.match(name)
+                if m and m.group(2).upper() in MONTHS:
+                    days.append(f"{m.group(3)}-{MONTHS[m.group(2).upper()]:02d}-{m.group(1)}")
+                    break
+        return cls(np.array(days, dtype="datetime64[D]")) if days else None
+
+    def index_of(self, dates) -> np.ndarray:
+        """Calendar index of each date, -1 where it is not a trading day (or NaT)."""
+        offset = _days(dates) - self._first
+        inside = (offset >= 0) & (offset < len(self._lookup))
+        out = np.full(len(offset), -1, dtype=np.int64)
+        out[inside] = self._lookup[offset[inside]]
+        return out
+
+    def union(self, *series) -> "TradingCalendar":
+        return TradingCalendar.from_dates(self.dates, *series)
+
+    # --------------------------------------------------------------------------------
+    # ALIGNMENT
+    # --------------------------------------------------------------------------------
+    def rows(self, dates) -> np.ndarray:
+        """(T,) row of `dates` held by each calendar day, -1 where missing (last duplicate wins)."""
+        idx = self.index_of(dates)
+        ptr = np.full(len(self), -1, dtype=np.int64)
+        ok = idx >= 0
+        ptr[idx[ok]] = np.flatnonzero(ok)
+        return ptr
+
+    def align(self, dates, values, fill=np.nan):
+        """Dense (T,) values of one series and its present mask."""
+        ptr = self.rows(dates)
+        present = ptr >= 0
+        return take(np.asarray(values), ptr, fill), present
+
+    def panel(self, frames: Dict[str, pd.DataFrame], columns: Sequence[str],
+              date_col: str = DATE_COL, fill=np.nan) -> "Panel":
+        """(T, N) float matrix per column over the symbols of `frames`, NaN / fill where missing."""
+        symbols = list(frames)
+        T, N = len(self), len(symbols)
+        present = np.zeros((T, N), dtype=bool)
+        values = {c: np.full((T, N), fill, dtype=float) for c in columns}
+        for j, f in enumerate(frames.values()):
+            ptr = self.rows(f[date_col])
+            have = ptr >= 0
+            present[:, j] = have
+            for c in columns:
+                if c in f.columns:
+                    col = pd.to_numeric(f[c], errors="coerce").to_numpy(dtype=float)
+                    values[c][have, j] = col[ptr[have]]
+        return Panel(self.dates, symbols, values, present)
+
+
+@dataclass
+class Panel:
+    dates: np.ndarray                 # (T,) datetime64[D]
+    symbols: List[str]                # (N,)
+    values: Dict[str, np.ndarray]     # column -> (T, N)
+    present: np.ndarray               # (T, N) bool, the symbol has a row on that day
+
+
+def take(values: np.ndarray, rows: np.ndarray, fill=np.nan) -> np.ndarray:
+    """values[rows] with `fill` where rows < 0; the dtype is kept when nothing is missing."""
+    missing = rows < 0
+    out = values[np.where(missing, 0, rows)] if len(values) else np.empty(len(rows), dtype=values.dtype)
+    if not missing.any():
+        return out
+    if out.dtype.kind in "biu":
+        out = out.astype(float)
+    elif out.dtype.kind != "f" and out.dtype.kind != "M":
+        out = out.astype(object)
+    out[missing] = np.datetime64("NaT") if out.dtype.kind == "M" else fill
+    return out
+
+
+def left_join(left: pd.DataFrame, right: pd.DataFrame, on: str = DATE_COL,
+              calendar: TradingCalendar = None) -> pd.DataFrame:
+    """
+    left.merge(right, on=on, how="left") for a right frame with one row per
+    date: the right columns are gathered by calendar index. A calendar that
+    lacks some dates of `left` leaves them unmatched.
+    """
+    extra = [c for c in right.columns if c != on]
+    if calendar is None:
+        if left[on].notna().any() or right[on].notna().any():
+            calendar = TradingCalendar.from_dates(left[on], right[on])
+        else:
+            return left.assign(**{c: np.nan for c in extra}).reset_index(drop=True)
+
+    ptr = calendar.rows(right[on])
+    idx = calendar.index_of(left[on])
+    rows = np.where(idx >= 0, ptr[np.maximum(idx, 0)], -1)
+
+    out = left.reset_index(drop=True)
+    for c in extra:
+        out[c] = take(right[c].to_numpy(), rows)
+    return out
+
+
+# ------------------------------------------------------------------------------------
+# CONFIGURED CALENDAR
+# ------------------------------------------------------------------------------------
+_calendar_cache: Dict[str, Optional[TradingCalendar]] = {}
+
+
+def load_calendar(directory: str = None) -> Optional[TradingCalendar]:
+    """
+    Bhavcopy calendar of `directory` (default [PATHS] bhavcopy_directory),
+    read once per directory; None when it has no bhavcopy files.
+    """
+    if directory is None:
+        from config_loader import get_symbol_config  # type: ignore
+        directory = get_symbol_config().bhavcopy_directory
+    if directory not in _calendar_cache:
+        _calendar_cache[directory] = TradingCalendar.from_bhavcopy(directory)
+    return _calendar_cache[directory]
+
+
+def calendar_for(*series, directory: str = None) -> TradingCalendar:
+    """
+    The bhavcopy calendar over the span of `series` plus any of their dates
+    missing from it; the union of their dates when there is no bhavcopy data.
+    """
+    calendar = load_calendar(directory)
+    union = TradingCalendar.from_dates(*series)
+    if calendar is None:
+        return union
+    inside = (calendar.days >= union.days[0]) & (calendar.days <= union.days[-1])
+    return TradingCalendar.from_dates(calendar.dates[inside], union.dates)